@@ -12,6 +12,8 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 from app.users.models import *
+from app.bookings.models import *
+from app.catalog.models import *
 from sqlmodel import SQLModel
 from app.generics import settings 
 
@@ -0,0 +1,102 @@
+import json
+import uuid
+import logging
+
+from ..generics import redis_connection, settings
+from ..generics.utils.cache import LRUTTLCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """
+    Two-tier cache of the authenticated principal (`request.state.user`) keyed by user id.
+
+    L1 is a per-process LRU with a short TTL, L2 is the shared redis. A miss on both tiers
+    falls through to the `loader` (a DB lookup). Local entries of other workers are not
+    invalidated explicitly, they are bounded by `PRINCIPAL_CACHE_LOCAL_TTL` instead.
+    """
+    key_prefix = 'principal'
+
+    def __init__(self, maxsize: int, local_ttl: int, ttl: int):
+        self.local = LRUTTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.ttl = ttl
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def make_key(self, user_id: uuid.UUID | str) -> str:
+        return f'{self.key_prefix}:{user_id}'
+
+    @staticmethod
+    def dumps(principal: dict) -> str:
+        return json.dumps({**principal, 'id': str(principal['id'])})
+
+    @staticmethod
+    def loads(raw: str) -> dict:
+        principal = json.loads(raw)
+        principal['id'] = uuid.UUID(principal['id'])
+        return principal
+
+    async def get(self, user_id: uuid.UUID, loader) -> dict | None:
+        principal = self.local.get(user_id)
+        if principal is not None:
+            return principal
+
+        key = self.make_key(user_id)
+        try:
+            raw = await redis_connection.get(key)
+        except Exception:
+            logger.exception('Can not read principal from redis', extra={'user_id': str(user_id)})
+            raw = None
+        if raw is not None:
+            self.redis_hits += 1
+            principal = self.loads(raw)
+            self.local.set(user_id, principal)
+            return principal
+
+        self.redis_misses += 1
+        principal = await loader(user_id)
+        if principal is None:
+            return None
+        self.local.set(user_id, principal)
+        try:
+            await redis_connection.set(key, self.dumps(principal), ex=self.ttl)
+        except Exception:
+            logger.exception('Can not write principal to redis', extra={'user_id': str(user_id)})
+        return principal
+
+    async def invalidate(self, user_id: uuid.UUID | str):
+        await self.invalidate_many([user_id])
+
+    async def invalidate_many(self, user_ids: list[uuid.UUID | str]):
+        """
+        Called once the change is committed, so a redis failure is only logged: the redis
+        entries then live until `PRINCIPAL_CACHE_TTL`.
+        """
+        if not user_ids:
+            return
+        user_ids = [uuid.UUID(str(user_id)) for user_id in user_ids]
+        for user_id in user_ids:
+            self.local.delete(user_id)
+        try:
+            await redis_connection.delete(*[self.make_key(user_id) for user_id in user_ids])
+        except Exception:
+            logger.exception('Can not invalidate principals in redis', extra={'user_ids': len(user_ids)})
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'local': self.local.stats,
+            'redis_hits': self.redis_hits,
+            'redis_misses': self.redis_misses,
+            # Every redis miss is a DB round trip.
+            'db_loads': self.redis_misses,
+        }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_LOCAL_SIZE,
+    local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
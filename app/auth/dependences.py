@@ -7,29 +7,31 @@ from sqlalchemy import select
 from ..users.crud import user_crud
 from ..generics import ASession
 from ..generics.exceptions import InvalidCredentialsException, PermissionDeniedException
-from ..generics.utils import security
+from .cache import principal_cache
 
 
 logger = logging.getLogger(__name__)
 
 
 async def require_authentication(request: Request, asession: ASession):
-    authorization = request.headers.get("Authorization")
-    if authorization is None:
+    # The bearer token has already been decoded and verified by AuthenticationMiddleware.
+    payload = request.state.token_payload
+    if payload is None:
         raise InvalidCredentialsException(message='Lacking token')
-    _, _, token = authorization.partition(" ")
-    try:
-        payload = security.decode_token(token)
-    except Exception:
-        logger.exception('Invalid token')
-        raise InvalidCredentialsException(message='Invalid Credentials')
-    async with asession.begin() as session:
-        user = await user_crud.get(id=uuid.UUID(payload['sub']), db_session=session)
-    if user is None:
+
+    async def load_principal(user_id: uuid.UUID) -> dict | None:
+        async with asession.begin() as session:
+            user = await user_crud.get(id=user_id, db_session=session)
+        if user is None:
+            return None
+        return {'id': user.id, 'role_id': user.role_id, 'username': user.username, 'is_active': user.is_active}
+
+    principal = await principal_cache.get(uuid.UUID(payload['sub']), loader=load_principal)
+    if principal is None:
         raise InvalidCredentialsException(message='User does not exist')
-    if not user.is_active:
+    if not principal['is_active']:
         raise HTTPException(status_code=status.HTTP_423_LOCKED, detail='Account has been locked')
-    request.state.user = {'id': user.id, 'role_id': user.role_id, 'username': user.username, 'is_active': user.is_active}
+    request.state.user = principal
     return True
 
 
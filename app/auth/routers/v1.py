@@ -1,11 +1,12 @@
 from datetime import timedelta
 from jwt import DecodeError, ExpiredSignatureError, MissingRequiredClaimError
 
-from fastapi import APIRouter, status, HTTPException, Body
+from fastapi import APIRouter, status, HTTPException, Body, Depends
 
 from ..schemas import Token, LoginRequest, RefreshToken
 from ...users.crud import user_crud
 from ...generics import settings
+from ...generics.ratelimit import RateLimiter
 from ...generics.utils import security
 from ...users.schemas import UserCreate, UserRead
 from ...users.crud import user_crud
@@ -15,11 +16,16 @@ auth_v1 = APIRouter(prefix='/auth')
 
 @auth_v1.post("/register", status_code=status.HTTP_201_CREATED, response_model=UserRead)
 async def register(new_user: UserCreate):
-    user = await user_crud.create(user_crud)
+    user = await user_crud.create(obj_in=new_user)
     #TODO: send email for confirming registration
     return user
 
-@auth_v1.post("/login", response_model=Token, status_code=status.HTTP_200_OK)
+@auth_v1.post(
+    "/login",
+    response_model=Token,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RateLimiter(times=10, minutes=1))]
+)
 async def login(body: LoginRequest):
     user = await user_crud.authenticate(email=body.email, password=body.password)
     if not user:
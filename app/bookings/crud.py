@@ -0,0 +1,15 @@
+from ..generics.crud import CRUDBase, CachedCRUDMixin
+from .models import Show, ShowSeat
+from .schemas import ShowCreate, ShowUpdate, ShowSeatCreate, ShowSeatUpdate
+
+
+class CRUDShow(CachedCRUDMixin, CRUDBase[Show, ShowCreate, ShowUpdate]):
+    change_topic = 'cdc.shows'
+
+
+class CRUDShowSeat(CRUDBase[ShowSeat, ShowSeatCreate, ShowSeatUpdate]):
+    pass
+
+
+show_crud = CRUDShow(Show)
+show_seat_crud = CRUDShowSeat(ShowSeat)
@@ -0,0 +1,28 @@
+from enum import StrEnum
+
+
+class IShowSeatStatusEnum(StrEnum):
+    AVAILABLE = 'AVAILABLE'
+    IN_BOOKING = 'IN-BOOKING'
+    RESERVED = 'RESERVED'
+
+
+class IBookingStatusEnum(StrEnum):
+    PAID = 'PAID'
+    FAILED = 'FAILED'
+
+
+class IPaymentStatusEnum(StrEnum):
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED = 'FAILED'
+    REFUNDING = 'REFUNDING'
+    REFUNDED = 'REFUNDED'
+
+
+class IPaymentMethodEnum(StrEnum):
+    MOMO = 'MOMO'
+
+
+class ISeatMapFormatEnum(StrEnum):
+    runs = 'runs'
+    binary = 'binary'
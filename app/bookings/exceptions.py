@@ -0,0 +1,27 @@
+from fastapi import status
+
+from ..generics.exceptions import APIException
+
+
+class SeatUnavailableException(APIException):
+    status = status.HTTP_409_CONFLICT
+    message = 'Seats are not available.'
+    error_code = 40902
+
+
+class HoldNotFoundException(APIException):
+    status = status.HTTP_404_NOT_FOUND
+    message = 'Hold does not exist or has expired.'
+    error_code = 40402
+
+
+class WaitlistEntryNotFoundException(APIException):
+    status = status.HTTP_404_NOT_FOUND
+    message = 'Waitlist entry does not exist or has expired.'
+    error_code = 40403
+
+
+class InvalidPaymentSignatureException(APIException):
+    status = status.HTTP_401_UNAUTHORIZED
+    message = 'Payment notification signature is invalid.'
+    error_code = 40103
@@ -0,0 +1,380 @@
+import uuid
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import redis.asyncio as redis
+
+from ..generics import redis_connection, settings
+from ..generics.exceptions import InvalidRequestException
+from .exceptions import SeatUnavailableException, HoldNotFoundException
+from .seat_map import (
+    SeatMap, seat_map, SEAT_MAP_KEY_PREFIX, SEAT_MAP_SIZE_KEY_PREFIX, SEAT_AVAILABLE, SEAT_HELD, SEAT_SOLD
+)
+from .waitlist import SERVE_WAITLIST
+
+
+logger = logging.getLogger(__name__)
+
+SEAT_KEY_PREFIX = 'seat_hold:'
+HOLD_KEY_PREFIX = 'hold:'
+HOLD_TIMER_KEY_PREFIX = 'hold_timer:'
+HOLD_EXPIRY_KEY = 'holds:expiry'
+
+# Keys are built inside the scripts from these prefixes, which requires a single redis
+# instance (not a cluster).
+#
+# Seats `seat_hold:<show>:<seat>` are set to the hold id and flagged held in the seat map.
+# The hold record `hold:<id>` outlives the seats by the grace period so that the expiry of
+# `hold_timer:<id>` can still find which seats to release.
+CREATE_HOLD = f"""
+local function create_hold(hold_id, show_id, user_id, seats, ttl, grace)
+    local now = redis.call('TIME')
+    local expires_at = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000) + ttl
+    local ops = {{}}
+    for _, seat in ipairs(seats) do
+        redis.call('SET', '{SEAT_KEY_PREFIX}' .. show_id .. ':' .. seat, hold_id, 'PX', ttl)
+        table.insert(ops, 'SET')
+        table.insert(ops, 'u2')
+        table.insert(ops, '#' .. seat)
+        table.insert(ops, {SEAT_HELD})
+    end
+    redis.call('BITFIELD', '{SEAT_MAP_KEY_PREFIX}' .. show_id, unpack(ops))
+    local hold_key = '{HOLD_KEY_PREFIX}' .. hold_id
+    redis.call(
+        'HSET', hold_key, 'show_id', show_id, 'user_id', user_id, 'seats', table.concat(seats, ','),
+        'expires_at', expires_at, 'extensions', 0
+    )
+    redis.call('PEXPIRE', hold_key, ttl + grace)
+    redis.call('SET', '{HOLD_TIMER_KEY_PREFIX}' .. hold_id, hold_id, 'PX', ttl)
+    redis.call('ZADD', '{HOLD_EXPIRY_KEY}', expires_at, hold_id)
+    return expires_at
+end
+"""
+
+# A seat is freed when it is still held by this hold, or when its key has expired and no
+# other hold took it since, so the seat map doesn't keep it held. Returns the seats which
+# are available now.
+FREE_SEATS = f"""
+local function free_seats(hold_id, show_id, seats)
+    local seat_map_key = '{SEAT_MAP_KEY_PREFIX}' .. show_id
+    local freed = {{}}
+    for seat in string.gmatch(seats, '[^,]+') do
+        local key = '{SEAT_KEY_PREFIX}' .. show_id .. ':' .. seat
+        local owner = redis.call('GET', key)
+        if owner == hold_id then
+            redis.call('DEL', key)
+        end
+        if owner == hold_id or not owner then
+            local state = redis.call('BITFIELD', seat_map_key, 'GET', 'u2', '#' .. seat)[1]
+            if state == {SEAT_HELD} then
+                redis.call('BITFIELD', seat_map_key, 'SET', 'u2', '#' .. seat, {SEAT_AVAILABLE})
+            end
+            if state ~= {SEAT_SOLD} then
+                table.insert(freed, seat)
+            end
+        end
+    end
+    return freed
+end
+
+local function delete_hold(hold_id)
+    redis.call('DEL', '{HOLD_KEY_PREFIX}' .. hold_id, '{HOLD_TIMER_KEY_PREFIX}' .. hold_id)
+    redis.call('ZREM', '{HOLD_EXPIRY_KEY}', hold_id)
+end
+"""
+
+# Holds all the seats ARGV[6..] or none of them. Returns -1 when the seat map of the show is
+# not loaded yet.
+HOLD_SCRIPT = CREATE_HOLD + f"""
+local show_id = ARGV[3]
+local size = redis.call('GET', '{SEAT_MAP_SIZE_KEY_PREFIX}' .. show_id)
+if not size then
+    return {{-1}}
+end
+size = tonumber(size)
+local seats = {{}}
+local taken = {{}}
+for i = 6, #ARGV do
+    local seat = ARGV[i]
+    if tonumber(seat) < 0 or tonumber(seat) >= size then
+        return {{-2, seat}}
+    end
+    if redis.call('EXISTS', '{SEAT_KEY_PREFIX}' .. show_id .. ':' .. seat) == 1
+        or redis.call('BITFIELD', '{SEAT_MAP_KEY_PREFIX}' .. show_id, 'GET', 'u2', '#' .. seat)[1] == {SEAT_SOLD} then
+        table.insert(taken, seat)
+    end
+    table.insert(seats, seat)
+end
+if #taken > 0 then
+    return {{0, taken}}
+end
+return {{1, create_hold(ARGV[1], show_id, ARGV[2], seats, tonumber(ARGV[4]), tonumber(ARGV[5]))}}
+"""
+
+# `expire` when called on the expiry of the timer, which must be gone then, otherwise the
+# hold has to belong to `user_id`. The seats go to the waitlist first.
+RELEASE_HOLD = CREATE_HOLD + FREE_SEATS + SERVE_WAITLIST + f"""
+local function release_hold(hold_id, user_id, expire, ttl, grace)
+    local hold = redis.call('HMGET', '{HOLD_KEY_PREFIX}' .. hold_id, 'show_id', 'user_id', 'seats', 'confirmed')
+    if not hold[1] or hold[4] then
+        redis.call('ZREM', '{HOLD_EXPIRY_KEY}', hold_id)
+        return false
+    end
+    if expire then
+        if redis.call('EXISTS', '{HOLD_TIMER_KEY_PREFIX}' .. hold_id) == 1 then
+            return false
+        end
+    elseif hold[2] ~= user_id then
+        return false
+    end
+    local freed = free_seats(hold_id, hold[1], hold[3])
+    delete_hold(hold_id)
+    local granted = serve_waitlist(hold[1], freed, ttl, grace)
+    return {{hold[1], hold[2], hold[3], granted}}
+end
+"""
+
+RELEASE_SCRIPT = RELEASE_HOLD + """
+return release_hold(ARGV[1], ARGV[2], ARGV[3] == 'expire', tonumber(ARGV[4]), tonumber(ARGV[5]))
+"""
+
+# Releases up to ARGV[1] holds due in `holds:expiry`, oldest first. Returns the time of the
+# sweep, the expiry of the oldest due hold, how many were due and the released holds.
+SWEEP_SCRIPT = RELEASE_HOLD + f"""
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local due = redis.call('ZRANGEBYSCORE', '{HOLD_EXPIRY_KEY}', '-inf', now_ms, 'WITHSCORES', 'LIMIT', 0, ARGV[1])
+local released = {{}}
+for i = 1, #due, 2 do
+    local hold = release_hold(due[i], '', true, tonumber(ARGV[2]), tonumber(ARGV[3]))
+    if hold then
+        table.insert(released, {{due[i], hold[1], hold[2], hold[3], hold[4]}})
+    end
+end
+return {{now_ms, due[2] or now_ms, #due / 2, released}}
+"""
+
+EXTEND_SCRIPT = f"""
+local hold_key = '{HOLD_KEY_PREFIX}' .. ARGV[1]
+local timer_key = '{HOLD_TIMER_KEY_PREFIX}' .. ARGV[1]
+local hold = redis.call('HMGET', hold_key, 'show_id', 'user_id', 'seats', 'extensions')
+if not hold[1] or hold[2] ~= ARGV[2] or redis.call('EXISTS', timer_key) == 0 then
+    return 0
+end
+if tonumber(hold[4]) >= tonumber(ARGV[5]) then
+    return -1
+end
+local now = redis.call('TIME')
+local expires_at = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000) + tonumber(ARGV[3])
+for seat in string.gmatch(hold[3], '[^,]+') do
+    local key = '{SEAT_KEY_PREFIX}' .. hold[1] .. ':' .. seat
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('PEXPIRE', key, ARGV[3])
+    end
+end
+redis.call('HSET', hold_key, 'expires_at', expires_at, 'extensions', tonumber(hold[4]) + 1)
+redis.call('PEXPIRE', hold_key, tonumber(ARGV[3]) + tonumber(ARGV[4]))
+redis.call('PEXPIRE', timer_key, ARGV[3])
+redis.call('ZADD', '{HOLD_EXPIRY_KEY}', expires_at, ARGV[1])
+return expires_at
+"""
+
+# A hold paid after its expiry is still confirmed when nobody else took its seats in between,
+# otherwise its remaining seats go to the waitlist. The outcome is kept on the hold record
+# until it expires, so that confirming again (a retried payment notification) returns it.
+CONFIRM_SCRIPT = CREATE_HOLD + FREE_SEATS + SERVE_WAITLIST + f"""
+local hold_key = '{HOLD_KEY_PREFIX}' .. ARGV[1]
+local hold = redis.call('HMGET', hold_key, 'show_id', 'user_id', 'seats', 'confirmed')
+if not hold[1] then
+    return false
+end
+if hold[4] then
+    return {{tonumber(hold[4]), hold[1], hold[2], hold[3]}}
+end
+local seat_map_key = '{SEAT_MAP_KEY_PREFIX}' .. hold[1]
+local confirmed = 1
+for seat in string.gmatch(hold[3], '[^,]+') do
+    local owner = redis.call('GET', '{SEAT_KEY_PREFIX}' .. hold[1] .. ':' .. seat)
+    if (owner and owner ~= ARGV[1])
+        or redis.call('BITFIELD', seat_map_key, 'GET', 'u2', '#' .. seat)[1] == {SEAT_SOLD} then
+        confirmed = 0
+    end
+end
+local freed = free_seats(ARGV[1], hold[1], hold[3])
+redis.call('DEL', '{HOLD_TIMER_KEY_PREFIX}' .. ARGV[1])
+redis.call('ZREM', '{HOLD_EXPIRY_KEY}', ARGV[1])
+redis.call('HSET', hold_key, 'confirmed', confirmed)
+if confirmed == 1 then
+    for seat in string.gmatch(hold[3], '[^,]+') do
+        redis.call('BITFIELD', seat_map_key, 'SET', 'u2', '#' .. seat, {SEAT_SOLD})
+    end
+else
+    serve_waitlist(hold[1], freed, tonumber(ARGV[2]), tonumber(ARGV[3]))
+end
+return {{confirmed, hold[1], hold[2], hold[3]}}
+"""
+
+
+def _to_datetime(timestamp_ms: int | str) -> datetime:
+    return datetime.fromtimestamp(int(timestamp_ms) / 1000, tz=timezone.utc)
+
+
+def _parse_seats(seats: str) -> list[int]:
+    return [int(seat) for seat in seats.split(',')]
+
+
+@dataclass
+class SeatHold:
+    hold_id: str
+    show_id: int
+    user_id: str
+    seat_numbers: list[int]
+    expires_at: datetime | None = None
+
+
+@dataclass
+class SweepResult:
+    due: int
+    released: list[SeatHold]
+    # How late the oldest due hold was released, in seconds.
+    lag: float
+
+
+@dataclass
+class HoldConfirmation:
+    confirmed: bool
+    hold: SeatHold
+
+
+class SeatHoldEngine:
+    """
+    Seat holds kept in Redis only, Postgres is written once the hold is paid.
+
+    `hold` takes all the requested seats of a show for `ttl` seconds or none of them, in
+    one Lua script, so concurrent buyers never wait on each other's row locks: a buyer
+    whose seats were taken first gets `SeatUnavailableException` immediately. The seat map
+    of the show is updated by the same scripts. A hold can be released or extended by its
+    owner, and is released on expiry by the listener of
+    the `hold_timer:` keys (`app.bookings.workers.hold_expiry`). Released seats are handed
+    to the waitlist of the show first (`app.bookings.waitlist`). `holds:expiry` indexes
+    the holds by expiry time, `sweep` releases the due ones in batches for the sweeper
+    (`app.bookings.workers.hold_sweeper`), which catches the events pub/sub may lose.
+    """
+
+    def __init__(self, connection: redis.Redis, seat_map: SeatMap, ttl: int, grace: int, max_extensions: int):
+        self.redis = connection
+        self.seat_map = seat_map
+        self.ttl_ms = ttl * 1000
+        self.grace_ms = grace * 1000
+        self.max_extensions = max_extensions
+        self._hold = connection.register_script(HOLD_SCRIPT)
+        self._release = connection.register_script(RELEASE_SCRIPT)
+        self._sweep = connection.register_script(SWEEP_SCRIPT)
+        self._extend = connection.register_script(EXTEND_SCRIPT)
+        self._confirm = connection.register_script(CONFIRM_SCRIPT)
+        self.held = 0
+        self.conflicts = 0
+        self.released = 0
+        self.expired = 0
+        self.granted = 0
+
+    @staticmethod
+    def seat_key(show_id: int, seat_number: int) -> str:
+        return f'{SEAT_KEY_PREFIX}{show_id}:{seat_number}'
+
+    async def hold(self, show_id: int, seat_numbers: list[int], user_id: str) -> SeatHold:
+        seat_numbers = sorted(set(seat_numbers))
+        hold_id = uuid.uuid4().hex
+        args = [hold_id, user_id, show_id, self.ttl_ms, self.grace_ms, *seat_numbers]
+        succeeded, *result = await self._hold(args=args)
+        if succeeded == -1:
+            await self.seat_map.load(show_id)
+            succeeded, *result = await self._hold(args=args)
+        if succeeded == -2:
+            raise InvalidRequestException(message=f'Seat {result[0]} does not exist')
+        if not succeeded:
+            self.conflicts += 1
+            raise SeatUnavailableException(message=f'Seats {", ".join(result[0])} are not available.')
+        self.held += 1
+        return SeatHold(hold_id, show_id, user_id, seat_numbers, _to_datetime(result[0]))
+
+    async def get(self, hold_id: str) -> SeatHold | None:
+        hold = await self.redis.hgetall(f'{HOLD_KEY_PREFIX}{hold_id}')
+        if not hold:
+            return None
+        return SeatHold(
+            hold_id, int(hold['show_id']), hold['user_id'], _parse_seats(hold['seats']),
+            _to_datetime(hold['expires_at'])
+        )
+
+    async def release(self, hold_id: str, user_id: str) -> SeatHold:
+        result = await self._release(args=[hold_id, user_id, 'release', self.ttl_ms, self.grace_ms])
+        if result is None:
+            raise HoldNotFoundException()
+        self.released += 1
+        return self._released_hold(hold_id, result)
+
+    async def expire(self, hold_id: str) -> SeatHold | None:
+        """
+        Release the seats of a hold whose timer has expired, `None` when it has been released,
+        confirmed or extended in the meantime.
+        """
+        result = await self._release(args=[hold_id, '', 'expire', self.ttl_ms, self.grace_ms])
+        if result is None:
+            return None
+        self.expired += 1
+        return self._released_hold(hold_id, result)
+
+    async def sweep(self, batch_size: int) -> SweepResult:
+        """
+        Release up to `batch_size` holds past their expiry in one script, whose timer
+        expiry has been missed or not handled yet.
+        """
+        now, oldest, due, released = await self._sweep(args=[batch_size, self.ttl_ms, self.grace_ms])
+        self.expired += len(released)
+        holds = [self._released_hold(hold_id, result) for hold_id, *result in released]
+        return SweepResult(due, holds, (int(now) - int(float(oldest))) / 1000)
+
+    def _released_hold(self, hold_id: str, result: list) -> SeatHold:
+        show_id, user_id, seats, granted = result
+        if granted:
+            self.granted += len(granted)
+            logger.info('Granted released seats to the waitlist', extra={'hold_id': hold_id, 'entries': granted})
+        return SeatHold(hold_id, int(show_id), user_id, _parse_seats(seats))
+
+    async def extend(self, hold_id: str, user_id: str) -> datetime:
+        result = await self._extend(args=[hold_id, user_id, self.ttl_ms, self.grace_ms, self.max_extensions])
+        if result == 0:
+            raise HoldNotFoundException()
+        if result == -1:
+            raise SeatUnavailableException(message='Hold can not be extended anymore.')
+        return _to_datetime(result)
+
+    async def confirm(self, hold_id: str) -> HoldConfirmation | None:
+        """
+        Mark the seats of a paid hold as sold, `confirmed` is false when some of them have been
+        taken by another hold after this one expired, its remaining seats are released then.
+        Idempotent while the hold record lives, `None` once it is gone.
+        """
+        result = await self._confirm(args=[hold_id, self.ttl_ms, self.grace_ms])
+        if result is None:
+            return None
+        confirmed, show_id, user_id, seats = result
+        return HoldConfirmation(bool(confirmed), SeatHold(hold_id, int(show_id), user_id, _parse_seats(seats)))
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'held': self.held, 'conflicts': self.conflicts, 'released': self.released,
+            'expired': self.expired, 'granted': self.granted,
+        }
+
+
+seat_hold_engine = SeatHoldEngine(
+    redis_connection,
+    seat_map,
+    ttl=settings.SEAT_HOLD_TTL,
+    grace=settings.SEAT_HOLD_GRACE,
+    max_extensions=settings.SEAT_HOLD_MAX_EXTENSIONS,
+)
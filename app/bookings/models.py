@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel, Column, DateTime, String, UniqueConstraint
+from sqlalchemy_utils import ChoiceType
+import sqlalchemy as sa
+
+from ..generics import BaseIntPrimaryKeyModel, BaseUUIDPrimaryModel
+from .enums import IShowSeatStatusEnum, IBookingStatusEnum, IPaymentStatusEnum, IPaymentMethodEnum
+
+
+class BaseShow(SQLModel):
+    movie_id: int | None = Field(default=None, index=True)
+    cinema_hall_id: int | None = Field(default=None, index=True)
+    start_time: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    end_time: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    total_seats: int = Field(gt=0)
+
+
+class Show(BaseIntPrimaryKeyModel, BaseShow, table=True):
+    __tablename__ = 'shows'
+
+
+class BaseShowSeat(SQLModel):
+    show_id: int = Field(foreign_key='shows.id', index=True)
+    # Position of the seat in the hall of the show, from 0 to `Show.total_seats - 1`.
+    seat_number: int = Field(ge=0)
+    price: float = Field(ge=0)
+    status: IShowSeatStatusEnum = Field(
+        default=IShowSeatStatusEnum.AVAILABLE,
+        sa_column=Column(ChoiceType(IShowSeatStatusEnum, impl=String()), nullable=False),
+    )
+    booking_id: uuid.UUID | None = Field(default=None, foreign_key='bookings.id', index=True)
+
+
+class ShowSeat(BaseIntPrimaryKeyModel, BaseShowSeat, table=True):
+    __tablename__ = 'show_seats'
+    __table_args__ = (UniqueConstraint('show_id', 'seat_number'),)
+
+
+class BaseBooking(SQLModel):
+    user_id: uuid.UUID = Field(foreign_key='users.id', index=True)
+    show_id: int = Field(foreign_key='shows.id', index=True)
+    number_of_seats: int
+    seat_numbers: list[int] = Field(sa_column=Column(sa.ARRAY(sa.Integer), nullable=False))
+    status: IBookingStatusEnum = Field(
+        sa_column=Column(ChoiceType(IBookingStatusEnum, impl=String()), nullable=False),
+    )
+
+
+class Booking(BaseUUIDPrimaryModel, BaseBooking, table=True):
+    """
+    Written once its hold is paid, the id of the booking is the id of the hold.
+    """
+    __tablename__ = 'bookings'
+
+
+class BasePayment(SQLModel):
+    # Id of the hold sent to the payment gateway as `orderId`.
+    order_id: str = Field(index=True)
+    transaction_id: str = Field(unique=True)
+    amount: float
+    result_code: int
+    status: IPaymentStatusEnum = Field(
+        sa_column=Column(ChoiceType(IPaymentStatusEnum, impl=String()), nullable=False),
+    )
+    payment_method: IPaymentMethodEnum = Field(
+        sa_column=Column(ChoiceType(IPaymentMethodEnum, impl=String()), nullable=False),
+    )
+    booking_id: uuid.UUID | None = Field(default=None, foreign_key='bookings.id', index=True)
+
+
+class Payment(BaseIntPrimaryKeyModel, BasePayment, table=True):
+    __tablename__ = 'payments'
@@ -0,0 +1,187 @@
+import uuid
+import logging
+
+from fastapi_async_sqlalchemy import db
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from ..generics.enums import CRUDAction
+from ..generics.outbox import add_outbox_events, change_event
+from .crud import show_crud
+from .enums import IBookingStatusEnum, IPaymentStatusEnum, IPaymentMethodEnum, IShowSeatStatusEnum
+from .exceptions import InvalidPaymentSignatureException
+from .holds import seat_hold_engine, SeatHold
+from .momo import verify_notification
+from .models import Booking, Payment, ShowSeat
+from .schemas import PaymentNotification
+
+
+logger = logging.getLogger(__name__)
+
+REFUND_TOPIC = 'payments.refunds'
+BOOKING_NOTIFICATION_TOPIC = 'bookings.notifications'
+
+
+def refund_event(notification: PaymentNotification, reason: str) -> dict:
+    transaction_id = str(notification.transId)
+    return {
+        'topic': REFUND_TOPIC,
+        'key': notification.orderId,
+        'payload': {
+            'transaction_id': transaction_id,
+            'order_id': notification.orderId,
+            'amount': notification.amount,
+            'reason': reason,
+        },
+    }
+
+
+def booking_event(hold: SeatHold, status: IBookingStatusEnum) -> dict:
+    return {
+        'topic': BOOKING_NOTIFICATION_TOPIC,
+        'key': hold.hold_id,
+        'payload': {
+            'booking_id': str(uuid.UUID(hold.hold_id)),
+            'user_id': hold.user_id,
+            'show_id': hold.show_id,
+            'seat_numbers': hold.seat_numbers,
+            'status': status,
+        },
+    }
+
+
+async def hold_price(hold: SeatHold, db_session: AsyncSession) -> float:
+    return await db_session.scalar(
+        select(func.coalesce(func.sum(ShowSeat.price), 0))
+        .where(ShowSeat.show_id == hold.show_id, ShowSeat.seat_number.in_(hold.seat_numbers))
+    )
+
+
+async def handle_payment_notification(
+    notification: PaymentNotification, db_session: AsyncSession | None = None
+) -> bool:
+    """
+    Record a payment notification and book its hold, in one transaction.
+
+    The notification is deduplicated on `transId` by the unique key of `payments`: a
+    retried notification inserts nothing and returns `False` straight away. A successful
+    payment confirms the hold in redis (idempotent, so a transaction rolled back after it
+    is simply replayed by the gateway's retry), then the booking, its seats and the
+    payment are written with set-based statements. Refunds and emails are not sent here,
+    they are written to the outbox and produced to Kafka by the outbox relay.
+
+    Notifications not signed with our MoMo secret key are rejected. A successful payment
+    whose amount is not the price of its hold (while the hold lives, an expired hold is
+    refunded whatever was paid) is recorded as refunding and refunded, its hold is left to
+    expire.
+    """
+    db_session = db_session or db.session
+    transaction_id = str(notification.transId)
+    extra = {'order_id': notification.orderId, 'transaction_id': transaction_id}
+    if not verify_notification(notification):
+        logger.warning('Payment notification has an invalid signature', extra=extra)
+        raise InvalidPaymentSignatureException()
+    succeeded = notification.resultCode == 0
+    mismatched = False
+    if succeeded:
+        hold = await seat_hold_engine.get(notification.orderId)
+        if hold is not None:
+            price = await hold_price(hold, db_session)
+            mismatched = round(price) != notification.amount
+            if mismatched:
+                logger.error(
+                    'Paid amount does not match the price of the hold',
+                    extra={**extra, 'amount': notification.amount, 'price': price},
+                )
+    if not succeeded:
+        payment_status = IPaymentStatusEnum.FAILED
+    elif mismatched:
+        payment_status = IPaymentStatusEnum.REFUNDING
+    else:
+        payment_status = IPaymentStatusEnum.SUCCEEDED
+    payment_id = await db_session.scalar(
+        insert(Payment)
+        .values(
+            order_id=notification.orderId,
+            transaction_id=transaction_id,
+            amount=notification.amount,
+            result_code=notification.resultCode,
+            status=payment_status,
+            payment_method=IPaymentMethodEnum.MOMO,
+        )
+        .on_conflict_do_nothing(index_elements=[Payment.transaction_id])
+        .returning(Payment.id)
+    )
+    if payment_id is None:
+        await db_session.rollback()
+        logger.info('Payment notification has already been handled', extra=extra)
+        return False
+    if not succeeded:
+        # The hold is left to expire, its seats go back to the waitlist then.
+        await db_session.commit()
+        logger.info('Payment failed', extra={**extra, 'result_code': notification.resultCode})
+        return True
+    if mismatched:
+        # Acknowledged so that the gateway stops retrying, the hold is left to expire.
+        await add_outbox_events(db_session, [refund_event(notification, 'Paid amount does not match the price')])
+        await db_session.commit()
+        return True
+
+    events = []
+    booking_id = None
+    confirmation = await seat_hold_engine.confirm(notification.orderId)
+    if confirmation is None:
+        logger.warning('Refund to user because the hold has expired for too long', extra=extra)
+        payment_status = IPaymentStatusEnum.REFUNDING
+        events.append(refund_event(notification, 'Hold has expired'))
+    else:
+        hold = confirmation.hold
+        booking_status = IBookingStatusEnum.PAID if confirmation.confirmed else IBookingStatusEnum.FAILED
+        booking_id = await db_session.scalar(
+            insert(Booking)
+            .values(
+                id=uuid.UUID(hold.hold_id),
+                user_id=uuid.UUID(hold.user_id),
+                show_id=hold.show_id,
+                number_of_seats=len(hold.seat_numbers),
+                seat_numbers=hold.seat_numbers,
+                status=booking_status,
+            )
+            .on_conflict_do_nothing(index_elements=[Booking.id])
+            .returning(Booking.id)
+        )
+        if booking_id is None:
+            logger.warning('Refund to user because the hold has already been paid', extra=extra)
+            booking_id = uuid.UUID(hold.hold_id)
+            payment_status = IPaymentStatusEnum.REFUNDING
+            events.append(refund_event(notification, 'Hold has already been paid'))
+        elif not confirmation.confirmed:
+            logger.warning(
+                'Refund to user because one of reserved seat has been reserved by others',
+                extra={**extra, 'seat_numbers': hold.seat_numbers}
+            )
+            payment_status = IPaymentStatusEnum.REFUNDING
+            events.append(refund_event(notification, 'Seats have been reserved by others'))
+            events.append(booking_event(hold, booking_status))
+        else:
+            response = await db_session.execute(
+                update(ShowSeat)
+                .where(ShowSeat.show_id == hold.show_id, ShowSeat.seat_number.in_(hold.seat_numbers))
+                .values(status=IShowSeatStatusEnum.RESERVED, booking_id=booking_id)
+            )
+            if response.rowcount != len(hold.seat_numbers):
+                logger.error(
+                    'Booked seats are missing in show seats',
+                    extra={**extra, 'show_id': hold.show_id, 'seat_numbers': hold.seat_numbers}
+                )
+            events.append(booking_event(hold, booking_status))
+            # The seats left of the show changed, for the showtime index.
+            events.append(change_event(show_crud.change_topic, 'shows', CRUDAction.UPDATE, hold.show_id))
+
+    await db_session.execute(
+        update(Payment).where(Payment.id == payment_id).values(booking_id=booking_id, status=payment_status)
+    )
+    await add_outbox_events(db_session, events)
+    await db_session.commit()
+    return True
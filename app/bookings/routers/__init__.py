@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+
+from .v1 import hold_router_v1, show_router_v1, waitlist_router_v1, payment_router_v1
+
+booking_router = APIRouter(prefix='/api', tags=['BOOKING'])
+booking_router.include_router(hold_router_v1, prefix='/v1')
+booking_router.include_router(show_router_v1, prefix='/v1')
+booking_router.include_router(waitlist_router_v1, prefix='/v1')
+booking_router.include_router(payment_router_v1, prefix='/v1')
@@ -0,0 +1,187 @@
+import json
+import dataclasses
+
+from fastapi import APIRouter, status, Depends, Response, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..schemas import (
+    HoldCreate, HoldRead, SeatMapRead, WaitlistEntryCreate, WaitlistEntryRead, PaymentNotification
+)
+from ..holds import seat_hold_engine
+from ..seat_map import seat_map, encode_runs, unpack_states, SEAT_AVAILABLE, SEAT_HELD, SEAT_SOLD
+from ..enums import ISeatMapFormatEnum
+from ..waitlist import waitlist, waitlist_notifier, WaitlistEntry, WAITING
+from ..payments import handle_payment_notification
+from ..exceptions import HoldNotFoundException, WaitlistEntryNotFoundException
+from ...auth import dependences
+from ...generics import settings
+from ...generics.exceptions import DuplicateEntryException
+from ...generics.ratelimit import RateLimiter
+
+hold_router_v1 = APIRouter(prefix='/holds', dependencies=[Depends(dependences.require_authentication)])
+show_router_v1 = APIRouter(prefix='/shows')
+waitlist_router_v1 = APIRouter(prefix='/waitlist', dependencies=[Depends(dependences.require_authentication)])
+payment_router_v1 = APIRouter(prefix='/payment')
+
+
+@hold_router_v1.post(
+    '',
+    status_code=status.HTTP_201_CREATED,
+    response_model=HoldRead,
+    dependencies=[Depends(RateLimiter(times=20, minutes=1))]
+)
+async def hold_seats(new_hold: HoldCreate, user_id = Depends(dependences.get_user_id)):
+    return await seat_hold_engine.hold(new_hold.show_id, new_hold.seat_numbers, str(user_id))
+
+
+@hold_router_v1.get(
+    '/{hold_id}',
+    status_code=status.HTTP_200_OK,
+    response_model=HoldRead
+)
+async def get_hold(hold_id: str, user_id = Depends(dependences.get_user_id)):
+    hold = await seat_hold_engine.get(hold_id)
+    if hold is None or hold.user_id != str(user_id):
+        raise HoldNotFoundException()
+    return hold
+
+
+@hold_router_v1.post(
+    '/{hold_id}/extend',
+    status_code=status.HTTP_200_OK,
+    response_model=HoldRead
+)
+async def extend_hold(hold_id: str, user_id = Depends(dependences.get_user_id)):
+    await seat_hold_engine.extend(hold_id, str(user_id))
+    return await get_hold(hold_id, user_id)
+
+
+@hold_router_v1.delete(
+    '/{hold_id}',
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def release_hold(hold_id: str, user_id = Depends(dependences.get_user_id)):
+    await seat_hold_engine.release(hold_id, str(user_id))
+
+
+@show_router_v1.get(
+    '/{show_id}/seat-map',
+    status_code=status.HTTP_200_OK,
+    response_model=SeatMapRead,
+    responses={200: {'content': {'application/octet-stream': {}}}},
+)
+async def get_seat_map(show_id: int, format: ISeatMapFormatEnum = ISeatMapFormatEnum.runs):
+    """
+    Seat states, 0 available, 1 held and 2 sold, as `[state, length]` runs, or with
+    `format=binary` as the raw bitmap of 2 bits per seat (most significant bits first).
+    """
+    bitmap, total_seats = await seat_map.get(show_id)
+    if format == ISeatMapFormatEnum.binary:
+        return Response(
+            content=bitmap, media_type='application/octet-stream', headers={'X-Total-Seats': str(total_seats)}
+        )
+    states = unpack_states(bitmap, total_seats)
+    return SeatMapRead(
+        show_id=show_id,
+        total_seats=total_seats,
+        available=states.count(SEAT_AVAILABLE),
+        held=states.count(SEAT_HELD),
+        sold=states.count(SEAT_SOLD),
+        runs=encode_runs(states),
+    )
+
+
+@waitlist_router_v1.post(
+    '',
+    status_code=status.HTTP_201_CREATED,
+    response_model=WaitlistEntryRead
+)
+async def join_waitlist(new_entry: WaitlistEntryCreate, user_id = Depends(dependences.get_user_id)):
+    return await waitlist.join(new_entry.show_id, new_entry.quantity, str(user_id))
+
+
+async def get_own_entry(entry_id: str, user_id) -> WaitlistEntry:
+    entry = await waitlist.get(entry_id)
+    if entry is None or entry.user_id != str(user_id):
+        raise WaitlistEntryNotFoundException()
+    return entry
+
+
+@waitlist_router_v1.get(
+    '/{entry_id}',
+    status_code=status.HTTP_200_OK,
+    response_model=WaitlistEntryRead
+)
+async def get_waitlist_entry(
+    entry_id: str,
+    wait: int = Query(0, ge=0, le=settings.WAITLIST_MAX_WAIT),
+    user_id = Depends(dependences.get_user_id),
+):
+    """
+    Long-poll: with `wait`, respond as soon as the entry is granted a hold, or after `wait` seconds.
+    """
+    entry = await get_own_entry(entry_id, user_id)
+    if wait and entry.status == WAITING:
+        async def is_granted():
+            nonlocal entry
+            entry = await get_own_entry(entry_id, user_id)
+            return entry.status != WAITING
+
+        if await waitlist_notifier.wait(entry_id, wait, is_granted):
+            entry = await get_own_entry(entry_id, user_id)
+    return entry
+
+
+@waitlist_router_v1.get(
+    '/{entry_id}/events',
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={200: {'content': {'text/event-stream': {}}}},
+)
+async def stream_waitlist_entry(entry_id: str, request: Request, user_id = Depends(dependences.get_user_id)):
+    """
+    Server-sent events of the entry: its status now, then once it is granted a hold (or
+    dropped), with a comment every `WAITLIST_HEARTBEAT` seconds to keep the connection open.
+    """
+    entry = await get_own_entry(entry_id, user_id)
+
+    async def is_granted():
+        current = await waitlist.get(entry_id)
+        return current is None or current.status != WAITING
+
+    async def events():
+        current = entry
+        yield f'event: status\ndata: {json.dumps(dataclasses.asdict(current))}\n\n'
+        while current.status == WAITING and not await request.is_disconnected():
+            granted = await waitlist_notifier.wait(entry_id, settings.WAITLIST_HEARTBEAT, is_granted)
+            current = await waitlist.get(entry_id)
+            if current is None:
+                yield 'event: expired\ndata: {}\n\n'
+                return
+            if not granted and current.status == WAITING:
+                yield ': heartbeat\n\n'
+                continue
+            yield f'event: status\ndata: {json.dumps(dataclasses.asdict(current))}\n\n'
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+@waitlist_router_v1.delete(
+    '/{entry_id}',
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def leave_waitlist(entry_id: str, user_id = Depends(dependences.get_user_id)):
+    if not await waitlist.cancel(entry_id, str(user_id)):
+        raise DuplicateEntryException(message='Entry has already been granted a hold, release the hold instead')
+
+
+@payment_router_v1.post(
+    '/notify',
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def payment_notify(notification: PaymentNotification):
+    """
+    Called by the payment gateway once the user has paid for the hold `orderId`, possibly
+    several times for the same `transId`. Authenticated by the `signature` of the body.
+    """
+    await handle_payment_notification(notification)
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .models import BaseShow, BaseShowSeat
+from ..generics import settings
+from ..generics.utils.partial import optional
+
+
+class ShowCreate(BaseShow):
+    pass
+
+
+@optional
+class ShowUpdate(BaseShow):
+    pass
+
+
+class ShowRead(BaseShow):
+    id: int
+
+
+class ShowSeatCreate(BaseShowSeat):
+    pass
+
+
+@optional
+class ShowSeatUpdate(BaseShowSeat):
+    pass
+
+
+class HoldCreate(BaseModel):
+    show_id: int
+    seat_numbers: list[int] = Field(min_length=1, max_length=settings.SEAT_HOLD_MAX_SEATS)
+
+
+class HoldRead(BaseModel):
+    hold_id: str
+    show_id: int
+    seat_numbers: list[int]
+    expires_at: datetime | None = None
+
+
+class SeatMapRead(BaseModel):
+    show_id: int
+    total_seats: int
+    available: int
+    held: int
+    sold: int
+    runs: list[tuple[int, int]]
+
+
+class WaitlistEntryCreate(BaseModel):
+    show_id: int
+    quantity: int = Field(ge=1, le=settings.SEAT_HOLD_MAX_SEATS)
+
+
+class WaitlistEntryRead(BaseModel):
+    entry_id: str
+    show_id: int
+    quantity: int
+    status: str
+    position: int | None = None
+    hold_id: str | None = None
+    seat_numbers: list[int] | None = None
+
+
+class PaymentNotification(BaseModel):
+    """
+    Instant payment notification of the gateway, `orderId` is the id of the hold.
+    """
+    model_config = ConfigDict(extra='allow')
+
+    partnerCode: str = ''
+    orderId: str
+    requestId: str = ''
+    # VND, no decimals.
+    amount: int
+    orderInfo: str = ''
+    orderType: str = ''
+    transId: int | str
+    resultCode: int
+    message: str = ''
+    payType: str = ''
+    responseTime: int | str = ''
+    extraData: str = ''
+    signature: str
+
+
+class RefundRequested(BaseModel):
+    transaction_id: str
+    order_id: str
+    amount: float
+    reason: str
@@ -0,0 +1,123 @@
+import logging
+
+import redis.asyncio as redis
+from redis.client import NEVER_DECODE
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+
+from ..generics import redis_connection
+from ..generics.exceptions import NotFoundException
+from .crud import show_crud
+from .enums import IShowSeatStatusEnum
+from .models import ShowSeat
+
+
+logger = logging.getLogger(__name__)
+
+SEAT_MAP_KEY_PREFIX = 'seat_map:'
+SEAT_MAP_SIZE_KEY_PREFIX = 'seat_map_size:'
+
+# 2 bits per seat in `seat_map:<show>`, `BITFIELD u2 #<seat>`.
+SEAT_AVAILABLE = 0
+SEAT_HELD = 1
+SEAT_SOLD = 2
+
+# Marks the sold seats without overwriting the holds taken meanwhile, the map is only
+# usable once `seat_map_size:<show>` exists.
+LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+local ops = {}
+for i = 2, #ARGV do
+    table.insert(ops, 'SET')
+    table.insert(ops, 'u2')
+    table.insert(ops, '#' .. ARGV[i])
+    table.insert(ops, 2)
+end
+if #ops > 0 then
+    redis.call('BITFIELD', KEYS[1], unpack(ops))
+end
+redis.call('SET', KEYS[2], ARGV[1])
+return 1
+"""
+
+_STATES = [tuple((byte >> shift) & 3 for shift in (6, 4, 2, 0)) for byte in range(256)]
+
+
+def unpack_states(bitmap: bytes, total_seats: int) -> list[int]:
+    states = [state for byte in bitmap for state in _STATES[byte]]
+    states.extend([SEAT_AVAILABLE] * (total_seats - len(states)))
+    return states[:total_seats]
+
+
+def encode_runs(states: list[int]) -> list[list[int]]:
+    """
+    Run-length encoding of the seat states, `[[state, length], ...]`.
+    """
+    runs = []
+    for state in states:
+        if runs and runs[-1][0] == state:
+            runs[-1][1] += 1
+        else:
+            runs.append([state, 1])
+    return runs
+
+
+class SeatMap:
+    """
+    Availability of the seats of a show as a redis bitmap of 2 bits per seat: available,
+    held or sold. The hold scripts (`app.bookings.holds`) update it in the same script as
+    the holds themselves, so it is never recomputed from the seats. It is loaded from
+    Postgres only the first time a show is used (or after redis lost it), and served as
+    the raw bitmap or its run-length encoding without building any `ShowSeat`.
+    """
+
+    def __init__(self, connection: redis.Redis):
+        self.redis = connection
+        self._load = connection.register_script(LOAD_SCRIPT)
+
+    @staticmethod
+    def key(show_id: int) -> str:
+        return f'{SEAT_MAP_KEY_PREFIX}{show_id}'
+
+    @staticmethod
+    def size_key(show_id: int) -> str:
+        return f'{SEAT_MAP_SIZE_KEY_PREFIX}{show_id}'
+
+    async def load(self, show_id: int, db_session: AsyncSession | None = None) -> int:
+        db_session = db_session or show_crud.get_db().session
+        show = await show_crud.get(id=show_id, db_session=db_session)
+        if show is None:
+            raise NotFoundException(message='Show does not exist')
+        response = await db_session.execute(
+            select(ShowSeat.seat_number)
+            .where(ShowSeat.show_id == show_id, ShowSeat.status == IShowSeatStatusEnum.RESERVED)
+        )
+        sold = response.scalars().all()
+        await self._load(keys=[self.key(show_id), self.size_key(show_id)], args=[show.total_seats, *sold])
+        logger.info('Loaded seat map', extra={'show_id': show_id, 'sold': len(sold)})
+        return show.total_seats
+
+    async def get(self, show_id: int, db_session: AsyncSession | None = None) -> tuple[bytes, int]:
+        """
+        Raw bitmap of the show, padded to its `total_seats`, and `total_seats`.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self.size_key(show_id))
+            pipe.execute_command('GET', self.key(show_id), **{NEVER_DECODE: True})
+            total_seats, bitmap = await pipe.execute()
+        if total_seats is None:
+            total_seats = await self.load(show_id, db_session)
+            bitmap = await self.redis.execute_command('GET', self.key(show_id), **{NEVER_DECODE: True})
+        total_seats = int(total_seats)
+        size = (total_seats + 3) // 4
+        bitmap = (bitmap or b'')[:size]
+        return bitmap.ljust(size, b'\x00'), total_seats
+
+    async def get_states(self, show_id: int, db_session: AsyncSession | None = None) -> list[int]:
+        bitmap, total_seats = await self.get(show_id, db_session)
+        return unpack_states(bitmap, total_seats)
+
+
+seat_map = SeatMap(redis_connection)
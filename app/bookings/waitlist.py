@@ -0,0 +1,220 @@
+import uuid
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+
+from ..generics import redis_connection, settings
+from .exceptions import WaitlistEntryNotFoundException
+
+
+logger = logging.getLogger(__name__)
+
+WAITLIST_KEY_PREFIX = 'waitlist:'
+WAITLIST_ENTRY_KEY_PREFIX = 'waitlist_entry:'
+WAITLIST_SEQUENCE_KEY = 'waitlist_sequence'
+WAITLIST_GRANT_CHANNEL = 'waitlist_grants'
+
+WAITING = 'waiting'
+GRANTED = 'granted'
+
+# Lua function of the hold scripts (`app.bookings.holds`), run with the seats they have
+# just made available: the entries at the head of the waitlist of the show get a hold on
+# them, in order, as long as the seats they asked for fit in what is left. The head which
+# doesn't fit stops the serving so that nobody behind it overtakes it.
+SERVE_WAITLIST = f"""
+local function serve_waitlist(show_id, freed, ttl, grace)
+    local waitlist_key = '{WAITLIST_KEY_PREFIX}' .. show_id
+    local granted = {{}}
+    while #freed > 0 do
+        local head = redis.call('ZRANGE', waitlist_key, 0, 0)[1]
+        if not head then
+            break
+        end
+        local entry_key = '{WAITLIST_ENTRY_KEY_PREFIX}' .. head
+        local entry = redis.call('HMGET', entry_key, 'user_id', 'quantity')
+        if not entry[1] then
+            redis.call('ZREM', waitlist_key, head)
+        else
+            local quantity = tonumber(entry[2])
+            if quantity > #freed then
+                break
+            end
+            local seats = {{}}
+            for i = 1, quantity do
+                table.insert(seats, table.remove(freed, 1))
+            end
+            create_hold(head, show_id, entry[1], seats, ttl, grace)
+            redis.call('ZREM', waitlist_key, head)
+            redis.call('HSET', entry_key, 'status', '{GRANTED}', 'hold_id', head, 'seats', table.concat(seats, ','))
+            redis.call('PUBLISH', '{WAITLIST_GRANT_CHANNEL}', head)
+            table.insert(granted, head)
+        end
+    end
+    return granted
+end
+"""
+
+JOIN_SCRIPT = f"""
+local sequence = redis.call('INCR', '{WAITLIST_SEQUENCE_KEY}')
+redis.call(
+    'HSET', KEYS[1], 'show_id', ARGV[2], 'user_id', ARGV[3], 'quantity', ARGV[4], 'status', '{WAITING}'
+)
+redis.call('PEXPIRE', KEYS[1], ARGV[5])
+redis.call('ZADD', KEYS[2], sequence, ARGV[1])
+return redis.call('ZRANK', KEYS[2], ARGV[1])
+"""
+
+# Granted entries can't be cancelled anymore, their hold has to be released instead.
+CANCEL_SCRIPT = f"""
+local entry = redis.call('HMGET', KEYS[1], 'show_id', 'user_id', 'status')
+if not entry[1] or entry[2] ~= ARGV[2] then
+    return 0
+end
+if entry[3] ~= '{WAITING}' then
+    return -1
+end
+redis.call('ZREM', ARGV[3] .. entry[1], ARGV[1])
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+@dataclass
+class WaitlistEntry:
+    entry_id: str
+    show_id: int
+    user_id: str
+    quantity: int
+    status: str
+    position: int | None = None
+    hold_id: str | None = None
+    seat_numbers: list[int] | None = None
+
+
+class Waitlist:
+    """
+    First come, first served waitlist of the shows for seats released by expired or
+    released holds.
+
+    Entries are ordered by a global sequence in the sorted set `waitlist:<show>`. The hold
+    scripts hand the seats they release straight to the head of the queue as a new hold
+    (whose id is the entry id), so waiting buyers don't have to race everybody polling the
+    seat map, and publish the entry id on `waitlist_grants`. Entries not served within
+    `entry_ttl` seconds are dropped.
+    """
+
+    def __init__(self, connection: redis.Redis, entry_ttl: int):
+        self.redis = connection
+        self.entry_ttl_ms = entry_ttl * 1000
+        self._join = connection.register_script(JOIN_SCRIPT)
+        self._cancel = connection.register_script(CANCEL_SCRIPT)
+
+    @staticmethod
+    def key(show_id: int) -> str:
+        return f'{WAITLIST_KEY_PREFIX}{show_id}'
+
+    @staticmethod
+    def entry_key(entry_id: str) -> str:
+        return f'{WAITLIST_ENTRY_KEY_PREFIX}{entry_id}'
+
+    async def join(self, show_id: int, quantity: int, user_id: str) -> WaitlistEntry:
+        entry_id = uuid.uuid4().hex
+        position = await self._join(
+            keys=[self.entry_key(entry_id), self.key(show_id)],
+            args=[entry_id, show_id, user_id, quantity, self.entry_ttl_ms],
+        )
+        return WaitlistEntry(entry_id, show_id, user_id, quantity, WAITING, position)
+
+    async def get(self, entry_id: str) -> WaitlistEntry | None:
+        entry = await self.redis.hgetall(self.entry_key(entry_id))
+        if not entry:
+            return None
+        position = None
+        if entry['status'] == WAITING:
+            position = await self.redis.zrank(self.key(entry['show_id']), entry_id)
+        seats = entry.get('seats')
+        return WaitlistEntry(
+            entry_id, int(entry['show_id']), entry['user_id'], int(entry['quantity']), entry['status'],
+            position, entry.get('hold_id'), [int(seat) for seat in seats.split(',')] if seats else None
+        )
+
+    async def cancel(self, entry_id: str, user_id: str) -> bool:
+        """
+        `False` when the entry has already been granted a hold.
+        """
+        result = await self._cancel(
+            keys=[self.entry_key(entry_id)], args=[entry_id, user_id, WAITLIST_KEY_PREFIX]
+        )
+        if result == 0:
+            raise WaitlistEntryNotFoundException()
+        return result == 1
+
+
+class WaitlistNotifier:
+    """
+    One subscription to `waitlist_grants` per process, waking up the requests waiting for
+    their entry (long-poll and SSE) instead of a redis connection per waiting client.
+    """
+
+    def __init__(self, connection: redis.Redis):
+        self.redis = connection
+        self.waiters: dict[str, set[asyncio.Event]] = defaultdict(set)
+        self._pubsub = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(WAITLIST_GRANT_CHANNEL)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.close()
+
+    async def _run(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    for event in self.waiters.get(message['data'], ()):
+                        event.set()
+            except redis.ConnectionError:
+                logger.exception('Lost the waitlist subscription')
+                await asyncio.sleep(1)
+
+    async def wait(self, entry_id: str, timeout: float, is_granted) -> bool:
+        """
+        Wait up to `timeout` seconds for the entry to be granted. `is_granted` is checked
+        once subscribed, so a grant published just before isn't missed.
+        """
+        event = asyncio.Event()
+        self.waiters[entry_id].add(event)
+        try:
+            if await is_granted():
+                return True
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiters[entry_id].discard(event)
+            if not self.waiters[entry_id]:
+                del self.waiters[entry_id]
+
+    @property
+    def stats(self) -> dict:
+        return {'entries': len(self.waiters), 'waiters': sum(len(events) for events in self.waiters.values())}
+
+
+waitlist = Waitlist(redis_connection, entry_ttl=settings.WAITLIST_ENTRY_TTL)
+waitlist_notifier = WaitlistNotifier(redis_connection)
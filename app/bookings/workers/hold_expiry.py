@@ -0,0 +1,50 @@
+"""
+Release the seats of the holds whose timer expired, driven by redis keyspace notifications.
+
+    python -m app.bookings.workers.hold_expiry
+"""
+import asyncio
+import logging
+
+from redis.exceptions import ResponseError
+
+from ...generics import redis_connection, settings
+from ..holds import seat_hold_engine, HOLD_TIMER_KEY_PREFIX
+
+
+logger = logging.getLogger(__name__)
+
+
+async def listen_hold_expiry():
+    try:
+        # Managed redis may not allow CONFIG, `notify-keyspace-events` has to contain `Ex` then.
+        await redis_connection.config_set('notify-keyspace-events', 'Ex')
+    except ResponseError:
+        logger.warning('Can not enable keyspace notifications, make sure they are configured')
+
+    pubsub = redis_connection.pubsub()
+    await pubsub.subscribe(f'__keyevent@{settings.REDIS_DB}__:expired')
+    logger.info("Worker's ready to release expired holds!")
+    try:
+        async for message in pubsub.listen():
+            if message['type'] != 'message' or not message['data'].startswith(HOLD_TIMER_KEY_PREFIX):
+                continue
+            hold_id = message['data'][len(HOLD_TIMER_KEY_PREFIX):]
+            try:
+                hold = await seat_hold_engine.expire(hold_id)
+            except Exception:
+                logger.exception('Can not release expired hold', extra={'hold_id': hold_id})
+                continue
+            if hold is not None:
+                logger.info('Released expired hold', extra={
+                    'hold_id': hold_id, 'show_id': hold.show_id, 'seat_numbers': hold.seat_numbers
+                })
+    finally:
+        await pubsub.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(listen_hold_expiry())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,101 @@
+"""
+Release the holds past their expiry in batches, by range scans of `holds:expiry`.
+
+    python -m app.bookings.workers.hold_sweeper
+"""
+import time
+import asyncio
+import logging
+
+from ...generics import redis_connection, settings
+from ..holds import seat_hold_engine, SeatHoldEngine, HOLD_EXPIRY_KEY
+
+
+logger = logging.getLogger(__name__)
+
+SWEEPER_STATS_KEY = 'holds:sweeper'
+
+
+class HoldSweeper:
+    """
+    Runs `SeatHoldEngine.sweep` every `interval` seconds, and straight away again while
+    full batches are due, so that a burst of expiries at the end of an on-sale is drained
+    at the speed of redis rather than one job per hold. It doesn't rely on keyspace
+    notifications, which are lost while the listener is down, so it can run alone or next
+    to `app.bookings.workers.hold_expiry`.
+
+    The lag of the last sweep (how late the oldest due hold was released) and the counters
+    are written to the `holds:sweeper` hash for `/internal/hold-sweeper`.
+    """
+
+    def __init__(self, engine: SeatHoldEngine, interval: float, batch_size: int):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self.sweeps = 0
+        self.released = 0
+        self.lag = 0.0
+        self.duration = 0.0
+
+    async def sweep(self) -> int:
+        started = time.perf_counter()
+        result = await self.engine.sweep(self.batch_size)
+        self.duration = time.perf_counter() - started
+        self.sweeps += 1
+        self.released += len(result.released)
+        self.lag = result.lag if result.due else 0.0
+        if result.released:
+            logger.info('Released expired holds', extra={
+                'released': len(result.released), 'due': result.due, 'lag': result.lag
+            })
+        await self.engine.redis.hset(SWEEPER_STATS_KEY, mapping={
+            'sweeps': self.sweeps, 'released': self.released, 'lag': self.lag,
+            'duration': self.duration, 'swept_at': time.time(),
+        })
+        return result.due
+
+    async def run(self):
+        logger.info("Worker's ready to sweep expired holds!")
+        while True:
+            try:
+                due = await self.sweep()
+            except Exception:
+                logger.exception('Can not sweep expired holds')
+                due = 0
+            if due < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+
+async def get_sweeper_stats() -> dict:
+    """
+    Stats of the last sweep and the current backlog of `holds:expiry`.
+    """
+    now = time.time()
+    async with redis_connection.pipeline(transaction=False) as pipe:
+        pipe.hgetall(SWEEPER_STATS_KEY)
+        pipe.zcount(HOLD_EXPIRY_KEY, '-inf', int(now * 1000))
+        pipe.zrange(HOLD_EXPIRY_KEY, 0, 0, withscores=True)
+        stats, backlog, oldest = await pipe.execute()
+    stats = {key: float(value) for key, value in stats.items()}
+    stats['backlog'] = backlog
+    stats['backlog_lag'] = max(now - oldest[0][1] / 1000, 0.0) if backlog else 0.0
+    if 'swept_at' in stats:
+        stats['since_last_sweep'] = now - stats['swept_at']
+    return stats
+
+
+async def main():
+    sweeper = HoldSweeper(
+        seat_hold_engine, interval=settings.HOLD_SWEEP_INTERVAL, batch_size=settings.HOLD_SWEEP_BATCH_SIZE
+    )
+    try:
+        await sweeper.run()
+    finally:
+        await redis_connection.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
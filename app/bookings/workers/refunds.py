@@ -0,0 +1,113 @@
+"""
+Refund the payments whose hold could not be booked, from the `payments.refunds` outbox topic.
+
+    python -m app.bookings.workers.refunds
+"""
+import logging
+
+import aiohttp
+from sqlalchemy import update
+
+from ...generics import async_session, settings
+from ...generics.pkg.kafka import AsyncHandlingMessageCallback
+from ...generics.workers.consumers import AppAsyncKafkaConsumer
+from ..enums import IPaymentStatusEnum
+from ..momo import sign
+from ..models import Payment
+from ..payments import REFUND_TOPIC
+from ..schemas import RefundRequested
+
+
+logger = logging.getLogger(__name__)
+
+
+class RefundFailedException(Exception):
+    pass
+
+
+class MomoRefundClient:
+    """
+    Client of the refund API of MoMo with one pooled session per process. The transaction id
+    is used as the `requestId`, so a refund retried by the consumer is a duplicate for MoMo.
+    """
+
+    def __init__(self, url: str, partner_code: str, access_key: str, secret_key: str):
+        self.url = url
+        self.partner_code = partner_code
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self._session: aiohttp.ClientSession | None = None
+
+    async def refund(self, refund: RefundRequested) -> dict:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        params = {
+            'accessKey': self.access_key,
+            'amount': int(refund.amount),
+            'description': refund.reason,
+            'orderId': f'refund-{refund.transaction_id}',
+            'partnerCode': self.partner_code,
+            'requestId': refund.transaction_id,
+            'transId': refund.transaction_id,
+        }
+        body = {**params, 'lang': 'en', 'signature': sign(params, self.secret_key)}
+        del body['accessKey']
+        async with self._session.post(self.url, json=body) as response:
+            result = await response.json()
+        if result.get('resultCode') != 0:
+            raise RefundFailedException(
+                f"Refund failed with result code {result.get('resultCode')}: {result.get('message')}"
+            )
+        return result
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+momo_refund_client = MomoRefundClient(
+    settings.MOMO_REFUND_URL,
+    partner_code=settings.MOMO_PARTNER_CODE,
+    access_key=settings.MOMO_ACCESS_KEY,
+    secret_key=settings.MOMO_SECRET_KEY,
+)
+
+
+class RefundCallback(AsyncHandlingMessageCallback):
+    message_model = RefundRequested
+
+    async def handle_message(self):
+        refund = self.message
+        await momo_refund_client.refund(refund)
+        async with async_session() as db_session:
+            await db_session.execute(
+                update(Payment)
+                .where(Payment.transaction_id == refund.transaction_id)
+                .values(status=IPaymentStatusEnum.REFUNDED)
+            )
+            await db_session.commit()
+        logger.info('Refunded payment', extra={'transaction_id': refund.transaction_id, 'reason': refund.reason})
+
+
+class RefundConsumer(AppAsyncKafkaConsumer):
+    callback = RefundCallback
+    topics = [REFUND_TOPIC]
+    consumer_config = {
+        'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+        'group.id': 'refunds',
+        'auto.offset.reset': 'earliest',
+    }
+    producer_config = {
+        'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+    }
+    retry_delays = [10, 60, 300]
+    dead_letter = True
+    max_concurrency = 16
+
+    async def on_shutdown(self):
+        await momo_refund_client.close()
+        await super().on_shutdown()
+
+
+if __name__ == '__main__':
+    RefundConsumer().start_consume()
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import logging
+from collections import defaultdict
+
+from ..generics import settings
+from .movies import MovieSuggestIndex, fold, movie_suggest_index, suggest_inputs
+from .schemas import MovieSuggestion
+
+
+logger = logging.getLogger(__name__)
+
+
+class MovieAutocomplete:
+    """
+    Movie title suggestions of a prefix, in a city or anywhere.
+
+    Prefixes of up to `hot_prefix_length` characters, most of the keystrokes, are answered
+    from a table of the `top_k` movies of every such prefix per city, built in memory from
+    the whole `movies` index every `refresh_interval` seconds. Longer prefixes go to the
+    completion suggester, concurrent identical ones sharing a call. Until the first build
+    succeeds, every prefix goes to the suggester.
+    """
+
+    def __init__(self, index: MovieSuggestIndex, hot_prefix_length: int, top_k: int, refresh_interval: float):
+        self.index = index
+        self.hot_prefix_length = hot_prefix_length
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self.hot: dict[tuple[int | None, str], list[MovieSuggestion]] | None = None
+        self.refreshed_at: float | None = None
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._task: asyncio.Task | None = None
+        self.hot_hits = 0
+        self.suggester_calls = 0
+        self.coalesced = 0
+
+    def hot_prefixes(self, title: str) -> set[str]:
+        return {
+            prefix
+            for text in suggest_inputs(title)
+            for length in range(1, self.hot_prefix_length + 1)
+            if (prefix := text[:length].rstrip()) and len(prefix) == length
+        }
+
+    async def build(self) -> dict[tuple[int | None, str], list[MovieSuggestion]]:
+        """
+        The top movies by upcoming shows of each hot prefix, per city and overall (`None`),
+        as the completion suggester ranks them.
+        """
+        candidates = defaultdict(list)
+        async for document in self.index.scan():
+            suggestion = MovieSuggestion(movie_id=document.movie_id, title=document.title)
+            rank = (-document.upcoming_shows, fold(document.title), document.movie_id)
+            for prefix in self.hot_prefixes(document.title):
+                for city_id in (None, *document.city_ids):
+                    candidates[city_id, prefix].append((rank, suggestion))
+        return {
+            key: [suggestion for _, suggestion in sorted(ranked, key=lambda item: item[0])[:self.top_k]]
+            for key, ranked in candidates.items()
+        }
+
+    async def refresh(self):
+        started = time.perf_counter()
+        self.hot = await self.build()
+        self.refreshed_at = time.time()
+        logger.info(
+            'Refreshed hot movie prefixes',
+            extra={'prefixes': len(self.hot), 'duration': time.perf_counter() - started},
+        )
+
+    async def suggest(self, prefix: str, city_id: int | None, size: int) -> list[MovieSuggestion]:
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= self.hot_prefix_length and self.hot is not None and size <= self.top_k:
+            self.hot_hits += 1
+            return self.hot.get((city_id, prefix), [])[:size]
+        key = (prefix, city_id, size)
+        task = self._inflight.get(key)
+        if task is None:
+            self.suggester_calls += 1
+            task = asyncio.ensure_future(self.index.suggest(prefix, city_id, size))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                # The previous table, if any, keeps being served.
+                logger.exception('Can not refresh hot movie prefixes')
+            await asyncio.sleep(self.refresh_interval)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'prefixes': len(self.hot) if self.hot is not None else None,
+            'refreshed_at': self.refreshed_at,
+            'hot_hits': self.hot_hits,
+            'suggester_calls': self.suggester_calls,
+            'coalesced': self.coalesced,
+            'inflight': len(self._inflight),
+        }
+
+
+movie_autocomplete = MovieAutocomplete(
+    movie_suggest_index,
+    hot_prefix_length=settings.AUTOCOMPLETE_HOT_PREFIX_LENGTH,
+    top_k=settings.AUTOCOMPLETE_TOP_K,
+    refresh_interval=settings.AUTOCOMPLETE_REFRESH_INTERVAL,
+)
@@ -0,0 +1,28 @@
+from ..generics.crud import CRUDBase, CachedCRUDMixin
+from .models import City, Cinema, CinemaHall, Movie
+from .schemas import (
+    CityCreate, CityUpdate, CinemaCreate, CinemaUpdate, CinemaHallCreate, CinemaHallUpdate,
+    MovieCreate, MovieUpdate
+)
+
+
+class CRUDCity(CachedCRUDMixin, CRUDBase[City, CityCreate, CityUpdate]):
+    change_topic = 'cdc.cities'
+
+
+class CRUDCinema(CachedCRUDMixin, CRUDBase[Cinema, CinemaCreate, CinemaUpdate]):
+    change_topic = 'cdc.cinemas'
+
+
+class CRUDCinemaHall(CachedCRUDMixin, CRUDBase[CinemaHall, CinemaHallCreate, CinemaHallUpdate]):
+    change_topic = 'cdc.cinema_halls'
+
+
+class CRUDMovie(CachedCRUDMixin, CRUDBase[Movie, MovieCreate, MovieUpdate]):
+    change_topic = 'cdc.movies'
+
+
+city_crud = CRUDCity(City)
+cinema_crud = CRUDCinema(Cinema)
+cinema_hall_crud = CRUDCinemaHall(CinemaHall)
+movie_crud = CRUDMovie(Movie)
@@ -0,0 +1,53 @@
+from datetime import date
+
+from sqlmodel import Field, SQLModel, Column, Date
+
+from ..generics import BaseIntPrimaryKeyModel
+
+
+class BaseCity(SQLModel):
+    name: str = Field(max_length=64, index=True)
+    state: str | None = Field(default=None, max_length=64)
+    zip_code: str | None = Field(default=None, max_length=16)
+
+
+class City(BaseIntPrimaryKeyModel, BaseCity, table=True):
+    __tablename__ = 'cities'
+
+
+class BaseCinema(SQLModel):
+    name: str = Field(max_length=64)
+    city_id: int = Field(foreign_key='cities.id', index=True)
+    address: str | None = Field(default=None, max_length=256)
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+    total_cinema_halls: int = Field(default=0, ge=0)
+
+
+class Cinema(BaseIntPrimaryKeyModel, BaseCinema, table=True):
+    __tablename__ = 'cinemas'
+
+
+class BaseCinemaHall(SQLModel):
+    name: str = Field(max_length=64)
+    cinema_id: int = Field(foreign_key='cinemas.id', index=True)
+    total_seats: int = Field(gt=0)
+
+
+class CinemaHall(BaseIntPrimaryKeyModel, BaseCinemaHall, table=True):
+    __tablename__ = 'cinema_halls'
+
+
+class BaseMovie(SQLModel):
+    title: str = Field(max_length=256)
+    description: str | None = Field(default=None, max_length=512)
+    # Minutes.
+    duration: int = Field(gt=0)
+    language: str | None = Field(default=None, max_length=16)
+    release_date: date | None = Field(default=None, sa_column=Column(Date, nullable=True))
+    country: str | None = Field(default=None, max_length=64)
+    genre: str | None = Field(default=None, max_length=20)
+
+
+class Movie(BaseIntPrimaryKeyModel, BaseMovie, table=True):
+    __tablename__ = 'movies'
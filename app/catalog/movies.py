@@ -0,0 +1,192 @@
+import re
+import logging
+import unicodedata
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+
+from ..bookings.models import Show
+from ..generics import async_es, settings
+from .models import Cinema, CinemaHall, Movie
+from .schemas import MovieSuggestDocument, MovieSuggestion
+
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+# Words of a title a suggestion can start from, long titles are found by their first ones.
+MAX_SUGGEST_WORDS = 8
+
+MOVIE_SETTINGS = {
+    'analysis': {
+        'analyzer': {
+            'folding': {'type': 'custom', 'tokenizer': 'standard', 'filter': ['lowercase', 'asciifolding']},
+        },
+    },
+}
+
+MOVIE_MAPPINGS = {
+    'dynamic': 'strict',
+    'properties': {
+        'movie_id': {'type': 'integer'},
+        'title': {'type': 'text', 'analyzer': 'folding'},
+        'city_ids': {'type': 'integer'},
+        'upcoming_shows': {'type': 'integer'},
+        'suggest': {
+            'type': 'completion',
+            'analyzer': 'folding',
+            'contexts': [{'name': 'city', 'type': 'category'}],
+        },
+    },
+}
+
+
+def fold(text: str) -> str:
+    """
+    Lower case without accents, punctuation nor repeated spaces, as the `folding` analyzer
+    does, so that "Đào" is found by "dao" in the index and in the hot prefixes alike.
+    """
+    text = unicodedata.normalize('NFKD', text.lower().replace('đ', 'd'))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', text)).strip()
+
+
+def suggest_inputs(title: str) -> list[str]:
+    """
+    The folded title from each of its words, so that "endg" suggests "Avengers: Endgame".
+    """
+    words = fold(title).split()[:MAX_SUGGEST_WORDS]
+    return list(dict.fromkeys(' '.join(words[index:]) for index in range(len(words))))
+
+
+class MovieSuggestIndex:
+    """
+    `movies` index behind the title autocomplete: a completion field of the titles, weighted
+    by the number of upcoming shows and with the cities of those shows as context, so that
+    the suggestions of a city are the movies playing there, the busiest first.
+
+    Weights and cities are computed when a movie is indexed, shows passing don't update
+    them; the periodic full reindex (`index_movies`) does.
+    """
+
+    def __init__(self, client: AsyncElasticsearch, name: str, shards: int, replicas: int):
+        self.client = client
+        self.name = name
+        self.shards = shards
+        self.replicas = replicas
+
+    async def create(self):
+        if await self.client.indices.exists(index=self.name):
+            return
+        await self.client.indices.create(
+            index=self.name,
+            settings={'number_of_shards': self.shards, 'number_of_replicas': self.replicas, **MOVIE_SETTINGS},
+            mappings=MOVIE_MAPPINGS,
+        )
+        logger.info('Created movie index', extra={'index': self.name})
+
+    @staticmethod
+    def documents_query(movie_ids: list[int] | None = None):
+        """
+        One query building the documents of `movie_ids` (of every movie when `None`).
+        """
+        upcoming = (
+            select(Show.movie_id, Cinema.city_id, func.count().label('shows'))
+            .join(CinemaHall, CinemaHall.id == Show.cinema_hall_id)
+            .join(Cinema, Cinema.id == CinemaHall.cinema_id)
+            .where(Show.start_time > func.now())
+            .group_by(Show.movie_id, Cinema.city_id)
+            .subquery()
+        )
+        query = (
+            select(
+                Movie.id, Movie.title,
+                func.array_remove(func.array_agg(upcoming.c.city_id), None),
+                func.coalesce(func.sum(upcoming.c.shows), 0),
+            )
+            .outerjoin(upcoming, upcoming.c.movie_id == Movie.id)
+            .group_by(Movie.id)
+        )
+        if movie_ids is not None:
+            query = query.where(Movie.id.in_(movie_ids))
+        return query
+
+    @staticmethod
+    def to_document(row) -> MovieSuggestDocument:
+        movie_id, title, city_ids, upcoming_shows = row
+        return MovieSuggestDocument(
+            movie_id=movie_id, title=title, city_ids=sorted(city_ids or []), upcoming_shows=upcoming_shows
+        )
+
+    async def build_documents(self, movie_ids: list[int], db_session: AsyncSession) -> list[MovieSuggestDocument]:
+        response = await db_session.execute(self.documents_query(movie_ids))
+        return [self.to_document(row) for row in response.all()]
+
+    @staticmethod
+    def document_id(document: MovieSuggestDocument) -> int:
+        return document.movie_id
+
+    def action(self, document: MovieSuggestDocument, version: int) -> dict:
+        return {
+            '_index': self.name,
+            '_id': str(document.movie_id),
+            '_source': {
+                **document.model_dump(mode='json'),
+                'suggest': {
+                    'input': suggest_inputs(document.title),
+                    'weight': document.upcoming_shows,
+                    'contexts': {'city': [str(city_id) for city_id in document.city_ids]},
+                },
+            },
+            'version': version,
+            'version_type': 'external_gte',
+        }
+
+    async def delete_missing(self, movie_ids: list[int]) -> int:
+        response = await self.client.delete_by_query(
+            index=self.name, query={'ids': {'values': [str(id) for id in movie_ids]}}, conflicts='proceed'
+        )
+        return response['deleted']
+
+    async def suggest(self, prefix: str, city_id: int | None, size: int) -> list[MovieSuggestion]:
+        completion = {
+            'field': 'suggest',
+            # A movie matches by several of its inputs, the duplicates are dropped below.
+            'size': size * 3,
+        }
+        if city_id is not None:
+            completion['contexts'] = {'city': [str(city_id)]}
+        if len(prefix) >= 4:
+            completion['fuzzy'] = {'fuzziness': 'AUTO'}
+        response = await self.client.search(
+            index=self.name,
+            suggest={'titles': {'prefix': prefix, 'completion': completion}},
+            source=['movie_id', 'title'],
+        )
+        items = {}
+        for option in response['suggest']['titles'][0]['options']:
+            source = option['_source']
+            items.setdefault(source['movie_id'], MovieSuggestion(movie_id=source['movie_id'], title=source['title']))
+        return list(items.values())[:size]
+
+    async def scan(self):
+        """
+        Every document of the index, without the completion inputs.
+        """
+        async for hit in async_scan(
+            self.client, index=self.name, query={'query': {'match_all': {}}},
+            _source=['movie_id', 'title', 'city_ids', 'upcoming_shows'],
+        ):
+            yield MovieSuggestDocument.model_validate(hit['_source'])
+
+
+movie_suggest_index = MovieSuggestIndex(
+    async_es,
+    name=settings.MOVIE_INDEX,
+    shards=settings.MOVIE_INDEX_SHARDS,
+    replicas=settings.MOVIE_INDEX_REPLICAS,
+)
@@ -0,0 +1,7 @@
+from fastapi import APIRouter
+
+from .v1 import showtime_router_v1, movie_router_v1
+
+catalog_router = APIRouter(prefix='/api', tags=['CATALOG'])
+catalog_router.include_router(showtime_router_v1, prefix='/v1')
+catalog_router.include_router(movie_router_v1, prefix='/v1')
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from fastapi import APIRouter, status, Query
+
+from ..autocomplete import movie_autocomplete
+from ..schemas import ShowtimeSearchRead, MovieAutocompleteRead
+from ..showtimes import showtime_index
+from ...generics.exceptions import InvalidRequestException
+
+showtime_router_v1 = APIRouter(prefix='/showtimes')
+movie_router_v1 = APIRouter(prefix='/movies')
+
+
+@showtime_router_v1.get(
+    '/search',
+    status_code=status.HTTP_200_OK,
+    response_model=ShowtimeSearchRead
+)
+async def search_showtimes(
+    city_id: int,
+    movie_id: int | None = None,
+    cinema_id: int | None = None,
+    lat: float | None = Query(None, ge=-90, le=90),
+    lon: float | None = Query(None, ge=-180, le=180),
+    distance: str | None = Query(None, pattern=r'^\d+(\.\d+)?(m|km)$', description='e.g. `5km`'),
+    start_from: datetime | None = None,
+    start_to: datetime | None = None,
+    available_only: bool = True,
+    size: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+):
+    if (lat is None) != (lon is None):
+        raise InvalidRequestException(message='`lat` and `lon` go together')
+    if distance is not None and lat is None:
+        raise InvalidRequestException(message='`distance` requires `lat` and `lon`')
+    return await showtime_index.search(
+        city_id=city_id, movie_id=movie_id, cinema_id=cinema_id, lat=lat, lon=lon, distance=distance,
+        start_from=start_from, start_to=start_to, available_only=available_only, size=size, offset=offset,
+    )
+
+
+@movie_router_v1.get(
+    '/autocomplete',
+    status_code=status.HTTP_200_OK,
+    response_model=MovieAutocompleteRead
+)
+async def autocomplete_movies(
+    q: str = Query(min_length=1, max_length=64),
+    city_id: int | None = None,
+    size: int = Query(10, ge=1, le=20),
+):
+    return MovieAutocompleteRead(items=await movie_autocomplete.suggest(q, city_id, size))
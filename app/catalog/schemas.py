@@ -0,0 +1,102 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from .models import BaseCity, BaseCinema, BaseCinemaHall, BaseMovie
+from ..generics.utils.partial import optional
+
+
+class CityCreate(BaseCity):
+    pass
+
+
+@optional
+class CityUpdate(BaseCity):
+    pass
+
+
+class CinemaCreate(BaseCinema):
+    pass
+
+
+@optional
+class CinemaUpdate(BaseCinema):
+    pass
+
+
+class CinemaHallCreate(BaseCinemaHall):
+    pass
+
+
+@optional
+class CinemaHallUpdate(BaseCinemaHall):
+    pass
+
+
+class MovieCreate(BaseMovie):
+    pass
+
+
+@optional
+class MovieUpdate(BaseMovie):
+    pass
+
+
+class GeoPoint(BaseModel):
+    lat: float
+    lon: float
+
+
+class ShowtimeDocument(BaseModel):
+    """
+    Document of the `showtimes` index, one per show, routed by `city_id`.
+    """
+    show_id: int
+    movie_id: int
+    movie_title: str
+    cinema_id: int
+    cinema_name: str
+    cinema_hall_id: int
+    city_id: int
+    city_name: str
+    location: GeoPoint
+    start_time: datetime
+    end_time: datetime
+    total_seats: int
+    seats_left: int
+
+
+class ShowtimeHit(ShowtimeDocument):
+    # Meters from the point of the search, when there is one.
+    distance: float | None = None
+
+
+class FacetBucket(BaseModel):
+    key: int | str
+    label: str | None = None
+    count: int
+
+
+class ShowtimeSearchRead(BaseModel):
+    total: int
+    items: list[ShowtimeHit]
+    facets: dict[str, list[FacetBucket]]
+
+
+class MovieSuggestDocument(BaseModel):
+    """
+    Document of the `movies` index, one per movie, with the cities it has upcoming shows in.
+    """
+    movie_id: int
+    title: str
+    city_ids: list[int]
+    upcoming_shows: int
+
+
+class MovieSuggestion(BaseModel):
+    movie_id: int
+    title: str
+
+
+class MovieAutocompleteRead(BaseModel):
+    items: list[MovieSuggestion]
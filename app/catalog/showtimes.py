@@ -0,0 +1,250 @@
+import logging
+from datetime import datetime
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+
+from ..bookings.enums import IShowSeatStatusEnum
+from ..bookings.models import Show, ShowSeat
+from ..generics import async_es, settings
+from .models import City, Cinema, CinemaHall, Movie
+from .schemas import ShowtimeDocument, ShowtimeHit, ShowtimeSearchRead, FacetBucket, GeoPoint
+
+
+logger = logging.getLogger(__name__)
+
+SHOWTIME_MAPPINGS = {
+    'dynamic': 'strict',
+    'properties': {
+        'show_id': {'type': 'integer'},
+        'movie_id': {'type': 'integer'},
+        'movie_title': {'type': 'text', 'fields': {'keyword': {'type': 'keyword'}}},
+        'cinema_id': {'type': 'integer'},
+        'cinema_name': {'type': 'text', 'fields': {'keyword': {'type': 'keyword'}}},
+        'cinema_hall_id': {'type': 'integer'},
+        'city_id': {'type': 'integer'},
+        'city_name': {'type': 'keyword'},
+        'location': {'type': 'geo_point'},
+        'start_time': {'type': 'date'},
+        'end_time': {'type': 'date'},
+        'total_seats': {'type': 'integer'},
+        'seats_left': {'type': 'integer'},
+    },
+}
+
+
+class ShowtimeIndex:
+    """
+    Denormalized `showtimes` index: one document per show carrying its movie, cinema
+    (with its location) and city, so that "cinemas running this movie near me" is a single
+    search instead of a join of five tables.
+
+    Documents are routed by `city_id`, a search always filters on a city and only hits the
+    shard of that city.
+    """
+
+    def __init__(self, client: AsyncElasticsearch, name: str, shards: int, replicas: int):
+        self.client = client
+        self.name = name
+        self.shards = shards
+        self.replicas = replicas
+
+    async def create(self):
+        if await self.client.indices.exists(index=self.name):
+            return
+        await self.client.indices.create(
+            index=self.name,
+            settings={'number_of_shards': self.shards, 'number_of_replicas': self.replicas},
+            mappings={**SHOWTIME_MAPPINGS, '_routing': {'required': True}},
+        )
+        logger.info('Created showtime index', extra={'index': self.name})
+
+    @staticmethod
+    def routing(city_id: int) -> str:
+        return str(city_id)
+
+    @staticmethod
+    def documents_query(show_ids: list[int] | None = None):
+        """
+        One query building the documents of `show_ids` (of every show when `None`), the seats
+        left being the seats of the show not reserved.
+        """
+        reserved = (
+            select(ShowSeat.show_id, func.count().label('reserved'))
+            .where(ShowSeat.status == IShowSeatStatusEnum.RESERVED)
+            .group_by(ShowSeat.show_id)
+            .subquery()
+        )
+        query = (
+            select(
+                Show.id, Show.movie_id, Movie.title, Cinema.id, Cinema.name, Show.cinema_hall_id,
+                City.id, City.name, Cinema.lat, Cinema.lon, Show.start_time, Show.end_time,
+                Show.total_seats, func.coalesce(reserved.c.reserved, 0),
+            )
+            .join(Movie, Movie.id == Show.movie_id)
+            .join(CinemaHall, CinemaHall.id == Show.cinema_hall_id)
+            .join(Cinema, Cinema.id == CinemaHall.cinema_id)
+            .join(City, City.id == Cinema.city_id)
+            .outerjoin(reserved, reserved.c.show_id == Show.id)
+        )
+        if show_ids is not None:
+            query = query.where(Show.id.in_(show_ids))
+        return query
+
+    @staticmethod
+    def to_document(row) -> ShowtimeDocument:
+        (
+            show_id, movie_id, movie_title, cinema_id, cinema_name, cinema_hall_id, city_id, city_name,
+            lat, lon, start_time, end_time, total_seats, reserved,
+        ) = row
+        return ShowtimeDocument(
+            show_id=show_id, movie_id=movie_id, movie_title=movie_title, cinema_id=cinema_id,
+            cinema_name=cinema_name, cinema_hall_id=cinema_hall_id, city_id=city_id, city_name=city_name,
+            location=GeoPoint(lat=lat, lon=lon), start_time=start_time, end_time=end_time,
+            total_seats=total_seats, seats_left=total_seats - reserved,
+        )
+
+    async def build_documents(self, show_ids: list[int], db_session: AsyncSession) -> list[ShowtimeDocument]:
+        response = await db_session.execute(self.documents_query(show_ids))
+        return [self.to_document(row) for row in response.all()]
+
+    @staticmethod
+    def document_id(document: ShowtimeDocument) -> int:
+        return document.show_id
+
+    def action(self, document: ShowtimeDocument, version: int) -> dict:
+        return {
+            '_index': self.name,
+            '_id': str(document.show_id),
+            '_routing': self.routing(document.city_id),
+            '_source': document.model_dump(mode='json'),
+            'version': version,
+            'version_type': 'external_gte',
+        }
+
+    async def delete_missing(self, show_ids: list[int]) -> int:
+        # Their city is unknown, so they are deleted across the shards.
+        response = await self.client.delete_by_query(
+            index=self.name, query={'terms': {'show_id': show_ids}}, conflicts='proceed'
+        )
+        return response['deleted']
+
+    async def index(self, document: ShowtimeDocument):
+        await self.client.index(
+            index=self.name,
+            id=str(document.show_id),
+            routing=self.routing(document.city_id),
+            document=document.model_dump(mode='json'),
+        )
+
+    async def delete(self, show_id: int, city_id: int):
+        try:
+            await self.client.delete(index=self.name, id=str(show_id), routing=self.routing(city_id))
+        except NotFoundError:
+            pass
+
+    async def search(
+        self,
+        *,
+        city_id: int,
+        movie_id: int | None = None,
+        cinema_id: int | None = None,
+        lat: float | None = None,
+        lon: float | None = None,
+        distance: str | None = None,
+        start_from: datetime | None = None,
+        start_to: datetime | None = None,
+        available_only: bool = True,
+        size: int = 20,
+        offset: int = 0,
+    ) -> ShowtimeSearchRead:
+        """
+        Showtimes of a city, the closest cinemas first when a point is given (within
+        `distance` when given), then by start time. Facets count the matching showtimes by
+        movie, cinema and day; each facet ignores its own filter so that its other values
+        stay selectable.
+        """
+        filters = [{'term': {'city_id': city_id}}]
+        if start_from is not None or start_to is not None:
+            time_range = {}
+            if start_from is not None:
+                time_range['gte'] = start_from.isoformat()
+            if start_to is not None:
+                time_range['lt'] = start_to.isoformat()
+            filters.append({'range': {'start_time': time_range}})
+        if available_only:
+            filters.append({'range': {'seats_left': {'gt': 0}}})
+        point = {'lat': lat, 'lon': lon} if lat is not None and lon is not None else None
+        if point is not None and distance is not None:
+            filters.append({'geo_distance': {'distance': distance, 'location': point}})
+        movie_filter = {'term': {'movie_id': movie_id}} if movie_id is not None else None
+        cinema_filter = {'term': {'cinema_id': cinema_id}} if cinema_id is not None else None
+
+        sort = [{'start_time': 'asc'}, {'show_id': 'asc'}]
+        if point is not None:
+            sort.insert(0, {'_geo_distance': {'location': point, 'order': 'asc', 'unit': 'm'}})
+
+        def facet(field: str, label: str | None, *excluded) -> dict:
+            aggregation = {'terms': {'field': field, 'size': settings.SHOWTIME_FACET_SIZE}}
+            if label is not None:
+                aggregation['aggs'] = {'label': {'top_hits': {'size': 1, '_source': [label]}}}
+            post = [f for f in (movie_filter, cinema_filter) if f is not None and f not in excluded]
+            return {'filter': {'bool': {'filter': post}}, 'aggs': {'values': aggregation}}
+
+        response = await self.client.search(
+            index=self.name,
+            routing=self.routing(city_id),
+            query={'bool': {'filter': filters}},
+            post_filter={'bool': {'filter': [f for f in (movie_filter, cinema_filter) if f is not None]}},
+            sort=sort,
+            size=size,
+            from_=offset,
+            track_total_hits=True,
+            aggs={
+                'movies': facet('movie_id', 'movie_title', movie_filter),
+                'cinemas': facet('cinema_id', 'cinema_name', cinema_filter),
+                'days': {
+                    'filter': {'bool': {'filter': [f for f in (movie_filter, cinema_filter) if f is not None]}},
+                    'aggs': {'values': {'date_histogram': {
+                        'field': 'start_time', 'calendar_interval': 'day',
+                        'time_zone': settings.SHOWTIME_TIME_ZONE, 'min_doc_count': 1,
+                    }}},
+                },
+            },
+        )
+        items = []
+        for hit in response['hits']['hits']:
+            item = ShowtimeHit.model_validate(hit['_source'])
+            if point is not None:
+                item.distance = hit['sort'][0]
+            items.append(item)
+
+        def buckets(name: str, label: str | None = None) -> list[FacetBucket]:
+            return [
+                FacetBucket(
+                    key=bucket.get('key_as_string', bucket['key']),
+                    label=bucket['label']['hits']['hits'][0]['_source'][label] if label else None,
+                    count=bucket['doc_count'],
+                )
+                for bucket in response['aggregations'][name]['values']['buckets']
+            ]
+
+        return ShowtimeSearchRead(
+            total=response['hits']['total']['value'],
+            items=items,
+            facets={
+                'movies': buckets('movies', 'movie_title'),
+                'cinemas': buckets('cinemas', 'cinema_name'),
+                'days': buckets('days'),
+            },
+        )
+
+
+showtime_index = ShowtimeIndex(
+    async_es,
+    name=settings.SHOWTIME_INDEX,
+    shards=settings.SHOWTIME_INDEX_SHARDS,
+    replicas=settings.SHOWTIME_INDEX_REPLICAS,
+)
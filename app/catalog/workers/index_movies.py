@@ -0,0 +1,52 @@
+"""
+Create the `movies` index and index every movie into it, with its upcoming shows counted
+at the time of the run. Run it periodically so that shows passing are reflected in the
+suggestions; like `index_showtimes` it can run while the `search_indexer` consumes.
+
+    python -m app.catalog.workers.index_movies
+"""
+import asyncio
+import logging
+
+from elasticsearch.helpers import async_bulk
+from sqlalchemy import func
+from sqlmodel import select
+
+from ...generics import async_es, async_session, engine, settings
+from ...generics.models import OutboxEvent
+from ..movies import movie_suggest_index
+
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_actions(version: int):
+    async with async_session() as db_session:
+        result = await db_session.stream(
+            movie_suggest_index.documents_query().execution_options(yield_per=settings.SHOWTIME_REINDEX_CHUNK_SIZE)
+        )
+        async for row in result:
+            yield movie_suggest_index.action(movie_suggest_index.to_document(row), version)
+
+
+async def main():
+    try:
+        await movie_suggest_index.create()
+        async with async_session() as db_session:
+            version = (await db_session.execute(select(func.coalesce(func.max(OutboxEvent.id), 0)))).scalar_one()
+        indexed, errors = await async_bulk(
+            async_es, generate_actions(version), chunk_size=settings.SHOWTIME_REINDEX_CHUNK_SIZE,
+            raise_on_error=False,
+        )
+        conflicts = sum(1 for error in errors if next(iter(error.values())).get('status') == 409)
+        logger.info(
+            'Indexed movies',
+            extra={'indexed': indexed, 'conflicts': conflicts, 'errors': len(errors) - conflicts},
+        )
+    finally:
+        await async_es.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""
+Create the `showtimes` index and index every show into it.
+
+Documents are versioned with the last outbox event id at the start of the run, the same
+versions the change events are indexed with (`search_indexer`), so the reindex can run
+while the indexer consumes: whichever of them has seen the latest change of a show wins.
+
+    python -m app.catalog.workers.index_showtimes
+"""
+import asyncio
+import logging
+
+from elasticsearch.helpers import async_bulk
+from sqlalchemy import func
+from sqlmodel import select
+
+from ...generics import async_es, async_session, engine, settings
+from ...generics.models import OutboxEvent
+from ..showtimes import showtime_index
+
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_actions(version: int):
+    # Streamed with a server side cursor, the shows are never all in memory.
+    async with async_session() as db_session:
+        result = await db_session.stream(
+            showtime_index.documents_query().execution_options(yield_per=settings.SHOWTIME_REINDEX_CHUNK_SIZE)
+        )
+        async for row in result:
+            yield showtime_index.action(showtime_index.to_document(row), version)
+
+
+async def main():
+    try:
+        await showtime_index.create()
+        async with async_session() as db_session:
+            version = (await db_session.execute(select(func.coalesce(func.max(OutboxEvent.id), 0)))).scalar_one()
+        indexed, errors = await async_bulk(
+            async_es, generate_actions(version), chunk_size=settings.SHOWTIME_REINDEX_CHUNK_SIZE,
+            raise_on_error=False,
+        )
+        # Conflicts are shows changed since the start, already indexed in a newer version.
+        conflicts = sum(1 for error in errors if next(iter(error.values())).get('status') == 409)
+        logger.info(
+            'Indexed showtimes',
+            extra={'indexed': indexed, 'conflicts': conflicts, 'errors': len(errors) - conflicts},
+        )
+    finally:
+        await async_es.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
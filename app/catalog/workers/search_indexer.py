@@ -0,0 +1,224 @@
+"""
+Keep the `showtimes` and `movies` indexes in sync with the change events of the shows
+and of the catalog rows they are built from.
+
+    python -m app.catalog.workers.search_indexer
+"""
+import asyncio
+import logging
+from typing import Protocol
+
+from confluent_kafka.serialization import StringDeserializer
+from elasticsearch.helpers import async_bulk
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+
+from ...bookings.models import Show
+from ...generics import async_es, async_session, settings
+from ...generics.outbox import ChangeEvent, OUTBOX_ID_HEADER
+from ...generics.pkg.kafka import AsyncHandlingMessageCallback, get_headers
+from ...generics.workers.consumers import AppAsyncKafkaConsumer
+from ..models import Cinema, CinemaHall
+from ..movies import movie_suggest_index
+from ..showtimes import showtime_index
+
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedFromDatabase(Protocol):
+    name: str
+
+    async def build_documents(self, ids: list[int], db_session: AsyncSession) -> list: ...
+
+    def document_id(self, document) -> int: ...
+
+    def action(self, document, version: int) -> dict: ...
+
+    async def delete_missing(self, ids: list[int]) -> int: ...
+
+
+class BulkIndexer:
+    """
+    Gathers the ids to reindex from concurrent messages and rebuilds them together: one
+    query for the documents and one `async_bulk` per batch of `batch_size` ids, or every
+    `flush_interval` seconds. A message is done once its batch is indexed, a failed batch
+    fails all its messages, which are retried by the consumer.
+
+    Documents are rebuilt from the database rather than from the events, and indexed with
+    the id of the latest outbox event of the document as external version, so that a batch
+    built from an older state never overwrites a newer one (ES rejects it with a version
+    conflict, which is ignored). Redelivered events have the same version and are indexed
+    again, which is harmless.
+    """
+
+    def __init__(self, index: IndexedFromDatabase, batch_size: int, flush_interval: float):
+        self.index = index
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: dict[int, int] = {}
+        self.waiters: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self.indexed = 0
+        self.deleted = 0
+        self.conflicts = 0
+
+    async def submit(self, ids: list[int], version: int):
+        for id in ids:
+            self.pending[id] = max(self.pending.get(id, 0), version)
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        if len(self.pending) >= self.batch_size:
+            self._schedule(0)
+        elif self._timer is None:
+            self._schedule(self.flush_interval)
+        await future
+
+    def _schedule(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self):
+        self._timer = None
+        pending, self.pending = self.pending, {}
+        waiters, self.waiters = self.waiters, []
+        if not waiters:
+            return
+        try:
+            await self._index(pending)
+        except Exception as exc:
+            logger.exception('Can not index documents', extra={'index': self.index.name, 'ids': len(pending)})
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            return
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _index(self, versions: dict[int, int]):
+        if not versions:
+            return
+        async with async_session() as db_session:
+            documents = await self.index.build_documents(list(versions), db_session)
+        actions = [
+            self.index.action(document, versions[self.index.document_id(document)]) for document in documents
+        ]
+        indexed, errors = await async_bulk(
+            async_es, actions, chunk_size=self.batch_size, raise_on_error=False, raise_on_exception=True
+        )
+        self.indexed += indexed
+        failures = [error for error in errors if next(iter(error.values())).get('status') != 409]
+        self.conflicts += len(errors) - len(failures)
+        if failures:
+            raise RuntimeError(f'{len(failures)} documents failed to be indexed: {failures[:3]}')
+
+        # Removed rows, or rows which aren't complete enough to be searched anymore.
+        missing = set(versions) - {self.index.document_id(document) for document in documents}
+        if missing:
+            self.deleted += await self.index.delete_missing(list(missing))
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'pending': len(self.pending), 'indexed': self.indexed, 'deleted': self.deleted,
+            'conflicts': self.conflicts,
+        }
+
+
+showtime_indexer = BulkIndexer(
+    showtime_index,
+    batch_size=settings.SHOWTIME_INDEX_BATCH_SIZE,
+    flush_interval=settings.SHOWTIME_INDEX_FLUSH_INTERVAL,
+)
+movie_indexer = BulkIndexer(
+    movie_suggest_index,
+    batch_size=settings.SHOWTIME_INDEX_BATCH_SIZE,
+    flush_interval=settings.SHOWTIME_INDEX_FLUSH_INTERVAL,
+)
+
+
+class SearchChangeCallback(AsyncHandlingMessageCallback):
+    message_model = ChangeEvent
+
+    def __init__(self, message):
+        super().__init__(message)
+        version = get_headers(message).get(OUTBOX_ID_HEADER)
+        self.version = int(version) if version is not None else None
+
+    async def affected_shows(self, event: ChangeEvent) -> list[int]:
+        if event.table == 'shows':
+            return [int(event.id)]
+        if event.table == 'movies':
+            query = select(Show.id).where(Show.movie_id == int(event.id))
+        elif event.table == 'cinema_halls':
+            query = select(Show.id).where(Show.cinema_hall_id == int(event.id))
+        elif event.table == 'cinemas':
+            query = (
+                select(Show.id).join(CinemaHall, CinemaHall.id == Show.cinema_hall_id)
+                .where(CinemaHall.cinema_id == int(event.id))
+            )
+        elif event.table == 'cities':
+            query = (
+                select(Show.id).join(CinemaHall, CinemaHall.id == Show.cinema_hall_id)
+                .join(Cinema, Cinema.id == CinemaHall.cinema_id)
+                .where(Cinema.city_id == int(event.id))
+            )
+        else:
+            return []
+        async with async_session() as db_session:
+            response = await db_session.execute(query)
+            return list(response.scalars().all())
+
+    @staticmethod
+    def affected_movies(event: ChangeEvent) -> list[int]:
+        if event.table == 'movies':
+            return [int(event.id)]
+        # A show moves the weight and the cities of its movie. The movie of a removed show
+        # is unknown, it's caught up by the periodic full reindex.
+        if event.table == 'shows' and event.data and event.data.get('movie_id') is not None:
+            return [event.data['movie_id']]
+        return []
+
+    async def handle_message(self):
+        if self.version is None:
+            # Indexed with a version lower than the current one, the change would be lost
+            # as a conflict.
+            raise ValueError(f'Change event without `{OUTBOX_ID_HEADER}` header')
+        show_ids = await self.affected_shows(self.message)
+        movie_ids = self.affected_movies(self.message)
+        await asyncio.gather(
+            showtime_indexer.submit(show_ids, self.version) if show_ids else asyncio.sleep(0),
+            movie_indexer.submit(movie_ids, self.version) if movie_ids else asyncio.sleep(0),
+        )
+
+
+class SearchIndexerConsumer(AppAsyncKafkaConsumer):
+    callback = SearchChangeCallback
+    topics = ['cdc.shows', 'cdc.movies', 'cdc.cinema_halls', 'cdc.cinemas', 'cdc.cities']
+    consumer_config = {
+        'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+        'group.id': 'search-indexer',
+        'auto.offset.reset': 'earliest',
+    }
+    producer_config = {
+        'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+    }
+    retry_delays = [5, 30, 120]
+    dead_letter = True
+    # Messages waiting for the same batch run concurrently.
+    max_concurrency = settings.SHOWTIME_INDEX_BATCH_SIZE
+
+    def set_consumer(self, key_deserializer=StringDeserializer('utf_8'), value_deserializer=None):
+        super().set_consumer(key_deserializer, value_deserializer)
+
+    async def on_startup(self):
+        await super().on_startup()
+        await showtime_index.create()
+        await movie_suggest_index.create()
+
+
+if __name__ == '__main__':
+    SearchIndexerConsumer().start_consume()
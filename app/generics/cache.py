@@ -0,0 +1,194 @@
+import math
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+import orjson
+import redis.asyncio as redis
+
+from .utils.cache import LRUTTLCache
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class ReadThroughCache:
+    """
+    Two-tier read-through cache of a namespace: a per-process LRU in front of redis, in
+    front of the `loader` of each read.
+
+    - Keys of derived results (lists, pages) contain the version of the namespace, which a
+      write bumps, so that they're all invalidated at once without knowing them. Keys of
+      single objects are deleted one by one instead.
+    - Concurrent misses of the same key in a process share one call of the loader
+      (single-flight).
+    - A redis entry is refreshed before it expires by one of its readers, with a chance
+      growing as the expiry gets closer and the loader gets slower (probabilistic early
+      expiration, `beta`), so that popular keys don't expire under everybody at once.
+
+    Local entries of other processes are not invalidated, they are bounded by `local_ttl`.
+    Values are stored as JSON, `dumps`/`loads` of the reads convert them.
+    """
+
+    def __init__(
+        self, connection: redis.Redis, namespace: str, ttl: int, local_ttl: float,
+        local_maxsize: int, beta: float = 1.0
+    ):
+        self.redis = connection
+        self.namespace = namespace
+        self.ttl = ttl
+        self.beta = beta
+        self.local = LRUTTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.early_refreshes = 0
+        self.shared_loads = 0
+
+    @property
+    def version_key(self) -> str:
+        return f'cache_version:{self.namespace}'
+
+    def make_key(self, *parts) -> str:
+        return ':'.join(['cache', self.namespace, *map(str, parts)])
+
+    async def version(self) -> int:
+        version = self.local.get(self.version_key)
+        if version is None:
+            try:
+                version = int(await self.redis.get(self.version_key) or 0)
+            except Exception:
+                logger.exception('Can not read cache version from redis', extra={'namespace': self.namespace})
+                return -1
+            self.local.set(self.version_key, version)
+        return version
+
+    async def bump_version(self):
+        version = await self.redis.incr(self.version_key)
+        self.local.set(self.version_key, version)
+
+    async def delete(self, keys: list[str]):
+        if not keys:
+            return
+        for key in keys:
+            self.local.delete(key)
+        await self.redis.delete(*keys)
+
+    def _is_fresh(self, entry: dict) -> bool:
+        # XFetch: recompute once `now - delta * beta * ln(rand)` passes the expiry.
+        return time.time() - entry['delta'] * self.beta * math.log(1.0 - random.random()) < entry['expiry']
+
+    def _entry(self, value, delta: float) -> bytes:
+        return orjson.dumps({'value': value, 'delta': delta, 'expiry': time.time() + self.ttl})
+
+    async def get(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        dumps: Callable[[Any], Any],
+        loads: Callable[[Any], Any],
+    ) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return loads(value)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, dumps))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared_loads += 1
+        return loads(await asyncio.shield(task))
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], dumps: Callable[[Any], Any]) -> Any:
+        try:
+            raw = await self.redis.get(key)
+        except Exception:
+            logger.exception('Can not read cache entry from redis', extra={'key': key})
+            raw = None
+        if raw is not None:
+            entry = orjson.loads(raw)
+            if self._is_fresh(entry):
+                self.redis_hits += 1
+                self.local.set(key, entry['value'])
+                return entry['value']
+            self.early_refreshes += 1
+        else:
+            self.redis_misses += 1
+
+        started = time.perf_counter()
+        value = dumps(await loader())
+        delta = time.perf_counter() - started
+        self.local.set(key, value)
+        try:
+            await self.redis.set(key, self._entry(value, delta), ex=self.ttl)
+        except Exception:
+            logger.exception('Can not write cache entry to redis', extra={'key': key})
+        return value
+
+    async def get_many(
+        self,
+        keys: dict[Any, str],
+        loader: Callable[[list], Awaitable[dict[Any, Any]]],
+        dumps: Callable[[Any], Any],
+        loads: Callable[[Any], Any],
+    ) -> dict[Any, Any]:
+        """
+        Values of the `{id: key}` items found in the cache, `loader` is called once with the
+        ids of all the missing ones and returns `{id: value}`, missing ids are cached as `None`.
+        """
+        values = {}
+        missing = {}
+        for id, key in keys.items():
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                missing[id] = key
+            else:
+                values[id] = value
+        if missing:
+            try:
+                raws = await self.redis.mget(list(missing.values()))
+            except Exception:
+                logger.exception('Can not read cache entries from redis', extra={'namespace': self.namespace})
+                raws = [None] * len(missing)
+            for (id, key), raw in zip(list(missing.items()), raws):
+                if raw is None:
+                    self.redis_misses += 1
+                    continue
+                entry = orjson.loads(raw)
+                if self._is_fresh(entry):
+                    self.redis_hits += 1
+                    values[id] = entry['value']
+                    self.local.set(key, entry['value'])
+                    del missing[id]
+                else:
+                    self.early_refreshes += 1
+        if missing:
+            started = time.perf_counter()
+            loaded = await loader(list(missing))
+            delta = (time.perf_counter() - started) / len(missing)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for id, key in missing.items():
+                    value = dumps(loaded.get(id))
+                    values[id] = value
+                    self.local.set(key, value)
+                    pipe.set(key, self._entry(value, delta), ex=self.ttl)
+                try:
+                    await pipe.execute()
+                except Exception:
+                    logger.exception('Can not write cache entries to redis', extra={'namespace': self.namespace})
+        return {id: loads(values[id]) for id in keys}
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'local': self.local.stats,
+            'redis_hits': self.redis_hits,
+            'redis_misses': self.redis_misses,
+            'early_refreshes': self.early_refreshes,
+            'shared_loads': self.shared_loads,
+        }
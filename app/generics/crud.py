@@ -1,17 +1,31 @@
+import hashlib
+import logging
+from dataclasses import dataclass, field
 from fastapi import HTTPException, status
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, Sequence, TypeVar
 from uuid import UUID
 from pydantic import BaseModel
 
 from fastapi_pagination import Params, Page
+from fastapi_pagination.api import create_page
 from sqlmodel import select, func, SQLModel
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy import exc
+from sqlalchemy import (
+    exc, tuple_, literal, text, update, values, column, literal_column, PrimaryKeyConstraint, UniqueConstraint
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.elements import ClauseElement
 
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_paginate
 from fastapi_async_sqlalchemy import db
+import orjson
 
-from .enums import IOrderEnum
+from .enums import IOrderEnum, ICountStrategyEnum, CRUDAction
+from .exceptions import InvalidRequestException
+from .cache import ReadThroughCache
+from .outbox import add_outbox_events, change_event
+from .redis import redis_connection
+from .settings import settings
+from .pagination import CursorParams, CursorPage, encode_cursor, decode_cursor
 
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
@@ -20,8 +34,32 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 SchemaType = TypeVar("SchemaType", bound=BaseModel)
 T = TypeVar("T", bound=SQLModel)
 
+logger = logging.getLogger(__name__)
+
+# Postgres accepts at most 32767 bind parameters per statement.
+MAX_BIND_PARAMS = 32767
+
+
+@dataclass
+class BulkWriteResult(Generic[T]):
+    """
+    Outcome of a bulk write. `conflicts` holds the indexes, in the input, of the rows which
+    were not written as requested: already existing rows for `create_many`, missing rows
+    for `update_many` and rows which updated an existing one for `upsert_many`.
+    """
+    items: list[T] = field(default_factory=list)
+    conflicts: list[int] = field(default_factory=list)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Topic of the change events of the rows, written to the outbox in the transaction of
+    # the writes. No events when `None`.
+    change_topic: str | None = None
+    # Columns `get_multi_cursor` may order by: indexed, not nullable (NULLs never compare
+    # with the cursor, their rows would be skipped) and not sensitive (the cursor carries
+    # the value of the last row).
+    cursor_order_keys: tuple[str, ...] = ('id',)
+
     def __init__(self, model: type[ModelType]):
         self.model = model
         self.db = db
@@ -29,6 +67,40 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get_db(self):
         return self.db
 
+    @property
+    def count_cache_key(self) -> str:
+        return f'count:{self.model.__tablename__}'
+
+    async def after_write(self, *, action: CRUDAction, obj: ModelType) -> None:
+        await self.after_write_many(action=action, objs=[obj])
+
+    async def after_write_many(self, *, action: CRUDAction, objs: Sequence[ModelType]) -> None:
+        """
+        Called once `create`/`update`/`remove` or one of their bulk variants has committed.
+        Subclasses override it to drop state derived from the rows, e.g. caches.
+        """
+        if action in (CRUDAction.CREATE, CRUDAction.REMOVE):
+            try:
+                await redis_connection.delete(self.count_cache_key)
+            except Exception:
+                logger.exception('Can not invalidate the cached count', extra={'key': self.count_cache_key})
+
+    async def record_changes(
+        self, *, action: CRUDAction, objs: Sequence[ModelType], db_session: AsyncSession
+    ) -> None:
+        """
+        Write the change events of `objs` to the outbox, before the commit of the write.
+        """
+        if self.change_topic is None or not objs:
+            return
+        await add_outbox_events(db_session, [
+            change_event(
+                self.change_topic, self.model.__tablename__, action, obj.id,
+                None if action == CRUDAction.REMOVE else obj.model_dump(mode='json'),
+            )
+            for obj in objs
+        ])
+
     async def get(
         self, *, id: UUID | str, db_session: AsyncSession | None = None
     ) -> ModelType | None:
@@ -50,14 +122,63 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return response.scalars().all()
 
     async def get_count(
-        self, db_session: AsyncSession | None = None
-    ) -> ModelType | None:
+        self,
+        db_session: AsyncSession | None = None,
+        strategy: ICountStrategyEnum = ICountStrategyEnum.exact,
+    ) -> int:
+        """
+        Count the rows of the table with one of the strategies:
+        - `exact`: `count(*)`, a full scan of the table.
+        - `estimated`: the planner estimate `pg_class.reltuples`, as fresh as the last
+          VACUUM/ANALYZE. Falls back to `exact` for tables which have never been analyzed.
+        - `cached`: the exact count kept in redis for `COUNT_CACHE_TTL` seconds, dropped
+          by `create`/`remove`. Falls back to `exact` when redis is unavailable.
+        """
         db_session = db_session or self.db.session
+        if strategy == ICountStrategyEnum.estimated:
+            response = await db_session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                {"table_name": self.model.__tablename__},
+            )
+            estimate = response.scalar_one_or_none()
+            if estimate is not None and estimate >= 0:
+                return estimate
+        elif strategy == ICountStrategyEnum.cached:
+            try:
+                cached = await redis_connection.get(self.count_cache_key)
+            except Exception:
+                logger.exception('Can not read the cached count', extra={'key': self.count_cache_key})
+                return await self.get_count(db_session=db_session)
+            if cached is not None:
+                return int(cached)
+            count = await self.get_count(db_session=db_session)
+            try:
+                await redis_connection.set(self.count_cache_key, count, ex=settings.COUNT_CACHE_TTL)
+            except Exception:
+                logger.exception('Can not cache the count', extra={'key': self.count_cache_key})
+            return count
+
         response = await db_session.execute(
-            select(func.count()).select_from(select(self.model).subquery())
+            select(func.count()).select_from(self.model)
         )
         return response.scalar_one()
 
+    async def paginate(
+        self,
+        query,
+        *,
+        params: Params,
+        count_strategy: ICountStrategyEnum,
+        db_session: AsyncSession,
+    ) -> Page[ModelType]:
+        """
+        Offset pagination of an unfiltered `query` over the table, the total comes from `get_count`.
+        """
+        raw_params = params.to_raw_params().as_limit_offset()
+        response = await db_session.execute(query.limit(raw_params.limit).offset(raw_params.offset))
+        total = await self.get_count(db_session=db_session, strategy=count_strategy)
+        return create_page(response.scalars().all(), total, params)
+
     async def get_multi(
         self,
         *,
@@ -75,11 +196,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self,
         *,
         params: Params | None = Params(),
+        count_strategy: ICountStrategyEnum = ICountStrategyEnum.exact,
         db_session: AsyncSession | None = None,
     ) -> Page[ModelType]:
         db_session = db_session or self.db.session
         query = select(self.model)
-        return await sqlalchemy_paginate(db_session, query, params)
+        return await self.paginate(query, params=params, count_strategy=count_strategy, db_session=db_session)
 
     async def get_multi_paginated_ordered(
         self,
@@ -87,6 +209,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         params: Params | None = Params(),
         order_by: str | None = None,
         order: IOrderEnum | None = IOrderEnum.ascendent,
+        count_strategy: ICountStrategyEnum = ICountStrategyEnum.exact,
         db_session: AsyncSession | None = None,
     ) -> Page[ModelType]:
         db_session = db_session or self.db.session
@@ -96,13 +219,69 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if order_by is None or order_by not in columns:
             order_by = "id"
 
-        if query is None:
+        if order == IOrderEnum.ascendent:
+            query = select(self.model).order_by(columns[order_by].asc())
+        else:
+            query = select(self.model).order_by(columns[order_by].desc())
+
+        return await self.paginate(query, params=params, count_strategy=count_strategy, db_session=db_session)
+
+    async def get_multi_cursor(
+        self,
+        *,
+        params: CursorParams | None = CursorParams(),
+        order_by: str | None = None,
+        order: IOrderEnum | None = IOrderEnum.ascendent,
+        count_strategy: ICountStrategyEnum | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> CursorPage[ModelType]:
+        """
+        Keyset pagination: the cursor encodes the `(order_by, id)` tuple of the last row of
+        the previous page, so every page is an index range scan instead of `OFFSET n`.
+        The total is only counted when a `count_strategy` is given. `order_by` has to be one
+        of `cursor_order_keys`.
+        """
+        db_session = db_session or self.db.session
+
+        columns = self.model.__table__.columns
+
+        if order_by is None:
+            order_by = "id"
+        elif order_by not in self.cursor_order_keys:
+            raise InvalidRequestException(
+                message=f'Can not order by `{order_by}`, use one of {", ".join(self.cursor_order_keys)}'
+            )
+
+        keys = [columns[order_by]] if order_by == "id" else [columns[order_by], columns["id"]]
+        query = select(self.model)
+
+        if params.cursor is not None:
+            values = decode_cursor(params.cursor, keys)
+            position = tuple_(*keys)
+            last_seen = tuple_(*[literal(value, key.type) for value, key in zip(values, keys)])
             if order == IOrderEnum.ascendent:
-                query = select(self.model).order_by(columns[order_by].asc())
+                query = query.where(position > last_seen)
             else:
-                query = select(self.model).order_by(columns[order_by].desc())
+                query = query.where(position < last_seen)
 
-        return await sqlalchemy_paginate(db_session, query, params)
+        if order == IOrderEnum.ascendent:
+            query = query.order_by(*[key.asc() for key in keys])
+        else:
+            query = query.order_by(*[key.desc() for key in keys])
+
+        # Fetch one extra row to know whether there is a next page without counting.
+        response = await db_session.execute(query.limit(params.size + 1))
+        items = response.scalars().all()
+
+        next_cursor = None
+        if len(items) > params.size:
+            items = items[:params.size]
+            next_cursor = encode_cursor([getattr(items[-1], key.name) for key in keys])
+
+        total = None
+        if count_strategy is not None:
+            total = await self.get_count(db_session=db_session, strategy=count_strategy)
+        return CursorPage(items=items, size=params.size, next_cursor=next_cursor, total=total)
 
     async def get_multi_ordered(
         self,
@@ -149,11 +328,16 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj = self.model.model_validate(obj_in)  
         try:          
             db_session.add(db_obj)
+            if self.change_topic is not None:
+                await db_session.flush()
+                await db_session.refresh(db_obj)
+                await self.record_changes(action=CRUDAction.CREATE, objs=[db_obj], db_session=db_session)
             await db_session.commit()
         except exc.IntegrityError:
             db_session.rollback()
             raise HTTPException(status_code=409, detail="Resource already exists")
         await db_session.refresh(db_obj)
+        await self.after_write(action=CRUDAction.CREATE, obj=db_obj)
         return db_obj
 
     async def update(
@@ -175,8 +359,13 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             setattr(obj_current, field, update_data[field])
 
         db_session.add(obj_current)
+        if self.change_topic is not None:
+            await db_session.flush()
+            await db_session.refresh(obj_current)
+            await self.record_changes(action=CRUDAction.UPDATE, objs=[obj_current], db_session=db_session)
         await db_session.commit()
         await db_session.refresh(obj_current)
+        await self.after_write(action=CRUDAction.UPDATE, obj=obj_current)
         return obj_current
 
     async def remove(
@@ -187,6 +376,430 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             select(self.model).where(self.model.id == id)
         )
         obj = response.scalar_one()
+        await self.record_changes(action=CRUDAction.REMOVE, objs=[obj], db_session=db_session)
         await db_session.delete(obj)
         await db_session.commit()
+        await self.after_write(action=CRUDAction.REMOVE, obj=obj)
         return obj
+
+    def _chunk_size(self, chunk_size: int | None, num_columns: int) -> int:
+        chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+        return max(1, min(chunk_size, MAX_BIND_PARAMS // max(1, num_columns)))
+
+    @staticmethod
+    def _supplied_fields(objs_in: Sequence[CreateSchemaType | ModelType | dict[str, Any]]) -> set[str]:
+        """
+        Fields given by the caller in at least one of the objects, as opposed to defaults.
+        """
+        fields = set()
+        for obj_in in objs_in:
+            fields.update(obj_in if isinstance(obj_in, dict) else obj_in.model_fields_set)
+        return fields
+
+    def _to_rows(self, objs_in: Sequence[CreateSchemaType | ModelType | dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Validate the input objects and turn them into rows of the same columns, as required
+        by a multi-row VALUES: the supplied columns, plus the ones with a default value so that
+        inserted rows get it. Missing values of columns generated by the database become
+        `DEFAULT`, columns neither supplied nor defaulted are left to the database.
+        """
+        table = self.model.__table__
+        supplied = self._supplied_fields(objs_in)
+        objs = [self.model.model_validate(obj_in) for obj_in in objs_in]
+        rows = [{c.name: getattr(obj, c.name, None) for c in table.columns} for obj in objs]
+
+        def is_generated(c) -> bool:
+            return c.server_default is not None or (c.primary_key and c.autoincrement in (True, 'auto'))
+
+        keys = [
+            c.name for c in table.columns
+            if c.name in supplied and not (is_generated(c) and all(row[c.name] is None for row in rows))
+            or c.name not in supplied and any(row[c.name] is not None for row in rows)
+        ]
+        default = literal_column('DEFAULT')
+        return [
+            {
+                key: default if row[key] is None and is_generated(table.columns[key]) else row[key]
+                for key in keys
+            }
+            for row in rows
+        ]
+
+    def _match_columns(self, rows: list[dict[str, Any]], conflict_columns: list[str] | None) -> list[str] | None:
+        """
+        Columns identifying the rows which conflicted: `conflict_columns`, else the first
+        primary or unique key whose columns every row provides, `None` when there is none
+        (the rows can't conflict on what they provide).
+        """
+        if conflict_columns:
+            return conflict_columns
+        table = self.model.__table__
+        for constraint in table.constraints:
+            if not isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)):
+                continue
+            names = [c.name for c in constraint.columns]
+            if names and all(
+                name in row and row[name] is not None and not isinstance(row[name], ClauseElement)
+                for row in rows for name in names
+            ):
+                return names
+        for c in table.columns:
+            if c.unique and all(
+                c.name in row and row[c.name] is not None and not isinstance(row[c.name], ClauseElement)
+                for row in rows
+            ):
+                return [c.name]
+        return None
+
+    def _from_row(self, row) -> ModelType:
+        return self.model.model_validate(dict(row._mapping))
+
+    async def create_many(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | ModelType | dict[str, Any]],
+        conflict_columns: list[str] | None = None,
+        chunk_size: int | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> BulkWriteResult[ModelType]:
+        """
+        Insert the objects with one `INSERT ... ON CONFLICT DO NOTHING RETURNING` per chunk,
+        in a single transaction. Rows conflicting on `conflict_columns` (any unique constraint
+        when it's omitted) are skipped and reported in `conflicts` instead of failing the batch.
+        When no unique key is provided by the rows, nothing is expected to conflict and a
+        conflict fails the batch.
+        """
+        db_session = db_session or self.db.session
+        result = BulkWriteResult()
+        if not objs_in:
+            return result
+        table = self.model.__table__
+        rows = self._to_rows(objs_in)
+        match_columns = self._match_columns(rows, conflict_columns)
+        size = self._chunk_size(chunk_size, len(rows[0]))
+        try:
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                statement = insert(table).values(chunk)
+                if match_columns is not None:
+                    statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+                inserted = [
+                    self._from_row(row) for row in await db_session.execute(statement.returning(*table.columns))
+                ]
+                result.items.extend(inserted)
+                if match_columns is not None:
+                    inserted_keys = {tuple(getattr(obj, c) for c in match_columns) for obj in inserted}
+                    result.conflicts.extend(
+                        start + index for index, row in enumerate(chunk)
+                        if tuple(row[c] for c in match_columns) not in inserted_keys
+                    )
+            await self.record_changes(action=CRUDAction.CREATE, objs=result.items, db_session=db_session)
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(status_code=409, detail="Resource already exists")
+        await self.after_write_many(action=CRUDAction.CREATE, objs=result.items)
+        return result
+
+    async def update_many(
+        self,
+        *,
+        objs_new: Sequence[dict[str, Any]],
+        chunk_size: int | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> BulkWriteResult[ModelType]:
+        """
+        Update rows identified by their `id` with one `UPDATE ... FROM (VALUES ...) RETURNING`
+        per chunk of rows setting the same fields, in a single transaction. Ids which don't
+        exist are reported in `conflicts`.
+        """
+        db_session = db_session or self.db.session
+        result = BulkWriteResult()
+        table = self.model.__table__
+        groups: dict[tuple[str, ...], list[int]] = {}
+        for index, obj_new in enumerate(objs_new):
+            if 'id' not in obj_new:
+                raise InvalidRequestException(message=f'`id` is required to update a row, missing at index {index}')
+            groups.setdefault(tuple(sorted(obj_new)), []).append(index)
+
+        try:
+            for keys, indexes in groups.items():
+                fields = [key for key in keys if key != 'id']
+                if not fields:
+                    continue
+                size = self._chunk_size(chunk_size, len(keys))
+                for start in range(0, len(indexes), size):
+                    chunk = indexes[start:start + size]
+                    data = values(*[column(key, table.columns[key].type) for key in keys], name='data').data(
+                        [tuple(objs_new[index][key] for key in keys) for index in chunk]
+                    )
+                    statement = (
+                        update(table)
+                        .where(table.columns['id'] == data.columns['id'])
+                        .values({field_name: data.columns[field_name] for field_name in fields})
+                        .returning(*table.columns)
+                    )
+                    updated = [self._from_row(row) for row in await db_session.execute(statement)]
+                    updated_ids = {obj.id for obj in updated}
+                    result.items.extend(updated)
+                    result.conflicts.extend(index for index in chunk if objs_new[index]['id'] not in updated_ids)
+            await self.record_changes(action=CRUDAction.UPDATE, objs=result.items, db_session=db_session)
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(status_code=409, detail="Resource already exists")
+        result.conflicts.sort()
+        await self.after_write_many(action=CRUDAction.UPDATE, objs=result.items)
+        return result
+
+    async def upsert_many(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | ModelType | dict[str, Any]],
+        conflict_columns: list[str],
+        update_columns: list[str] | None = None,
+        chunk_size: int | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> BulkWriteResult[ModelType]:
+        """
+        Insert or update the objects with one `INSERT ... ON CONFLICT (conflict_columns)
+        DO UPDATE ... RETURNING` per chunk, in a single transaction. `update_columns` defaults
+        to the columns supplied by the objects (not their defaults) outside `conflict_columns`.
+        Rows which updated an existing row are reported in `conflicts`. A chunk must not hold
+        the same conflict key twice.
+        """
+        db_session = db_session or self.db.session
+        result = BulkWriteResult()
+        if not objs_in:
+            return result
+        table = self.model.__table__
+        rows = self._to_rows(objs_in)
+        if update_columns is None:
+            supplied = self._supplied_fields(objs_in)
+            update_columns = [
+                key for key in rows[0]
+                if key in supplied and key not in conflict_columns and not table.columns[key].primary_key
+            ]
+        size = self._chunk_size(chunk_size, len(rows[0]))
+        inserted, updated = [], []
+        try:
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                positions = {tuple(row[c] for c in conflict_columns): start + index for index, row in enumerate(chunk)}
+                statement = insert(table).values(chunk)
+                set_ = {key: statement.excluded[key] for key in update_columns}
+                for c in table.columns:
+                    if c.onupdate is not None and c.name not in set_:
+                        set_[c.name] = c.onupdate.arg
+                statement = statement.on_conflict_do_update(index_elements=conflict_columns, set_=set_).returning(
+                    *table.columns,
+                    # `xmax` is 0 for a freshly inserted tuple, set for an updated one.
+                    literal_column('xmax = 0').label('_inserted'),
+                )
+                for row in await db_session.execute(statement):
+                    mapping = dict(row._mapping)
+                    is_inserted = mapping.pop('_inserted')
+                    obj = self.model.model_validate(mapping)
+                    result.items.append(obj)
+                    if is_inserted:
+                        inserted.append(obj)
+                    else:
+                        updated.append(obj)
+                        result.conflicts.append(positions[tuple(mapping[c] for c in conflict_columns)])
+            await self.record_changes(action=CRUDAction.CREATE, objs=inserted, db_session=db_session)
+            await self.record_changes(action=CRUDAction.UPDATE, objs=updated, db_session=db_session)
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(status_code=409, detail="Resource already exists")
+        result.conflicts.sort()
+        if inserted:
+            await self.after_write_many(action=CRUDAction.CREATE, objs=inserted)
+        if updated:
+            await self.after_write_many(action=CRUDAction.UPDATE, objs=updated)
+        return result
+
+
+class CachedCRUDMixin:
+    """
+    Read-through cache (`ReadThroughCache`) of the reads of a `CRUDBase`, for catalog
+    tables read far more often than they are written:
+
+        class CRUDShow(CachedCRUDMixin, CRUDBase[Show, ShowCreate, ShowUpdate]):
+            cache_ttl = 60
+
+    `get`/`get_by_ids` cache the rows one by one, the list reads cache their whole result
+    under the version of the table. Writes through the CRUD delete the rows they touched
+    and bump the version, writes made elsewhere are only seen after `cache_ttl`.
+
+    Cached rows are rebuilt with `model_validate`, they're not attached to the session:
+    read with `use_cache=False` the rows you're going to update.
+    """
+    cache_ttl: int = settings.CRUD_CACHE_TTL
+    cache_local_ttl: float = settings.CRUD_CACHE_LOCAL_TTL
+    cache_local_size: int = settings.CRUD_CACHE_LOCAL_SIZE
+    cache_beta: float = settings.CRUD_CACHE_BETA
+
+    def __init__(self, model: type[ModelType]):
+        super().__init__(model)
+        self.cache = ReadThroughCache(
+            redis_connection,
+            model.__tablename__,
+            ttl=self.cache_ttl,
+            local_ttl=self.cache_local_ttl,
+            local_maxsize=self.cache_local_size,
+            beta=self.cache_beta,
+        )
+
+    def _dump(self, obj: ModelType | None) -> dict | None:
+        return None if obj is None else obj.model_dump(mode='json')
+
+    def _load(self, data: dict | None) -> ModelType | None:
+        return None if data is None else self.model.model_validate(data)
+
+    def _dump_many(self, objs: Sequence[ModelType]) -> list[dict]:
+        return [obj.model_dump(mode='json') for obj in objs]
+
+    def _load_many(self, data: list[dict]) -> list[ModelType]:
+        return [self.model.model_validate(item) for item in data]
+
+    async def _list_key(self, method: str, **kwargs) -> str:
+        arguments = {
+            name: value.model_dump() if isinstance(value, BaseModel) else value
+            for name, value in kwargs.items()
+        }
+        digest = hashlib.sha1(orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        return self.cache.make_key('v', await self.cache.version(), method, digest)
+
+    async def after_write_many(self, *, action: CRUDAction, objs: Sequence[ModelType]) -> None:
+        await super().after_write_many(action=action, objs=objs)
+        try:
+            await self.cache.delete([self.cache.make_key('id', obj.id) for obj in objs])
+            await self.cache.bump_version()
+        except Exception:
+            logger.exception('Can not invalidate the cached reads', extra={'table': self.model.__tablename__})
+
+    async def get(
+        self, *, id: UUID | str, db_session: AsyncSession | None = None, use_cache: bool = True
+    ) -> ModelType | None:
+        load = super().get
+        if not use_cache:
+            return await load(id=id, db_session=db_session)
+        return await self.cache.get(
+            self.cache.make_key('id', id),
+            lambda: load(id=id, db_session=db_session),
+            dumps=self._dump,
+            loads=self._load,
+        )
+
+    async def get_by_ids(
+        self,
+        *,
+        list_ids: list[UUID | str],
+        db_session: AsyncSession | None = None,
+        use_cache: bool = True,
+    ) -> list[ModelType] | None:
+        load = super().get_by_ids
+        if not use_cache:
+            return await load(list_ids=list_ids, db_session=db_session)
+
+        async def loader(ids: list[str]) -> dict[str, ModelType]:
+            return {str(obj.id): obj for obj in await load(list_ids=ids, db_session=db_session)}
+
+        objs = await self.cache.get_many(
+            {str(id): self.cache.make_key('id', id) for id in list_ids},
+            loader,
+            dumps=self._dump,
+            loads=self._load,
+        )
+        return [obj for obj in objs.values() if obj is not None]
+
+    async def get_multi_ordered(
+        self,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str | None = None,
+        order: IOrderEnum | None = IOrderEnum.ascendent,
+        db_session: AsyncSession | None = None,
+        use_cache: bool = True,
+    ) -> list[ModelType]:
+        load = super().get_multi_ordered
+        kwargs = {'skip': skip, 'limit': limit, 'order_by': order_by, 'order': order}
+        if not use_cache:
+            return await load(**kwargs, db_session=db_session)
+        return await self.cache.get(
+            await self._list_key('get_multi_ordered', **kwargs),
+            lambda: load(**kwargs, db_session=db_session),
+            dumps=self._dump_many,
+            loads=self._load_many,
+        )
+
+    def _dump_page(self, page: Page[ModelType]) -> dict:
+        return {'items': self._dump_many(page.items), 'total': page.total}
+
+    async def get_multi_paginated(
+        self,
+        *,
+        params: Params | None = Params(),
+        count_strategy: ICountStrategyEnum = ICountStrategyEnum.exact,
+        db_session: AsyncSession | None = None,
+        use_cache: bool = True,
+    ) -> Page[ModelType]:
+        load = super().get_multi_paginated
+        kwargs = {'params': params, 'count_strategy': count_strategy}
+        if not use_cache:
+            return await load(**kwargs, db_session=db_session)
+        return await self.cache.get(
+            await self._list_key('get_multi_paginated', **kwargs),
+            lambda: load(**kwargs, db_session=db_session),
+            dumps=self._dump_page,
+            loads=lambda data: create_page(self._load_many(data['items']), data['total'], params),
+        )
+
+    async def get_multi_paginated_ordered(
+        self,
+        *,
+        params: Params | None = Params(),
+        order_by: str | None = None,
+        order: IOrderEnum | None = IOrderEnum.ascendent,
+        count_strategy: ICountStrategyEnum = ICountStrategyEnum.exact,
+        db_session: AsyncSession | None = None,
+        use_cache: bool = True,
+    ) -> Page[ModelType]:
+        load = super().get_multi_paginated_ordered
+        kwargs = {'params': params, 'order_by': order_by, 'order': order, 'count_strategy': count_strategy}
+        if not use_cache:
+            return await load(**kwargs, db_session=db_session)
+        return await self.cache.get(
+            await self._list_key('get_multi_paginated_ordered', **kwargs),
+            lambda: load(**kwargs, db_session=db_session),
+            dumps=self._dump_page,
+            loads=lambda data: create_page(self._load_many(data['items']), data['total'], params),
+        )
+
+    async def get_multi_cursor(
+        self,
+        *,
+        params: CursorParams | None = CursorParams(),
+        order_by: str | None = None,
+        order: IOrderEnum | None = IOrderEnum.ascendent,
+        count_strategy: ICountStrategyEnum | None = None,
+        db_session: AsyncSession | None = None,
+        use_cache: bool = True,
+    ) -> CursorPage[ModelType]:
+        load = super().get_multi_cursor
+        kwargs = {'params': params, 'order_by': order_by, 'order': order, 'count_strategy': count_strategy}
+        if not use_cache:
+            return await load(**kwargs, db_session=db_session)
+        return await self.cache.get(
+            await self._list_key('get_multi_cursor', **kwargs),
+            lambda: load(**kwargs, db_session=db_session),
+            dumps=lambda page: {
+                'items': self._dump_many(page.items), 'next_cursor': page.next_cursor, 'total': page.total
+            },
+            loads=lambda data: CursorPage(
+                items=self._load_many(data['items']), size=params.size,
+                next_cursor=data['next_cursor'], total=data['total'],
+            ),
+        )
@@ -1,23 +1,86 @@
+import time
 from typing import Annotated, AsyncGenerator
 from fastapi import Depends
 
 from .settings import settings
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 
 connect_args = {"check_same_thread": False}
 
-engine = create_async_engine(
-    str(settings.DATABASE_URI),
-    echo=False,
-    future=True,
-    pool_size=settings.CONN_POOL_SIZE,
-    pool_pre_ping=True
-)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool recording how long callers wait to check a connection out.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_count += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            'pool_size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            'max_overflow': self._max_overflow,
+            'wait_count': self.wait_count,
+            'wait_total_ms': round(self.wait_total * 1000, 3),
+            'wait_avg_ms': round(self.wait_total * 1000 / self.wait_count, 3) if self.wait_count else 0.0,
+            'wait_max_ms': round(self.wait_max * 1000, 3),
+        }
+
+
+def get_pool_sizing() -> tuple[int, int]:
+    """
+    Return `(pool_size, max_overflow)` for the current worker process.
+
+    When `DB_MAX_CONNECTIONS` is set, it is the connection budget of the whole webserver
+    and it is split evenly between the `WEB_CONCURRENCY` gunicorn workers, so scaling the
+    workers out never exceeds what postgres has been provisioned for.
+    """
+    if settings.DB_MAX_CONNECTIONS is None:
+        return settings.CONN_POOL_SIZE, settings.CONN_POOL_MAX_OVERFLOW
+    per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+    pool_size = min(settings.CONN_POOL_SIZE, per_worker)
+    return pool_size, per_worker - pool_size
+
+
+def create_db_engine() -> AsyncEngine:
+    pool_size, max_overflow = get_pool_sizing()
+    return create_async_engine(
+        str(settings.DATABASE_URI),
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.CONN_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+
+
+# The only engine of the process, shared by the CRUD layer, the dependencies and sqladmin.
+engine = create_db_engine()
+async_session = async_sessionmaker(engine, expire_on_commit=False)
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    yield async_sessionmaker(engine, expire_on_commit=False)
+    yield async_session
 
 
-ASession = Annotated[async_sessionmaker[AsyncSession], Depends(get_async_session)]
\ No newline at end of file
+ASession = Annotated[async_sessionmaker[AsyncSession], Depends(get_async_session)]
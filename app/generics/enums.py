@@ -2,4 +2,16 @@ from enum import StrEnum
 
 class IOrderEnum(StrEnum):
     ascendent = "ascendent"
-    descendent = "descendent"
\ No newline at end of file
+    descendent = "descendent"
+
+
+class ICountStrategyEnum(StrEnum):
+    exact = "exact"
+    estimated = "estimated"
+    cached = "cached"
+
+
+class CRUDAction(StrEnum):
+    CREATE = "create"
+    UPDATE = "update"
+    REMOVE = "remove"
@@ -64,3 +64,9 @@ class UnprocessableEntityException(APIException):
     status = status.HTTP_422_UNPROCESSABLE_ENTITY
     message = 'Unprocessable Entity.'
     error_code = 42201
+
+
+class ServiceUnavailableException(APIException):
+    status = status.HTTP_503_SERVICE_UNAVAILABLE
+    message = 'Service Unavailable.'
+    error_code = 50301
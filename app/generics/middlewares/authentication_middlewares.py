@@ -0,0 +1,56 @@
+import logging
+from jwt import DecodeError, ExpiredSignatureError, MissingRequiredClaimError
+
+from fastapi import status, responses
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..utils.security import decode_token_cached
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuthenticationMiddleware:
+    """
+    Decode the bearer token once per request and share its claims through
+    `request.state.token_payload` with every later consumer: the logging middleware,
+    the rate limiter identifier and the authentication dependencies.
+
+    Requests without an `Authorization` header go through with `token_payload = None`,
+    requests with an invalid token are rejected here.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        state = scope.setdefault('state', {})
+        state['token_payload'] = None
+        authorization = Headers(scope=scope).get('authorization')
+        if authorization is not None and scope['method'] != 'OPTIONS':
+            _, _, token = authorization.partition(" ")
+            try:
+                state['token_payload'] = decode_token_cached(token)
+            except ExpiredSignatureError:
+                response = responses.JSONResponse(
+                    content={'detail': 'Your token has expired. Please log in again.'},
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+                return await response(scope, receive, send)
+            except DecodeError:
+                response = responses.JSONResponse(
+                    content={'detail': 'Error when decoding the token. Please check your request.'},
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+                return await response(scope, receive, send)
+            except MissingRequiredClaimError:
+                response = responses.JSONResponse(
+                    content={'detail': 'There is no required field in your token. Please contact the administrator.'},
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
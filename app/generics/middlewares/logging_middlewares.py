@@ -1,69 +1,112 @@
-import uuid
+import random
 import logging
-from jwt import DecodeError, ExpiredSignatureError, MissingRequiredClaimError
 
-from fastapi import Request, HTTPException, status, responses
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from ..utils.security import decode_token
+from ..settings import settings
 
 
 logger = logging.getLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        
-    async def set_body(self, request: Request):
-        receive_ = await request._receive()
-        async def receive():
-            return receive_
-        request._receive = receive
-
-    async def dispatch(self, request, call_next):
-        if request.method != 'OPTIONS':
-            authorization = request.headers.get("Authorization")
-            user_id = None
-            if authorization is not None:
-                _, _, token = authorization.partition(" ")
-                try:
-                    payload = decode_token(token)
-                except ExpiredSignatureError:
-                    return responses.JSONResponse(
-                        content={'detail': 'Your token has expired. Please log in again.'},
-                        status_code=status.HTTP_403_FORBIDDEN
-                    )
-                except DecodeError:
-                    return responses.JSONResponse(
-                        content={'detail': 'Error when decoding the token. Please check your request.'},
-                        status_code=status.HTTP_403_FORBIDDEN
-                    )
-                except MissingRequiredClaimError:
-                    return responses.JSONResponse(
-                        content={'detail': 'There is no required field in your token. Please contact the administrator.'},
-                        status_code=status.HTTP_403_FORBIDDEN
-                    )
-                user_id = payload['sub']
-            await self.set_body(request)
-            request.state.request_id = request.headers.get("x-request-id")
-            request_id = request.state.request_id
-            body = {}
-            try:
-                body = await request.json()
-            except:
-                body = {}
+class LoggingMiddleware:
+    """
+    Pure ASGI middleware logging every incoming request.
+
+    The request body is never buffered in front of the application: chunks are copied
+    while the application reads them, and only when the request is sampled, its
+    content type is in the allowlist and it fits in `max_body_size`. The request is
+    logged once its body has been fully received (immediately when it has none).
+    The raw body is kept on `request.state.raw_body` and logged as text, never parsed
+    again after the route: `captured_body` gives it to later consumers (the exception
+    handlers), so that they don't have to read the stream again. The user id comes
+    from the claims decoded by `AuthenticationMiddleware`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float | None = None,
+        max_body_size: int | None = None,
+        content_types: list[str] | None = None,
+    ):
+        self.app = app
+        self.sample_rate = settings.LOG_BODY_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.max_body_size = settings.LOG_BODY_MAX_SIZE if max_body_size is None else max_body_size
+        self.content_types = tuple(settings.LOG_BODY_CONTENT_TYPES if content_types is None else content_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['method'] == 'OPTIONS':
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        state = scope.setdefault('state', {})
+        token_payload = state.get('token_payload')
+        user_id = token_payload['sub'] if token_payload else None
+        state['request_id'] = headers.get('x-request-id')
+
+        chunks = [] if self.should_capture_body(headers) else None
+        captured_size = 0
+        logged = False
+
+        def log_request():
+            nonlocal logged
+            logged = True
+            state['raw_body'] = b''.join(chunks) if chunks else b''
+            if not logger.isEnabledFor(logging.INFO):
+                return
             logger.info(
                 "Incomming request",
                 extra={
-                    "request_id": request_id if request_id else None,
-                    "method": str(request.method).upper(),
-                    "path": str(request.url.path),
-                    "params": str(request.query_params),
-                    'body': body,
+                    "request_id": state['request_id'],
+                    "method": str(scope['method']).upper(),
+                    "path": str(scope['path']),
+                    "params": scope['query_string'].decode('latin-1'),
+                    'body': captured_body(state),
                     "user_id": user_id
                 },
             )
 
-        response = await call_next(request)
-        return response
\ No newline at end of file
+        async def receive_wrapper() -> Message:
+            nonlocal chunks, captured_size
+            message = await receive()
+            if logged or message['type'] != 'http.request':
+                return message
+            if chunks is not None:
+                body = message.get('body', b'')
+                captured_size += len(body)
+                if captured_size > self.max_body_size:
+                    chunks = None
+                else:
+                    chunks.append(body)
+            if not message.get('more_body', False):
+                log_request()
+            return message
+
+        if not self.has_body(headers):
+            log_request()
+        try:
+            await self.app(scope, receive_wrapper, send)
+        finally:
+            if not logged:
+                log_request()
+
+    @staticmethod
+    def has_body(headers: Headers) -> bool:
+        return 'transfer-encoding' in headers or headers.get('content-length', '0') != '0'
+
+    def should_capture_body(self, headers: Headers) -> bool:
+        content_type = headers.get('content-type', '')
+        if not content_type.startswith(self.content_types):
+            return False
+        content_length = headers.get('content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+
+
+def captured_body(state: dict) -> str:
+    """The request body captured by `LoggingMiddleware`, as text, at most `max_body_size` bytes."""
+    return state.get('raw_body', b'').decode('utf-8', 'replace')
@@ -3,6 +3,7 @@ import pytz
 from datetime import datetime
 
 from sqlmodel import SQLModel, Field, Column, DateTime, UUID
+from sqlalchemy.dialects.postgresql import JSONB
 import sqlalchemy as sa
 
 
@@ -13,30 +14,59 @@ class BaseIntPrimaryKeyModel(SQLModel):
         index=True
     )
 
+    # `sa_type`/`sa_column_kwargs` rather than `sa_column`: the fields are inherited by every
+    # table, each table needs its own `Column`.
     created_at: datetime | None = Field(
         default=None,
-        sa_column=Column(DateTime(timezone=True), server_default=sa.text('now()'))
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={'server_default': sa.text('now()')},
     )
 
     updated_at: datetime | None = Field(
         default=None,
-        sa_column=Column(DateTime(timezone=True), server_default=sa.text('now()'), onupdate=sa.text('now()'))    
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={'server_default': sa.text('now()'), 'onupdate': sa.text('now()')},
     )
 
 class BaseUUIDPrimaryModel(SQLModel):
     id: uuid.UUID | None = Field(
         default=None,
-        sa_column=Column(UUID, server_default=sa.text('gen_random_uuid()'), primary_key=True, index=True)
+        primary_key=True,
+        index=True,
+        sa_type=UUID,
+        sa_column_kwargs={'server_default': sa.text('gen_random_uuid()')},
     )
 
+    # `sa_type`/`sa_column_kwargs` rather than `sa_column`: the fields are inherited by every
+    # table, each table needs its own `Column`.
     created_at: datetime | None = Field(
         default=None,
-        sa_column=Column(DateTime(timezone=True), server_default=sa.text('now()'))
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={'server_default': sa.text('now()')},
     )
 
     updated_at: datetime | None = Field(
         default=None,
-        sa_column=Column(DateTime(timezone=True), server_default=sa.text('now()'), onupdate=sa.text('now()'))    
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={'server_default': sa.text('now()'), 'onupdate': sa.text('now()')},
     )
 
 
+class OutboxEvent(BaseIntPrimaryKeyModel, table=True):
+    """
+    Message written in the same transaction as the change it announces, produced to Kafka
+    afterwards by `app.generics.workers.outbox_relay`.
+    """
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        sa.Index('ix_outbox_events_unpublished', 'id', postgresql_where=sa.text('published_at IS NULL')),
+    )
+
+    topic: str
+    key: str | None = None
+    payload: dict = Field(sa_column=Column(JSONB, nullable=False))
+    published_at: datetime | None = Field(
+        default=None,
+        # Indexed for the retention cleanup of the relay.
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True)
+    )
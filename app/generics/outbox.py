@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from .models import OutboxEvent
+
+
+# Header carrying the id of the outbox event, increasing in the order the events were written.
+OUTBOX_ID_HEADER = 'x-outbox-id'
+
+
+class ChangeEvent(BaseModel):
+    table: str
+    action: str
+    id: str
+    # The row as written, `None` for removals.
+    data: dict | None = None
+
+
+def change_event(topic: str, table: str, action: str, id, data: dict | None = None) -> dict:
+    """
+    Change event of a row, keyed by its id so that the changes of a row stay in order.
+    """
+    return {
+        'topic': topic,
+        'key': str(id),
+        'payload': {'table': table, 'action': action, 'id': str(id), 'data': data},
+    }
+
+
+async def add_outbox_events(db_session: AsyncSession, events: list[dict]) -> None:
+    """
+    Write `{'topic': ..., 'key': ..., 'payload': {...}}` events in the transaction of
+    `db_session`, they are produced once it commits.
+    """
+    if events:
+        await db_session.execute(insert(OutboxEvent), events)
@@ -0,0 +1,71 @@
+import json
+import uuid
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Generic, Sequence, TypeVar
+
+from fastapi import Query
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import Column
+
+from .exceptions import InvalidRequestException
+
+
+T = TypeVar("T")
+
+
+class CursorParams(BaseModel):
+    cursor: str | None = Query(None, description="Opaque cursor returned as `next_cursor` by the previous page")
+    size: int = Query(50, ge=1, le=500, description="Page size")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    model_config = ConfigDict(from_attributes=True)
+
+    items: Sequence[T]
+    size: int
+    next_cursor: str | None = None
+    total: int | None = None
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value: Any, column: Column) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if issubclass(python_type, datetime):
+        return datetime.fromisoformat(value)
+    if issubclass(python_type, date):
+        return date.fromisoformat(value)
+    if issubclass(python_type, (uuid.UUID, Decimal)):
+        return python_type(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_to_json(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, columns: Sequence[Column]) -> tuple:
+    """
+    Decode a cursor built by `encode_cursor` back to values typed after `columns`.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        assert isinstance(values, list) and len(values) == len(columns)
+        return tuple(_from_json(value, column) for value, column in zip(values, columns))
+    except Exception:
+        raise InvalidRequestException(message='Invalid cursor')
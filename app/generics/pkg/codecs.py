@@ -0,0 +1,160 @@
+"""
+Codecs of the Kafka message values.
+
+The consumers keep a value as `EncodedValue`, the raw bytes tagged with their codec,
+so that the callback validates its `message_model` straight from the bytes
+(`model_validate_json` for JSON) without building an intermediate dict. The codec of a
+message is read from its `content-type` header, then from the topic config of the
+consumer, JSON being the default.
+"""
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, NamedTuple
+
+import msgpack
+import orjson
+from pydantic import BaseModel
+
+
+CONTENT_TYPE_HEADER = 'content-type'
+
+
+class ModelValidators(NamedTuple):
+    python: Callable[[Any], BaseModel]
+    json: Callable[[bytes], BaseModel]
+
+    @classmethod
+    def of(cls, model: type[BaseModel]) -> 'ModelValidators':
+        return cls(python=model.model_validate, json=model.model_validate_json)
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f'Type is not serializable: {type(value)}')
+
+
+class Codec:
+    name: str = None
+    content_type: str = None
+
+    def dumps(self, value) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        raise NotImplementedError
+
+    def validate(self, validators: ModelValidators, data: bytes) -> BaseModel:
+        return validators.python(self.loads(data))
+
+
+class JSONCodec(Codec):
+    name = 'json'
+    content_type = 'application/json'
+
+    def dumps(self, value) -> bytes:
+        if isinstance(value, BaseModel):
+            return value.model_dump_json().encode('utf-8')
+        return orjson.dumps(value, default=_default)
+
+    def loads(self, data: bytes):
+        return orjson.loads(data)
+
+    def validate(self, validators: ModelValidators, data: bytes) -> BaseModel:
+        return validators.json(data)
+
+
+class MsgpackCodec(Codec):
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+
+    def dumps(self, value) -> bytes:
+        if isinstance(value, BaseModel):
+            value = value.model_dump(mode='json')
+        return msgpack.packb(value, default=_default)
+
+    def loads(self, data: bytes):
+        return msgpack.unpackb(data)
+
+
+CODECS: dict[str, Codec] = {codec.name: codec for codec in (JSONCodec(), MsgpackCodec())}
+CODECS_BY_CONTENT_TYPE: dict[str, Codec] = {codec.content_type: codec for codec in CODECS.values()}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f'Unknown codec `{name}`, available codecs: {", ".join(CODECS)}') from None
+
+
+class EncodedValue(bytes):
+    """
+    Raw message value which is decoded by its `codec` only when it is validated.
+    """
+    codec: Codec
+
+    def decode_value(self):
+        return self.codec.loads(self)
+
+
+def header_value(headers, name: str) -> str | None:
+    for key, value in headers or ():
+        if key == name:
+            return value.decode('utf-8') if isinstance(value, bytes) else value
+    return None
+
+
+class CodecValueDeserializer:
+    """
+    Value deserializer tagging the raw bytes with the codec of the message, picked from the
+    `content-type` header, then `topic_codecs` (by original topic for retried messages),
+    then `default`.
+    """
+
+    def __init__(self, topic_codecs: dict[str, str] | None = None, default: str = JSONCodec.name):
+        self.topic_codecs = {topic: get_codec(name) for topic, name in (topic_codecs or {}).items()}
+        self.default = get_codec(default)
+
+    def resolve(self, topic: str, headers) -> Codec:
+        content_type = header_value(headers, CONTENT_TYPE_HEADER)
+        if content_type is not None and content_type in CODECS_BY_CONTENT_TYPE:
+            return CODECS_BY_CONTENT_TYPE[content_type]
+        if self.topic_codecs:
+            topic = header_value(headers, 'x-original-topic') or topic
+            return self.topic_codecs.get(topic, self.default)
+        return self.default
+
+    def __call__(self, value: bytes, ctx) -> EncodedValue:
+        if value is None:
+            return value
+        encoded = EncodedValue(value)
+        encoded.codec = self.resolve(ctx.topic, ctx.headers)
+        return encoded
+
+
+class CodecValueSerializer:
+    """
+    Value serializer of `codec`, raw bytes (e.g. a consumed `EncodedValue` produced to a
+    retry topic) are produced as they are.
+    """
+
+    def __init__(self, codec: str = JSONCodec.name):
+        self.codec = get_codec(codec)
+
+    def __call__(self, value, ctx) -> bytes:
+        if value is None or isinstance(value, bytes):
+            return value
+        return self.codec.dumps(value)
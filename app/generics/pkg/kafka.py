@@ -1,27 +1,46 @@
 import logging
-import json
-import sys
+import orjson
+import asyncio
+import threading
+import time
 import uuid
 from typing import Callable, List
 import traceback
+from functools import cached_property
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from confluent_kafka import Consumer, TopicPartition, OFFSET_STORED, OFFSET_BEGINNING
 from confluent_kafka.deserializing_consumer import DeserializingConsumer
 from confluent_kafka.serializing_producer import SerializingProducer
 from confluent_kafka import KafkaError
 from confluent_kafka import KafkaException
+from confluent_kafka.serialization import SerializationContext, MessageField
 
 from pydantic import BaseModel
 
+from .codecs import (
+    CONTENT_TYPE_HEADER, CodecValueDeserializer, CodecValueSerializer, EncodedValue, ModelValidators, get_codec
+)
+
 logger = logging.getLogger(__name__)
 
 
 class HandlingMessageBaseCallback:
     enable_check_auth = False
     message_model: BaseModel = None
+    # Resolved once per callback class from `message_model`.
+    _validators: ModelValidators = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get('message_model') is not None:
+            assert issubclass(cls.message_model, BaseModel), (
+                '`message_model` has to be a pydantic model.'
+            )
+            cls._validators = ModelValidators.of(cls.message_model)
 
     def __init__(self, message):
-        self.message_value_dict = message.value()
+        self.message_value = message.value()
         self.key = message.key()
         self.topic = message.topic()
         self.partition = message.partition()
@@ -37,7 +56,7 @@ class HandlingMessageBaseCallback:
     def execute(self):
         try:
             self.initialize()
-            self.validate(self.message_value_dict)
+            self.validate(self.message_value)
             response = self.handle_message()
             extra = {'topic': self.topic, 'partition': self.partition, 'offset': self.offset, 'key': self.key}
             logger.info('Message was handled sucessfully!', extra=extra)
@@ -46,11 +65,20 @@ class HandlingMessageBaseCallback:
             self.handle_exception(exc)
         self.finalize(response)
 
-    def validate(self, message):
-        assert issubclass(self.message_model, BaseModel), (
+    @cached_property
+    def message_value_dict(self):
+        if isinstance(self.message_value, EncodedValue):
+            return self.message_value.decode_value()
+        return self.message_value
+
+    def validate(self, value):
+        assert self._validators is not None, (
             '`message_model` is required.'
         )
-        self.message = self.message_model.model_validate(message)
+        if isinstance(value, EncodedValue):
+            self.message = value.codec.validate(self._validators, value)
+        else:
+            self.message = self._validators.python(value)
 
     def authenticate(self):
         pass
@@ -85,67 +113,290 @@ class HandlingMessageBaseCallback:
     def error(self):
         return self._error
 
+class AsyncHandlingMessageCallback(HandlingMessageBaseCallback):
+    """
+    Same contract as `HandlingMessageBaseCallback` for consumers running on an event loop:
+    `handle_message` is a coroutine and can use the async redis/elasticsearch/database clients.
+    """
+
+    async def execute(self):
+        try:
+            self.initialize()
+            self.validate(self.message_value)
+            response = await self.handle_message()
+            extra = {'topic': self.topic, 'partition': self.partition, 'offset': self.offset, 'key': self.key}
+            logger.info('Message was handled sucessfully!', extra=extra)
+        except Exception as exc:
+            response = None
+            self.handle_exception(exc)
+        self.finalize(response)
+
+    async def handle_message(self):
+        raise NotImplementedError(
+            'subclasses of AsyncHandlingMessageCallback must provide a handle_message() method'
+        )
+
 def UUIDKeyDeserializer(key, ctx):
     if key is None:
         return key
     return uuid.UUID(key.decode('utf-8'))
 
 def JSONValueDeserialize(value, ctx):
-    return json.loads(value)
+    return orjson.loads(value)
+
+
+HEADER_ORIGINAL_TOPIC = 'x-original-topic'
+HEADER_ORIGINAL_PARTITION = 'x-original-partition'
+HEADER_ORIGINAL_OFFSET = 'x-original-offset'
+HEADER_RETRY_COUNT = 'x-retry-count'
+HEADER_NOT_BEFORE = 'x-retry-not-before'
+HEADER_FAILED_AT = 'x-failed-at'
+HEADER_ERROR = 'x-error'
+HEADER_REPLAYED_FROM = 'x-replayed-from'
+MAX_ERROR_HEADER_LENGTH = 4096
+FAILURE_HEADERS = {
+    HEADER_ORIGINAL_TOPIC, HEADER_ORIGINAL_PARTITION, HEADER_ORIGINAL_OFFSET, HEADER_RETRY_COUNT,
+    HEADER_NOT_BEFORE, HEADER_FAILED_AT, HEADER_ERROR,
+}
+
+
+def log_consume_error(message):
+    logger.error('Consume error', extra={
+        'topic': message.topic(), 'partition': message.partition(), 'error': str(message.error())
+    })
+
+
+def get_headers(message) -> dict[str, str]:
+    return {
+        key: value.decode('utf-8') if isinstance(value, bytes) else value
+        for key, value in (message.headers() or [])
+    }
 
 
 class KafkaBaseConsumer:
+    """
+    When `retry_delays` is set, a message whose callback keeps failing is produced to the
+    retry topic `<topic>.retry.<n>` with an exponential-like delay of `retry_delays[n - 1]`
+    seconds and the offset is committed, instead of blocking the partition. The consumer
+    also subscribes to its retry topics and handles a retried message once its delay has
+    elapsed. After the last retry, or straight away when only `dead_letter` is set, the
+    message ends up in `<topic>.dlq`. The failure metadata travels in the `x-*` headers,
+    along with the original headers of the message. The offset of a failed message is only
+    committed once its retry has been delivered, otherwise the partition is rewound to it.
+    """
     callback = HandlingMessageBaseCallback
     consumer_config = None
+    producer_config = None
     topics = None
     max_time_retry = 1
+    retry_delays: list[float] = []
+    dead_letter = False
+    # Codec name (`json`, `msgpack`) of the values by topic, for messages without `content-type` header.
+    topic_codecs: dict[str, str] = {}
+    default_codec = 'json'
     
     def __init__(self):
         self.set_consumer()
+        self.retry_producer = None
+        if self.retry_delays or self.dead_letter:
+            assert self.producer_config is not None, (
+                '`producer_config` is required to produce retries and dead letters.'
+            )
+            self.retry_producer = KafkaProducer({
+                'key.serializer': UUIDKeySerializer,
+                'value.serializer': CodecValueSerializer(self.default_codec),
+                **self.producer_config,
+            })
+        self._deferred: dict[tuple[str, int], tuple[float, TopicPartition]] = {}
+        # Partitions to rewind to a message whose retry could not be delivered, applied by the
+        # thread polling the consumer.
+        self._rewinds: dict[tuple[str, int], int] = {}
+        self._rewinds_lock = threading.Lock()
 
     def set_consumer(
         self,
         key_deserializer: Callable = UUIDKeyDeserializer,
-        value_deserializer: Callable = JSONValueDeserialize
+        value_deserializer: Callable = None
     ):
+        value_deserializer = value_deserializer or CodecValueDeserializer(self.topic_codecs, self.default_codec)
         self.consumer_config['enable.auto.commit'] = False
         self.consumer_config['key.deserializer'] = key_deserializer
         self.consumer_config['value.deserializer'] = value_deserializer
         self.consumer = DeserializingConsumer(self.consumer_config)
 
-    def process_message(self, message):
+    def deserialize(self, message):
+        # `DeserializingConsumer` has already deserialized the message.
+        pass
+
+    def retry_topic(self, topic: str, attempt: int) -> str:
+        return f'{topic}.retry.{attempt}'
+
+    def dead_letter_topic(self, topic: str) -> str:
+        return f'{topic}.dlq'
+
+    def subscribed_topics(self) -> list[str]:
+        return list(self.topics) + [
+            self.retry_topic(topic, attempt)
+            for topic in self.topics
+            for attempt in range(1, len(self.retry_delays) + 1)
+        ]
+
+    def retry_delay(self, message) -> float:
+        """
+        Seconds to wait before a message coming from a retry topic may be handled.
+        """
+        not_before = get_headers(message).get(HEADER_NOT_BEFORE)
+        if not_before is None:
+            return 0
+        return max(0, int(not_before) / 1000 - time.time())
+
+    def send_to_retry(self, message, error: str | None, dead_letter: bool = False):
+        """
+        Produce the failed message to its next retry topic, or to the dead letter topic
+        (straight away when `dead_letter`).
+        """
+        headers = get_headers(message)
+        original_topic = headers.get(HEADER_ORIGINAL_TOPIC, message.topic())
+        attempt = int(headers.get(HEADER_RETRY_COUNT, 0)) + 1
+        now = time.time()
+        # The headers of the producer travel with the message, the failure ones are replaced.
+        failure = {
+            **{key: value for key, value in headers.items() if key != HEADER_NOT_BEFORE},
+            HEADER_ORIGINAL_TOPIC: original_topic,
+            HEADER_ORIGINAL_PARTITION: headers.get(HEADER_ORIGINAL_PARTITION, str(message.partition())),
+            HEADER_ORIGINAL_OFFSET: headers.get(HEADER_ORIGINAL_OFFSET, str(message.offset())),
+            HEADER_RETRY_COUNT: str(attempt),
+            HEADER_FAILED_AT: str(int(now * 1000)),
+            HEADER_ERROR: (error or '')[-MAX_ERROR_HEADER_LENGTH:],
+        }
+        if attempt <= len(self.retry_delays) and not dead_letter:
+            topic = self.retry_topic(original_topic, attempt)
+            failure[HEADER_NOT_BEFORE] = str(int((now + self.retry_delays[attempt - 1]) * 1000))
+        else:
+            topic = self.dead_letter_topic(original_topic)
+        logger.warning('Message is sent to retry', extra={
+            'topic': message.topic(), 'partition': message.partition(), 'offset': message.offset(),
+            'retry_topic': topic, 'attempt': attempt,
+        })
+        self.retry_producer.deliver(topic, message.key(), message.value(), headers=failure)
+
+    def execute_callback(self, message) -> str | None:
         """
+        Run the callback on the message, up to `max_time_retry` times in place, and return
+        the error of the last attempt, `None` when it eventually succeeded.
         """
         num_time_exec = 0
+        error = None
         while num_time_exec < self.max_time_retry:
             callback = self.callback(message)
             callback.execute()
-            if callback.error is None:
-                self.consumer.commit()
-                break
+            error = callback.error
+            if error is None:
+                return None
             num_time_exec = num_time_exec + 1
+        return error
+
+    def process_message(self, message):
+        """
+        """
+        error = self.execute_callback(message)
+        if error is None:
+            self.consumer.commit()
+        elif self.retry_producer is not None:
+            if not self.try_send_to_retry(message, error):
+                self.request_rewind(message)
+                self.apply_rewinds()
+                return
+            self.consumer.commit()
+
+    def try_send_to_retry(self, message, error: str | None, dead_letter: bool = False) -> bool:
+        try:
+            self.send_to_retry(message, error, dead_letter)
+        except Exception:
+            logger.exception('Can not send message to retry', extra={
+                'topic': message.topic(), 'partition': message.partition(), 'offset': message.offset()
+            })
+            return False
+        return True
+
+    def request_rewind(self, message):
+        """
+        Have the partition of `message` consumed again from it, by `apply_rewinds`.
+        """
+        tp = (message.topic(), message.partition())
+        with self._rewinds_lock:
+            self._rewinds[tp] = min(self._rewinds.get(tp, message.offset()), message.offset())
+
+    def apply_rewinds(self) -> list[tuple[str, int]]:
+        with self._rewinds_lock:
+            rewinds, self._rewinds = self._rewinds, {}
+        for (topic, partition), offset in rewinds.items():
+            try:
+                self.consumer.seek(TopicPartition(topic, partition, offset))
+            except KafkaException:
+                logger.exception('Can not rewind partition', extra={'topic': topic, 'partition': partition})
+        return list(rewinds)
+
+    def defer_if_not_due(self, message, deferred: set) -> bool:
+        """
+        Used by the batch loops: pause the partition of a retried message which is not due
+        yet, and of the messages following it in the batch. Returns whether it's deferred.
+        """
+        tp = (message.topic(), message.partition())
+        if tp in deferred or tp in self._deferred:
+            return True
+        delay = self.retry_delay(message)
+        if delay > 0:
+            self.defer(message, delay)
+            deferred.add(tp)
+            return True
+        return False
+
+    def defer(self, message, delay: float):
+        """
+        Pause the partition of a retried message which is not due yet and rewind to it, the
+        partition is resumed by `resume_due` once the delay has elapsed.
+        """
+        tp = TopicPartition(message.topic(), message.partition(), message.offset())
+        self.consumer.pause([tp])
+        self.consumer.seek(tp)
+        self._deferred[(message.topic(), message.partition())] = (time.monotonic() + delay, tp)
+
+    def resume_due(self):
+        now = time.monotonic()
+        for key, (deadline, tp) in list(self._deferred.items()):
+            if deadline <= now:
+                del self._deferred[key]
+                try:
+                    self.consumer.resume([tp])
+                except KafkaException:
+                    logger.exception('Can not resume partition', extra={'topic': tp.topic, 'partition': tp.partition})
 
     def start_consume(self):
-        print('Start to consume message at topic: {}'.format(self.topics))
+        logger.info('Start to consume messages', extra={'topics': self.topics})
         while True:
             try:
-                self.consumer.subscribe(self.topics)
+                self.consumer.subscribe(self.subscribed_topics())
                 while True:
+                    self.resume_due()
                     msg = self.consumer.poll(timeout=1.0)
                     if msg is None: continue
                     if msg.error():
-                        if msg.error().code() == KafkaError._PARTITION_EOF:
-                            sys.stderr.write('%% %s [%d] reached end at offset %d\n' %
-                                            (msg.topic(), msg.partition(), msg.offset()))
-                        elif msg.error():
-                            raise KafkaException(msg.error())
-                    
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            log_consume_error(msg)
+                        continue
+
+                    delay = self.retry_delay(msg)
+                    if delay > 0:
+                        self.defer(msg, delay)
+                        continue
+
                     # Consumer just move on the next message when the current message is handled successfully!
                     logger.info('Incomming Message', extra={'topic': msg.topic(), 'partition': msg.partition(), 'offset': msg.offset(), 'key': msg.key()})
                     self.process_message(msg)
 
             except KeyboardInterrupt:
-                print('XXXX: KeyboardInterrupt')
+                logger.info('Consumer is interrupted')
                 break
             except KafkaException:
                 logger.exception('Kafka Error Occurs')
@@ -162,6 +413,7 @@ class KafkaBaseConsumer:
         msg = self.consumer.poll(timeout=1.0)
         if msg is not None:
             if not msg.error():
+                self.deserialize(msg)
                 logger.info('Incomming Message', extra={'topic': msg.topic(), 'partition': msg.partition(), 'offset': msg.offset(), 'key': msg.key()})
                 self.process_message(msg)
             
@@ -174,12 +426,16 @@ class KafkaBaseConsumer:
             print("No message received")
         self.consumer.close()
     
-    def consume_range_message(self, partition: int, start_offset: int, end_offset):
+    def consume_range_message(
+        self, partition: int, start_offset: int, end_offset, topic: str = None, handler: Callable = None
+    ):
+        topic = topic or self.topics[0]
+        handler = handler or self.process_message
         print(
             "topic: {}, consume messsage in partition {} from offset {} to offset {}".
-            format(self.topics[0], partition, start_offset, end_offset)
+            format(topic, partition, start_offset, end_offset)
         )
-        tp = TopicPartition(self.topics[0], partition, start_offset)
+        tp = TopicPartition(topic, partition, start_offset)
         self.consumer.assign([tp])
         self.consumer.seek(tp)
         while True:
@@ -196,22 +452,487 @@ class KafkaBaseConsumer:
                 if msg.offset() > end_offset:
                     print(f"Reached specified end offset {end_offset}")
                     break
+                self.deserialize(msg)
                 logger.info('Incomming Message', extra={'topic': msg.topic(), 'partition': msg.partition(), 'offset': msg.offset(), 'key': msg.key()})
-                self.process_message(msg)
+                handler(msg)
             except KeyboardInterrupt:
-                print('XXXX: KeyboardInterrupt')
+                logger.info('Consumer is interrupted')
                 break
             except KafkaException:
                 logger.exception('Kafka Error Occurs')
             except Exception:
                 logger.exception('Unexpected Exception Occurs')
+        self.consumer.close()
+
+    def replay_message(self, message):
+        """
+        Produce a dead letter back to its original topic, where it starts over without any retry.
+        """
+        headers = get_headers(message)
+        topic = headers.get(HEADER_ORIGINAL_TOPIC, self.topics[0])
+        replay_headers = {
+            **{key: value for key, value in headers.items() if key not in FAILURE_HEADERS},
+            HEADER_REPLAYED_FROM: f'{message.topic()}:{message.partition()}:{message.offset()}',
+        }
+        self.retry_producer.deliver(topic, message.key(), message.value(), headers=replay_headers)
+
+    def replay_dead_letters(self, partition: int, start_offset: int, end_offset: int, topic: str = None):
+        assert self.retry_producer is not None, '`dead_letter` or `retry_delays` has to be configured.'
+        topic = topic or self.dead_letter_topic(self.topics[0])
+        self.consume_range_message(partition, start_offset, end_offset, topic=topic, handler=self.replay_message)
+        self.retry_producer.close()
+
+
+class ManualDeserializingMixin:
+    """
+    Build a plain `Consumer` and deserialize messages explicitly, because
+    `DeserializingConsumer` doesn't implement `consume()`.
+    """
+    def set_consumer(
+        self,
+        key_deserializer: Callable = UUIDKeyDeserializer,
+        value_deserializer: Callable = None
+    ):
+        value_deserializer = value_deserializer or CodecValueDeserializer(self.topic_codecs, self.default_codec)
+        config = dict(self.consumer_config)
+        config.pop('key.deserializer', None)
+        config.pop('value.deserializer', None)
+        config['enable.auto.commit'] = False
+        self.key_deserializer = key_deserializer
+        self.value_deserializer = value_deserializer
+        self.consumer = Consumer(config)
+
+    def deserialize(self, message):
+        """
+        Both or none of the key and value are replaced, a message which fails keeps its raw
+        bytes, as they go to the dead letter topic.
+        """
+        headers = message.headers()
+        key, value = message.key(), message.value()
+        if key is not None:
+            key = self.key_deserializer(key, SerializationContext(message.topic(), MessageField.KEY, headers))
+        if value is not None:
+            value = self.value_deserializer(value, SerializationContext(message.topic(), MessageField.VALUE, headers))
+        message.set_key(key)
+        message.set_value(value)
+
+    def deserialize_or_dead_letter(self, message) -> bool | None:
+        """
+        Deserialize the message, or produce it as it is to the dead letter topic since
+        retrying can't help. Returns whether it was deserialized, `None` when it could be
+        neither deserialized nor sent.
+        """
+        try:
+            self.deserialize(message)
+        except Exception:
+            logger.exception('Can not deserialize message', extra={
+                'topic': message.topic(), 'partition': message.partition(), 'offset': message.offset()
+            })
+            if self.retry_producer is not None and not self.try_send_to_retry(
+                message, traceback.format_exc(), dead_letter=True
+            ):
+                return None
+            return False
+        return True
+
+
+class KafkaBatchConsumer(ManualDeserializingMixin, KafkaBaseConsumer):
+    """
+    Consumer fetching messages in batches and handling them concurrently.
+
+    Messages are dispatched to `num_workers` single-threaded workers keyed by partition,
+    so messages of a partition are still handled one after another, in order, while
+    partitions progress independently. Offsets are committed asynchronously, at the
+    highest processed offset of each partition, every `commit_every` messages or
+    `commit_interval` seconds. The `callback` contract is the same as with
+    `KafkaBaseConsumer`, messages are deserialized by the workers.
+
+    Retried messages which are not due yet pause their partition from the polling thread.
+    When the retry of a message can not be delivered, the following messages of its
+    partition already dispatched are dropped (`_epochs`) and the partition is rewound to it.
+    """
+    batch_size = 500
+    num_workers = 8
+    max_in_flight = 5000
+    commit_every = 1000
+    commit_interval = 5.0
+
+    def __init__(self):
+        super().__init__()
+        self.workers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'kafka-worker-{index}')
+            for index in range(self.num_workers)
+        ]
+        self._lock = threading.Lock()
+        self._in_flight: dict[tuple[str, int], set[Future]] = {}
+        self._processed: dict[tuple[str, int], int] = {}
+        self._committed: dict[tuple[str, int], int] = {}
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        # Messages dispatched with an epoch lower than the minimum of their partition are
+        # dropped, the partition has been rewound before them.
+        self._epochs: dict[tuple[str, int], int] = {}
+        self._min_epochs: dict[tuple[str, int], int] = {}
+
+    def handle(self, message, epoch: int = 0):
+        """
+        Run by the partition's worker.
+        """
+        tp = (message.topic(), message.partition())
+        with self._lock:
+            if epoch < self._min_epochs.get(tp, 0):
+                return
+        deserialized = self.deserialize_or_dead_letter(message)
+        sent = deserialized is not None
+        if deserialized:
+            error = self.execute_callback(message)
+            if error is not None and self.retry_producer is not None:
+                sent = self.try_send_to_retry(message, error)
+        if not sent:
+            with self._lock:
+                self._min_epochs[tp] = epoch + 1
+            self.request_rewind(message)
+            return
+        # Whether the callback succeeded or not, the consumer moves on as `KafkaBaseConsumer` does.
+        with self._lock:
+            self._processed[tp] = max(self._processed.get(tp, -1), message.offset())
+            self._uncommitted += 1
+
+    def apply_rewinds(self) -> list[tuple[str, int]]:
+        rewound = super().apply_rewinds()
+        with self._lock:
+            for tp in rewound:
+                self._epochs[tp] = self._min_epochs.get(tp, 0)
+        return rewound
+
+    def dispatch(self, message):
+        tp = (message.topic(), message.partition())
+        worker = self.workers[hash(tp) % self.num_workers]
+        future = worker.submit(self.handle, message, self._epochs.get(tp, 0))
+        in_flight = self._in_flight.setdefault(tp, set())
+        in_flight.add(future)
+        future.add_done_callback(in_flight.discard)
+
+    def wait_in_flight(self, partitions=None):
+        futures = [
+            future for tp, in_flight in list(self._in_flight.items())
+            if partitions is None or tp in partitions
+            for future in list(in_flight)
+        ]
+        wait(futures)
+
+    def num_in_flight(self) -> int:
+        return sum(len(in_flight) for in_flight in self._in_flight.values())
+
+    def commit(self, force: bool = False, asynchronous: bool = True):
+        # A partition is handled by a single worker, in order, so its highest processed
+        # offset is also the highest contiguous one.
+        with self._lock:
+            due = force or self._uncommitted >= self.commit_every or (
+                time.monotonic() - self._last_commit >= self.commit_interval
+            )
+            if not due:
+                return
+            offsets = [
+                TopicPartition(topic, partition, offset + 1)
+                for (topic, partition), offset in self._processed.items()
+                if offset > self._committed.get((topic, partition), -1)
+            ]
+            for tp in offsets:
+                self._committed[(tp.topic, tp.partition)] = tp.offset - 1
+            self._uncommitted = 0
+            self._last_commit = time.monotonic()
+        if offsets:
+            self.consumer.commit(offsets=offsets, asynchronous=asynchronous)
+
+    def on_revoke(self, consumer, partitions):
+        revoked = {(tp.topic, tp.partition) for tp in partitions}
+        self.wait_in_flight(revoked)
+        self.commit(force=True, asynchronous=False)
+        with self._lock:
+            for tp in revoked:
+                self._in_flight.pop(tp, None)
+                self._processed.pop(tp, None)
+                self._committed.pop(tp, None)
+                self._deferred.pop(tp, None)
+        with self._rewinds_lock:
+            for tp in revoked:
+                self._rewinds.pop(tp, None)
+
+    def start_consume(self):
+        logger.info('Start to consume messages', extra={'topics': self.topics})
+        self.consumer.subscribe(self.subscribed_topics(), on_revoke=self.on_revoke)
+        while True:
+            try:
+                self.apply_rewinds()
+                self.resume_due()
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=1.0)
+                deferred = set()
+                for msg in messages:
+                    if msg.error():
+                        # Only this message is skipped, the rest of the batch is still handled
+                        # and committed.
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            log_consume_error(msg)
+                        continue
+                    if self.defer_if_not_due(msg, deferred):
+                        continue
+                    self.dispatch(msg)
+                while self.num_in_flight() >= self.max_in_flight:
+                    wait(
+                        [future for in_flight in list(self._in_flight.values()) for future in list(in_flight)],
+                        timeout=1.0, return_when=FIRST_COMPLETED
+                    )
+                self.commit()
+            except KeyboardInterrupt:
+                logger.info('Consumer is interrupted')
+                break
+            except KafkaException:
+                logger.exception('Kafka Error Occurs')
+            except Exception:
+                logger.exception('Unexpected Exception Occurs')
+                break
+        self.wait_in_flight()
+        self.commit(force=True, asynchronous=False)
+        for worker in self.workers:
+            worker.shutdown()
+        self.consumer.close()
+
+
+class OffsetTracker:
+    """
+    Thread-safe bookkeeping of the messages handed out per partition. A partition can be
+    committed up to its lowest unfinished offset, or past its last seen offset when every
+    message has finished, even though messages finish out of order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: dict[tuple[str, int], set[int]] = {}
+        self._last_seen: dict[tuple[str, int], int] = {}
+        self._committed: dict[tuple[str, int], int] = {}
+        self.finished = 0
+
+    def start(self, tp: tuple[str, int], offset: int):
+        with self._lock:
+            self._in_flight.setdefault(tp, set()).add(offset)
+            self._last_seen[tp] = max(self._last_seen.get(tp, -1), offset)
+
+    def done(self, tp: tuple[str, int], offset: int):
+        with self._lock:
+            self._in_flight.get(tp, set()).discard(offset)
+            self.finished += 1
+
+    def num_in_flight(self, partitions=None) -> int:
+        with self._lock:
+            return sum(
+                len(offsets) for tp, offsets in self._in_flight.items()
+                if partitions is None or tp in partitions
+            )
+
+    def to_commit(self) -> list[TopicPartition]:
+        with self._lock:
+            offsets = []
+            for tp, last_seen in self._last_seen.items():
+                in_flight = self._in_flight.get(tp)
+                offset = min(in_flight) if in_flight else last_seen + 1
+                if offset > self._committed.get(tp, -1):
+                    self._committed[tp] = offset
+                    offsets.append(TopicPartition(tp[0], tp[1], offset))
+            self.finished = 0
+            return offsets
+
+    def forget(self, partitions):
+        with self._lock:
+            for tp in partitions:
+                self._in_flight.pop(tp, None)
+                self._last_seen.pop(tp, None)
+                self._committed.pop(tp, None)
+
+
+class AsyncKafkaConsumer(ManualDeserializingMixin, KafkaBaseConsumer):
+    """
+    Consumer running `AsyncHandlingMessageCallback` callbacks on an asyncio event loop.
+
+    A thread polls Kafka in batches and feeds an asyncio queue holding at most `queue_size`
+    messages, up to `max_concurrency` callbacks run concurrently. Offsets are committed by
+    the polling thread every `commit_every` messages or `commit_interval` seconds, at the
+    lowest unfinished offset of each partition. Clients the callbacks use should be created
+    once per process, `on_startup`/`on_shutdown` are run around the consumption.
+
+    Retried messages which are not due yet pause their partition from the polling thread.
+    A message whose retry can not be delivered stays unfinished, which holds the commit of
+    its partition back, and the partition is rewound to it.
+    """
+    callback = AsyncHandlingMessageCallback
+    batch_size = 500
+    queue_size = 1000
+    max_concurrency = 64
+    commit_every = 1000
+    commit_interval = 5.0
+    revoke_timeout = 30.0
+
+    def __init__(self):
+        super().__init__()
+        self.tracker = OffsetTracker()
+        self._slots = threading.Semaphore(self.queue_size)
+        self._stopping = threading.Event()
+        self._last_commit = time.monotonic()
+
+    async def on_startup(self):
+        pass
+
+    async def on_shutdown(self):
+        pass
+
+    async def execute_callback_async(self, message) -> str | None:
+        num_time_exec = 0
+        error = None
+        while num_time_exec < self.max_time_retry:
+            callback = self.callback(message)
+            await callback.execute()
+            error = callback.error
+            if error is None:
+                return None
+            num_time_exec = num_time_exec + 1
+        return error
+
+    def commit(self, force: bool = False, asynchronous: bool = True):
+        due = force or self.tracker.finished >= self.commit_every or (
+            time.monotonic() - self._last_commit >= self.commit_interval
+        )
+        if not due:
+            return
+        self._last_commit = time.monotonic()
+        offsets = self.tracker.to_commit()
+        if offsets:
+            self.consumer.commit(offsets=offsets, asynchronous=asynchronous)
+
+    def on_revoke(self, consumer, partitions):
+        revoked = {(tp.topic, tp.partition) for tp in partitions}
+        deadline = time.monotonic() + self.revoke_timeout
+        while self.tracker.num_in_flight(revoked) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.commit(force=True, asynchronous=False)
+        self.tracker.forget(revoked)
+        for tp in revoked:
+            self._deferred.pop(tp, None)
+        with self._rewinds_lock:
+            for tp in revoked:
+                self._rewinds.pop(tp, None)
+
+    def poll_loop(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        """
+        Run in a thread, it's the only place touching the consumer while consuming.
+        """
+        self.consumer.subscribe(self.subscribed_topics(), on_revoke=self.on_revoke)
+        while not self._stopping.is_set():
+            try:
+                self.apply_rewinds()
+                self.resume_due()
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=1.0)
+                deferred = set()
+                for msg in messages:
+                    if msg.error():
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            log_consume_error(msg)
+                        continue
+                    if self.defer_if_not_due(msg, deferred):
+                        continue
+                    tp = (msg.topic(), msg.partition())
+                    self.tracker.start(tp, msg.offset())
+                    deserialized = self.deserialize_or_dead_letter(msg)
+                    if deserialized is None:
+                        # Left unfinished, like a message whose retry can't be delivered.
+                        self.request_rewind(msg)
+                        continue
+                    if not deserialized:
+                        self.tracker.done(tp, msg.offset())
+                        continue
+                    while not self._slots.acquire(timeout=0.5):
+                        if self._stopping.is_set():
+                            break
+                    else:
+                        loop.call_soon_threadsafe(queue.put_nowait, msg)
+                self.commit()
+            except KafkaException:
+                logger.exception('Kafka Error Occurs')
+            except Exception:
+                logger.exception('Unexpected Exception Occurs')
+                break
+        loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def handle(self, message, semaphore: asyncio.Semaphore):
+        finished = True
+        try:
+            error = await self.execute_callback_async(message)
+            if error is not None and self.retry_producer is not None:
+                # `KafkaProducer.deliver` waits for the delivery, keep it off the event loop.
+                sent = await asyncio.get_running_loop().run_in_executor(
+                    None, self.try_send_to_retry, message, error
+                )
+                if not sent:
+                    finished = False
+                    self.request_rewind(message)
+        finally:
+            if finished:
+                self.tracker.done((message.topic(), message.partition()), message.offset())
+            semaphore.release()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: set[asyncio.Task] = set()
+        await self.on_startup()
+        poller = threading.Thread(target=self.poll_loop, args=(loop, queue), name='kafka-consumer-poll', daemon=True)
+        poller.start()
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                self._slots.release()
+                await semaphore.acquire()
+                task = asyncio.create_task(self.handle(message, semaphore))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            self._stopping.set()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.run_in_executor(None, poller.join)
+            self.commit(force=True, asynchronous=False)
             self.consumer.close()
+            await self.on_shutdown()
+
+    def start_consume(self):
+        logger.info('Start to consume messages', extra={'topics': self.topics})
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            logger.info('Consumer is interrupted')
+
 
 class KafkaProducer:
-    def __init__(self, config: dict):
+    """
+    When `codec` is given, values are serialized with it and tagged with its `content-type`
+    header, otherwise `value.serializer` of the config is used.
+    """
+
+    def __init__(self, config: dict, codec: str = None):
+        self.content_type = None
+        if codec is not None:
+            config = {**config, 'value.serializer': CodecValueSerializer(codec)}
+            self.content_type = get_codec(codec).content_type
         self.config = config
         self.producer = SerializingProducer(config)
 
+    def get_headers(self, headers: dict = None) -> dict | None:
+        if self.content_type is None:
+            return headers
+        return {CONTENT_TYPE_HEADER: self.content_type, **(headers or {})}
+
     def delivery_report(self, err, msg):
         if err is not None:
             logger.error('Delivery message failed', extra={'key': msg.key()})
@@ -220,24 +941,147 @@ class KafkaProducer:
                 'topic': msg.topic(), 'partition': msg.partition()
             })
 
-    def produce(self, topic: str, key, value: dict, partition: int=None):
+    def produce(self, topic: str, key, value: dict, partition: int=None, headers: dict=None):
         """
         """
+        headers = self.get_headers(headers)
         if partition is None:
-            if key is not None:
-                self.producer.produce(topic, key, value, on_delivery=self.delivery_report)
-            else:
-                self.producer.produce(topic, value=value, on_delivery=self.delivery_report)
+            self.producer.produce(topic, key=key, value=value, headers=headers, on_delivery=self.delivery_report)
         else:
-            if key is not None:
-                self.producer.produce(topic, key, value, partition, on_delivery=self.on_delivery)
-            else:
-                self.producer.produce(topic, value=value, partition=partition, on_delivery=self.on_delivery)
+            self.producer.produce(
+                topic, key=key, value=value, partition=partition, headers=headers, on_delivery=self.delivery_report
+            )
         self.producer.flush()
 
+    def deliver(self, topic: str, key, value: dict, partition: int=None, headers: dict=None, timeout: float = 30):
+        """
+        Produce a message and wait for the broker to acknowledge it, raises `KafkaException`
+        when it is not delivered within `timeout` seconds.
+        """
+        report = {}
+
+        def on_delivery(err, msg):
+            report['error'] = err
+
+        kwargs = {'key': key, 'value': value, 'headers': self.get_headers(headers), 'on_delivery': on_delivery}
+        if partition is not None:
+            kwargs['partition'] = partition
+        self.producer.produce(topic, **kwargs)
+        self.producer.flush(timeout)
+        if 'error' not in report:
+            raise KafkaException(KafkaError(KafkaError._MSG_TIMED_OUT))
+        if report['error'] is not None:
+            raise KafkaException(report['error'])
+
+    def close(self, timeout: float = 30):
+        self.producer.flush(timeout)
+
+
+class AsyncKafkaProducer(KafkaProducer):
+    """
+    Producer for asyncio applications which never flushes per message.
+
+    `enqueue` hands the message to librdkafka's queue, which batches it according to
+    `linger.ms`/`batch.num.messages`, and returns a future resolved with the delivered
+    message (or failed with a `KafkaException`) once the broker acknowledges it, so that
+    hot paths can enqueue a whole batch and wait for all of it at once. `produce` waits
+    for the delivery of one message.
+
+    Delivery callbacks are served by a background thread polling the producer. The
+    deliveries of one `poll` are handed to the event loop in a single
+    `call_soon_threadsafe`, rather than waking the loop once per message. The queue is
+    only flushed explicitly by `close` at shutdown.
+    """
+    default_config = {
+        'linger.ms': 5,
+        'batch.num.messages': 10000,
+        'queue.buffering.max.messages': 100000,
+    }
+    poll_timeout = 0.1
+    max_buffer_retries = 50
+
+    def __init__(self, config: dict, codec: str = None):
+        super().__init__({**self.default_config, **config}, codec)
+        self._delivered: list[tuple] = []
+        self._closed = threading.Event()
+        self._poll_thread = threading.Thread(target=self._poll_loop, name='kafka-producer-poll', daemon=True)
+        self._poll_thread.start()
+
+    def _poll_loop(self):
+        while not self._closed.is_set():
+            self.producer.poll(self.poll_timeout)
+            self._dispatch_deliveries()
+
+    def _dispatch_deliveries(self):
+        # Only the thread serving the callbacks (the poll thread, then `close`) touches `_delivered`.
+        if not self._delivered:
+            return
+        delivered, self._delivered = self._delivered, []
+        by_loop: dict[asyncio.AbstractEventLoop, list] = {}
+        for loop, future, exc, msg in delivered:
+            by_loop.setdefault(loop, []).append((future, exc, msg))
+        for loop, deliveries in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_resolve_deliveries, deliveries)
+            except RuntimeError:
+                # The loop is closed, nobody is waiting anymore.
+                pass
+
+    async def enqueue(self, topic: str, key, value: dict, partition: int=None, headers: dict=None) -> asyncio.Future:
+        """Only waits when the local queue is full, the returned future is resolved on delivery."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_delivery(err, msg):
+            if err is not None:
+                logger.error('Delivery message failed', extra={'topic': topic, 'key': msg.key()})
+            self._delivered.append((loop, future, KafkaException(err) if err is not None else None, msg))
+
+        kwargs = {'key': key, 'value': value, 'headers': self.get_headers(headers), 'on_delivery': on_delivery}
+        if partition is not None:
+            kwargs['partition'] = partition
+        for _ in range(self.max_buffer_retries):
+            try:
+                self.producer.produce(topic, **kwargs)
+                return future
+            except BufferError:
+                # The local queue is full, give the poll thread some time to drain it.
+                await asyncio.sleep(self.poll_timeout)
+        raise BufferError('Kafka producer queue is full')
+
+    async def produce(self, topic: str, key, value: dict, partition: int=None, headers: dict=None):
+        return await (await self.enqueue(topic, key, value, partition, headers))
+
+    def close(self, timeout: float = 30):
+        self._closed.set()
+        self._poll_thread.join()
+        super().close(timeout)
+        self._dispatch_deliveries()
+
+
+def _resolve_deliveries(deliveries: list[tuple]):
+    for future, exc, msg in deliveries:
+        if exc is not None:
+            _set_exception(future, exc)
+        else:
+            _set_result(future, msg)
+
+
+def _set_result(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exc: Exception):
+    if not future.done():
+        future.set_exception(exc)
+
 
 def UUIDKeySerializer(key: uuid.UUID, ctx):
+    # Raw bytes are keys which couldn't be deserialized, produced as they are to the dead letter topic.
+    if key is None or isinstance(key, bytes):
+        return key
     return str(key).encode('utf-8')
 
 def JSONValueSerialize(value: dict, ctx):
-    return json.dumps(value)
+    return orjson.dumps(value)
@@ -0,0 +1,355 @@
+import math
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import redis.asyncio as redis
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import column, select, table
+
+from .database import async_session
+from .redis import redis_connection
+from .settings import settings
+from .utils.alert_notification import alert_dispatcher
+from .utils.cache import LRUTTLCache
+
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = 'ratelimit:'
+API_KEY_HEADER = 'x-api-key'
+# `app.users.models.APIkey`, without importing the users package into generics.
+API_KEYS_TABLE = table('api_keys', column('key'), column('user_id'), column('is_disabled'))
+
+# GCRA over the entries `key, emission interval (ms), period (ms), tokens` of ARGV. Positive
+# tokens are taken, as many as fit in the period, negative ones are given back (unused
+# leases). Returns `granted, retry after (ms)` per entry.
+GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + tonumber(now[2]) / 1000
+local result = {}
+for i = 1, #ARGV, 4 do
+    local key = ARGV[i]
+    local interval = tonumber(ARGV[i + 1])
+    local period = tonumber(ARGV[i + 2])
+    local tokens = tonumber(ARGV[i + 3])
+    local tat = math.max(tonumber(redis.call('GET', key) or 0), now)
+    local granted = 0
+    local retry_after = 0
+    if tokens > 0 then
+        granted = math.min(tokens, math.floor((now + period - tat) / interval))
+        if granted > 0 then
+            tat = tat + granted * interval
+        else
+            granted = 0
+            retry_after = math.ceil(tat + interval - period - now)
+        end
+    else
+        tat = math.max(tat + tokens * interval, now)
+    end
+    if tat > now then
+        redis.call('SET', key, tostring(tat), 'PX', math.ceil(tat - now))
+    else
+        redis.call('DEL', key)
+    end
+    table.insert(result, granted)
+    table.insert(result, retry_after)
+end
+return result
+"""
+
+
+@dataclass
+class Lease:
+    tokens: int
+    expires_at: float
+    interval: float
+    period: float
+    # Taken from the local bucket while redis is unavailable, nothing to give back to redis.
+    local: bool = False
+
+
+class HybridRateLimiter:
+    """
+    Rate limiter keeping a GCRA bucket per key in redis and a lease of it per worker.
+
+    A worker takes `lease_size` tokens of a key at once from redis and spends them locally,
+    so most requests don't hit redis at all. Leases live `lease_ttl` seconds, the tokens
+    left unused are given back by a background task in one script for all the expired
+    leases. Since tokens are taken from redis before being spent, the workers together
+    never admit more than the limit; the error is on the other side, tokens leased by a
+    worker are unavailable to the others until given back, at most
+    `lease_size * workers` of a key. `lease_size` is `error_margin` of the limit.
+
+    Concurrent requests of a worker on an empty lease share one call to redis.
+
+    While redis is unavailable, leases are taken from a GCRA bucket local to the worker
+    allowing `times / workers` of a key, so that the routes keep being limited rather than
+    failing.
+    """
+
+    def __init__(
+        self, connection: redis.Redis, error_margin: float, lease_ttl: float, max_leases: int, workers: int = 1
+    ):
+        self.redis = connection
+        self.error_margin = error_margin
+        self.lease_ttl = lease_ttl
+        self.max_leases = max_leases
+        self.workers = max(1, workers)
+        self.leases: dict[str, Lease] = {}
+        # Theoretical arrival times (monotonic, ms) of the local buckets.
+        self.local_tats: dict[str, float] = {}
+        self._gcra = connection.register_script(GCRA_SCRIPT)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._task: asyncio.Task | None = None
+        self.local_hits = 0
+        self.redis_calls = 0
+        self.limited = 0
+        self.returned = 0
+        self.fallbacks = 0
+        self._degraded = False
+
+    def lease_size(self, times: int) -> int:
+        return max(1, math.floor(times * self.error_margin))
+
+    async def hit(self, key: str, times: int, period: float) -> int:
+        """
+        Take one token of `key`, allowing `times` per `period` seconds. Returns 0 when it's
+        allowed, otherwise the milliseconds to wait.
+        """
+        while True:
+            lease = self.leases.get(key)
+            if lease is not None and lease.tokens > 0 and lease.expires_at > time.monotonic():
+                lease.tokens -= 1
+                self.local_hits += 1
+                return 0
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._take_lease(key, times, period, lease))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            retry_after = await asyncio.shield(task)
+            if retry_after:
+                self.limited += 1
+                return retry_after
+
+    async def _take_lease(self, key: str, times: int, period: float, previous: Lease | None) -> int:
+        interval = period * 1000 / times
+        args = [key, interval, period * 1000, self.lease_size(times)]
+        if previous is not None and previous.tokens > 0 and not previous.local:
+            # The previous lease expired with tokens left, give them back in the same call.
+            args = [key, previous.interval, previous.period, -previous.tokens, *args]
+        self.redis_calls += 1
+        try:
+            *_, granted, retry_after = await self._gcra(args=args)
+        except redis.RedisError:
+            return await self._take_local_lease(key, times, period)
+        if self._degraded:
+            self._degraded = False
+            logger.info('Rate limiter is back to redis')
+        if granted:
+            if len(self.leases) >= self.max_leases and key not in self.leases:
+                await self.return_expired(force=True)
+            self.leases[key] = Lease(granted, time.monotonic() + self.lease_ttl, interval, period * 1000)
+        else:
+            self.leases.pop(key, None)
+        return retry_after
+
+    async def _take_local_lease(self, key: str, times: int, period: float) -> int:
+        """
+        Same as the script, on the share of the limit of this worker.
+        """
+        self.fallbacks += 1
+        if not self._degraded:
+            self._degraded = True
+            logger.exception('Rate limiter falls back to local buckets')
+        times = max(1, times // self.workers)
+        interval = period * 1000 / times
+        now = time.monotonic() * 1000
+        if len(self.local_tats) >= self.max_leases and key not in self.local_tats:
+            self.local_tats = {k: tat for k, tat in self.local_tats.items() if tat > now}
+            if len(self.local_tats) >= self.max_leases:
+                self.local_tats.clear()
+        tat = max(self.local_tats.get(key, now), now)
+        granted = min(self.lease_size(times), math.floor((now + period * 1000 - tat) / interval))
+        if granted <= 0:
+            self.leases.pop(key, None)
+            return math.ceil(tat + interval - period * 1000 - now)
+        self.local_tats[key] = tat + granted * interval
+        self.leases[key] = Lease(granted, time.monotonic() + self.lease_ttl, interval, period * 1000, local=True)
+        return 0
+
+    async def return_expired(self, force: bool = False):
+        """
+        Give the unused tokens of the expired leases back in one script, all the leases when
+        `force`.
+        """
+        now = time.monotonic()
+        expired = [
+            (key, lease) for key, lease in self.leases.items()
+            if (force or lease.expires_at <= now) and key not in self._inflight
+        ]
+        if not expired:
+            return
+        args = []
+        for key, lease in expired:
+            del self.leases[key]
+            if lease.tokens > 0 and not lease.local:
+                args.extend([key, lease.interval, lease.period, -lease.tokens])
+                self.returned += lease.tokens
+        if args:
+            self.redis_calls += 1
+            await self._gcra(args=args)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.return_expired(force=True)
+        except Exception:
+            logger.exception('Can not give back the leased tokens')
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl)
+            try:
+                await self.return_expired()
+            except Exception:
+                logger.exception('Can not give back the leased tokens')
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'leases': len(self.leases), 'local_hits': self.local_hits, 'redis_calls': self.redis_calls,
+            'limited': self.limited, 'returned': self.returned, 'fallbacks': self.fallbacks,
+            'degraded': self._degraded,
+        }
+
+
+rate_limiter = HybridRateLimiter(
+    redis_connection,
+    error_margin=settings.RATE_LIMIT_ERROR_MARGIN,
+    lease_ttl=settings.RATE_LIMIT_LEASE_TTL,
+    max_leases=settings.RATE_LIMIT_MAX_LEASES,
+    workers=settings.WEB_CONCURRENCY,
+)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The peer address, or the address the outermost trusted proxy saw: each proxy appends
+    the address it received the request from to `X-Forwarded-For`, the entries before the
+    ones of our proxies are written by the client.
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get('x-forwarded-for')
+        if forwarded:
+            addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+            if addresses:
+                return addresses[-min(settings.RATE_LIMIT_TRUSTED_HOPS, len(addresses))]
+    return request.client.host if request.client else 'unknown'
+
+
+_api_key_owners = LRUTTLCache(
+    maxsize=settings.RATE_LIMIT_API_KEY_CACHE_SIZE, ttl=settings.RATE_LIMIT_API_KEY_CACHE_TTL
+)
+
+
+async def api_key_owner(api_key: str) -> str | None:
+    """
+    Id of the user of an enabled API key, `None` for unknown or disabled keys. Both are
+    cached, keyed by the hash of the key.
+    """
+    digest = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    owner = _api_key_owners.get(digest)
+    if owner is None:
+        async with async_session() as db_session:
+            user_id = await db_session.scalar(
+                select(API_KEYS_TABLE.c.user_id)
+                .where(API_KEYS_TABLE.c.key == api_key, API_KEYS_TABLE.c.is_disabled.is_(False))
+                .limit(1)
+            )
+        owner = str(user_id) if user_id is not None else ''
+        _api_key_owners.set(digest, owner)
+    return owner or None
+
+
+async def default_identifier(request: Request) -> str:
+    """
+    The user of the token, else the user of a valid API key, else the IP of the caller.
+    """
+    # Claims have been decoded and verified by AuthenticationMiddleware.
+    payload = request.state.token_payload
+    if payload is not None:
+        return f"user:{payload['sub']}"
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key:
+        # An unchecked key would let a caller pick a fresh bucket per request.
+        owner = await api_key_owner(api_key)
+        if owner is not None:
+            return f'user:{owner}'
+    return f'ip:{client_ip(request)}'
+
+
+async def rate_limit_http_callback(request: Request, response: Response, pexpire: int):
+    """
+    default callback when too many requests
+    :param request:
+    :param pexpire: The remaining milliseconds
+    :param response:
+    :return:
+    """
+    # One alert per path per flush window, whoever hits the limit.
+    alert_dispatcher.notify(
+        f'**Environment:** {settings.ENVIRONMENT}\n**Path:** {str(request.url.path)}\n',
+        'Rate Limiter',
+        key=str(request.url.path),
+    )
+    expire = math.ceil(pexpire / 1000)
+    raise HTTPException(
+        status.HTTP_429_TOO_MANY_REQUESTS, "Too Many Requests", headers={"Retry-After": str(expire)}
+    )
+
+
+class RateLimiter:
+    """
+    Route dependency allowing `times` requests per period to each identity:
+
+        @router.post('/holds', dependencies=[Depends(RateLimiter(times=10, minutes=1))])
+    """
+
+    def __init__(
+        self,
+        times: int,
+        milliseconds: int = 0,
+        seconds: int = 0,
+        minutes: int = 0,
+        hours: int = 0,
+        identifier: Callable[[Request], Awaitable[str]] = default_identifier,
+        callback: Callable = rate_limit_http_callback,
+    ):
+        self.times = times
+        self.period = milliseconds / 1000 + seconds + 60 * minutes + 3600 * hours
+        assert self.times > 0 and self.period > 0, '`times` and the period must be positive.'
+        self.identifier = identifier
+        self.callback = callback
+
+    async def __call__(self, request: Request, response: Response):
+        # The route template rather than the path, so that `/holds/{hold_id}` is one limit.
+        route = request.scope.get('route')
+        path = route.path if route is not None else request.scope['path']
+        identity = await self.identifier(request)
+        key = f'{RATE_LIMIT_KEY_PREFIX}{request.method}:{path}:{self.times}/{self.period}:{identity}'
+        retry_after = await rate_limiter.hit(key, self.times, self.period)
+        if retry_after:
+            return await self.callback(request, response, retry_after)
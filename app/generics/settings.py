@@ -12,11 +12,19 @@ class Settings(BaseSettings):
     DB_PASSWORD_PLAIN: str
     DB_NAME: str
     CONN_POOL_SIZE: Optional[int] = 8
+    CONN_POOL_MAX_OVERFLOW: int = 8
+    CONN_POOL_TIMEOUT: int = 30
+    # Connection budget of the whole webserver, split between the gunicorn workers.
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    WEB_CONCURRENCY: int = 1
 
     DATABASE_URI: PostgresDsn | None = None
     
     ENVIRONMENT: str
     LOGGING_LEVEL: str
+    LOG_BODY_SAMPLE_RATE: float = 1.0
+    LOG_BODY_MAX_SIZE: int = 16384
+    LOG_BODY_CONTENT_TYPES: list[str] = ['application/json']
     
     @validator('DATABASE_URI', pre=True)
     def assemble_db_connection(
@@ -45,15 +53,95 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_MAX_CONN_POOL: int = 10
 
+    COUNT_CACHE_TTL: int = 60
+    BULK_CHUNK_SIZE: int = 1000
+
+    PRINCIPAL_CACHE_LOCAL_SIZE: int = 10000
+    PRINCIPAL_CACHE_LOCAL_TTL: int = 5
+    PRINCIPAL_CACHE_TTL: int = 300
+
+    CRUD_CACHE_TTL: int = 300
+    CRUD_CACHE_LOCAL_TTL: float = 2
+    CRUD_CACHE_LOCAL_SIZE: int = 4096
+    # Eagerness of the early refresh of the cached reads, 0 disables it.
+    CRUD_CACHE_BETA: float = 1.0
+
+    SEAT_HOLD_TTL: int = 300
+    # How long a hold record outlives its seats, so that the expiry can still release them.
+    SEAT_HOLD_GRACE: int = 3600
+    SEAT_HOLD_MAX_SEATS: int = 10
+    SEAT_HOLD_MAX_EXTENSIONS: int = 1
+    HOLD_SWEEP_INTERVAL: float = 1.0
+    HOLD_SWEEP_BATCH_SIZE: int = 500
+    WAITLIST_ENTRY_TTL: int = 1800
+    WAITLIST_MAX_WAIT: int = 30
+    WAITLIST_HEARTBEAT: int = 15
+
+    # Share of a rate limit a worker leases at once, the bound of the limits left unused.
+    RATE_LIMIT_ERROR_MARGIN: float = 0.05
+    RATE_LIMIT_LEASE_TTL: float = 1.0
+    RATE_LIMIT_MAX_LEASES: int = 100000
+    # Key anonymous callers by the `X-Forwarded-For` address added by the trusted proxies in
+    # front of the app, `RATE_LIMIT_TRUSTED_HOPS` of them.
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    RATE_LIMIT_TRUSTED_HOPS: int = 1
+    # API keys checked against `api_keys`, valid or not, are remembered for this many seconds.
+    RATE_LIMIT_API_KEY_CACHE_SIZE: int = 10000
+    RATE_LIMIT_API_KEY_CACHE_TTL: int = 60
+
+    KAFKA_BOOTSTRAP_SERVERS: str = 'localhost:9092'
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    # Published outbox events are deleted after this many seconds.
+    OUTBOX_RETENTION: int = 86400
+
+    MOMO_PARTNER_CODE: str = ''
+    MOMO_ACCESS_KEY: str = ''
+    MOMO_SECRET_KEY: str = ''
+    MOMO_REFUND_URL: str = 'https://test-payment.momo.vn/v2/gateway/api/refund'
+
     GEOCODING_ENGINE: str = 'elastic'
     GEOCODING_THIRD_PARTY: str = 'nominatim'
+    GEOCODING_INDEX: str = 'addresses'
+    GEOCODING_MIN_SCORE: float = 1.0
+    GEOCODING_REVERSE_DISTANCE: str = '200m'
+    GEOCODING_CACHE_SIZE: int = 100000
+    GEOCODING_CACHE_TTL: int = 86400
+    # Cells of about 150m x 150m for the cache of the reverse lookups.
+    GEOCODING_GEOHASH_PRECISION: int = 7
+    GEOCODING_BATCH_MAX_SIZE: int = 100
+    # Misses of a batch sent to the third party, which is rate limited (1 request/s for nominatim).
+    GEOCODING_BATCH_MAX_FALLBACKS: int = 5
+    NOMINATIM_URL: str = 'https://nominatim.openstreetmap.org'
+    NOMINATIM_USER_AGENT: str = 'ticketmaster-backend'
+    NOMINATIM_MIN_INTERVAL: float = 1.0
+
+    SHOWTIME_INDEX: str = 'showtimes'
+    SHOWTIME_INDEX_SHARDS: int = 3
+    SHOWTIME_INDEX_REPLICAS: int = 1
+    SHOWTIME_FACET_SIZE: int = 20
+    SHOWTIME_TIME_ZONE: str = 'Asia/Ho_Chi_Minh'
+    SHOWTIME_REINDEX_CHUNK_SIZE: int = 1000
+    SHOWTIME_INDEX_BATCH_SIZE: int = 500
+    SHOWTIME_INDEX_FLUSH_INTERVAL: float = 1.0
+    MOVIE_INDEX: str = 'movies'
+    MOVIE_INDEX_SHARDS: int = 1
+    MOVIE_INDEX_REPLICAS: int = 1
+    AUTOCOMPLETE_HOT_PREFIX_LENGTH: int = 2
+    AUTOCOMPLETE_TOP_K: int = 10
+    AUTOCOMPLETE_REFRESH_INTERVAL: float = 300
 
     ENABLE_ALERT_NOTIFICATION: bool
     DISCORD_WEBHOOK: str
+    ALERT_COALESCE_WINDOW: float = 10.0
+    ALERT_MAX_PENDING: int = 100
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_MINUTES: int
     ENCRYPT_KEY: str
+    TOKEN_CLAIMS_CACHE_SIZE: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
 
     NEW_RELIC_MONITOR_MODE: bool = False
 
@@ -1,17 +1,127 @@
-import requests
+import time
+import asyncio
 import logging
+from datetime import datetime, timezone
+
+import aiohttp
+
+from ..settings import settings
 
 logger = logging.getLogger(__name__)
 
-def send_discord_message(webhook_url, message, bot_name):
+DISCORD_MAX_MESSAGE_LENGTH = 2000
+
+
+class PendingAlert:
+    __slots__ = ('message', 'bot_name', 'count', 'first_seen', 'last_seen')
+
+    def __init__(self, message: str, bot_name: str):
+        self.message = message
+        self.bot_name = bot_name
+        self.count = 1
+        self.first_seen = self.last_seen = time.time()
+
+    def render(self) -> str:
+        message = self.message
+        if self.count > 1:
+            first_seen = datetime.fromtimestamp(self.first_seen, tz=timezone.utc).isoformat(timespec='seconds')
+            last_seen = datetime.fromtimestamp(self.last_seen, tz=timezone.utc).isoformat(timespec='seconds')
+            message = f'{message}\n**Occurrences:** {self.count} (first seen {first_seen}, last seen {last_seen})'
+        return message[:DISCORD_MAX_MESSAGE_LENGTH]
+
+
+class AlertDispatcher:
     """
-    Sends a message to a Discord channel via webhook.
-    :param message: The message to send.
+    Non-blocking Discord alerts for the webserver.
+
+    `notify` only records the alert in memory, identical alerts (same `key`) raised within
+    one flush window are coalesced into a single message carrying their count and first/last
+    seen time. A background task posts the pending alerts every `window` seconds over a
+    pooled aiohttp session. When `max_pending` distinct alerts are already waiting, new ones
+    are dropped and counted in `dropped`.
     """
-    data = {
-        "content": message,
-        "username": bot_name
-    }
-    response = requests.post(webhook_url, json=data)
-    if response.status_code != 204:
-        logger.error(f"Failed to send discord message: {response.status_code}, {response.text}")
\ No newline at end of file
+
+    def __init__(self, webhook_url: str, window: float, max_pending: int):
+        self.webhook_url = webhook_url
+        self.window = window
+        self.max_pending = max_pending
+        self.pending: dict[tuple, PendingAlert] = {}
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self._session: aiohttp.ClientSession | None = None
+        self._task: asyncio.Task | None = None
+
+    def notify(self, message: str, bot_name: str, key: tuple | str | None = None):
+        key = (bot_name, message if key is None else key)
+        alert = self.pending.get(key)
+        if alert is not None:
+            alert.count += 1
+            alert.last_seen = time.time()
+            return
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending[key] = PendingAlert(message, bot_name)
+
+    async def start(self):
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._session is not None:
+            await self.flush()
+            await self._session.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Failed to flush alerts')
+
+    async def flush(self):
+        """
+        Post the pending alerts, each one is counted in `sent`, `failed` or `dropped`.
+        """
+        alerts, self.pending = self.pending, {}
+        index = 0
+        try:
+            for index, alert in enumerate(alerts.values()):
+                data = {"content": alert.render(), "username": alert.bot_name}
+                try:
+                    async with self._session.post(self.webhook_url, json=data) as response:
+                        if response.status == 204:
+                            self.sent += 1
+                            continue
+                        self.failed += 1
+                        logger.error(f"Failed to send discord message: {response.status}, {await response.text()}")
+                        if response.status == 429:
+                            # Discord rate limit, the remaining alerts of this window are dropped.
+                            self.dropped += len(alerts) - index - 1
+                            return
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    self.failed += 1
+                    logger.exception('Failed to send discord message')
+        except BaseException:
+            # Cancelled (or worse) in the middle of the batch, the alerts not sent are lost.
+            self.dropped += len(alerts) - index
+            raise
+
+    @property
+    def stats(self) -> dict:
+        return {'pending': len(self.pending), 'sent': self.sent, 'failed': self.failed, 'dropped': self.dropped}
+
+
+alert_dispatcher = AlertDispatcher(
+    webhook_url=settings.DISCORD_WEBHOOK,
+    window=settings.ALERT_COALESCE_WINDOW,
+    max_pending=settings.ALERT_MAX_PENDING,
+)
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from ..exceptions import ServiceUnavailableException
+
+
+class BoundedExecutor:
+    """
+    A thread pool for blocking calls made from the event loop, with a bounded backlog.
+
+    Once `max_workers` calls are running and `max_queue` more are waiting, new calls are
+    rejected with `ServiceUnavailableException` instead of piling up behind the pool.
+    A call stays counted until its thread is done with it, even when the caller was
+    cancelled in the meantime.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ServiceUnavailableException(message='Server is busy, please try again later.')
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(fn, *args)
+        self.pending += 1
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._done))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _done(self):
+        self.pending -= 1
+        self.completed += 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'running': min(self.pending, self.max_workers),
+            'queued': max(0, self.pending - self.max_workers),
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
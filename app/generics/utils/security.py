@@ -1,3 +1,5 @@
+import time
+import hashlib
 from datetime import datetime, timedelta
 from typing import Any
 
@@ -5,10 +7,22 @@ import bcrypt
 import jwt
 
 from app.generics import settings
+from .cache import LRUTTLCache
+from .executors import BoundedExecutor
 
 
 JWT_ALGORITHM = "HS256"
 
+# Verified claims keyed by the sha256 digest of the token, each entry lives until the token's `exp`.
+token_claims_cache = LRUTTLCache(maxsize=settings.TOKEN_CLAIMS_CACHE_SIZE)
+
+# bcrypt releases the GIL, so hashing on threads keeps the event loop free.
+password_executor = BoundedExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    name='password-hasher',
+)
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta = None) -> str:
     if expires_delta:
@@ -50,6 +64,23 @@ def decode_token(token: str) -> dict[str, Any]:
     )
 
 
+def decode_token_cached(token: str) -> dict[str, Any]:
+    """
+    Same as `decode_token` but skips signature verification and claims validation for a
+    token which has already been verified by this process and has not expired yet.
+    Invalid tokens are never cached, so they raise the same exceptions as `decode_token`.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_claims_cache.get(digest)
+    if payload is not None:
+        return payload
+    payload = decode_token(token)
+    ttl = payload['exp'] - time.time() if 'exp' in payload else None
+    if ttl is not None and ttl > 0:
+        token_claims_cache.set(digest, payload, ttl=ttl)
+    return payload
+
+
 def verify_password(plain_password: str | bytes, hashed_password: str | bytes) -> bool:
     if isinstance(plain_password, str):
         plain_password = plain_password.encode()
@@ -63,4 +94,12 @@ def get_password_hash(plain_password: str | bytes) -> str:
     if isinstance(plain_password, str):
         plain_password = plain_password.encode()
 
-    return bcrypt.hashpw(plain_password, bcrypt.gensalt()).decode()
\ No newline at end of file
+    return bcrypt.hashpw(plain_password, bcrypt.gensalt()).decode()
+
+
+async def verify_password_async(plain_password: str | bytes, hashed_password: str | bytes) -> bool:
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(plain_password: str | bytes) -> str:
+    return await password_executor.run(get_password_hash, plain_password)
@@ -0,0 +1,29 @@
+import logging
+
+from ..pkg.kafka import AsyncKafkaConsumer
+from .. import redis_connection, async_es, engine
+
+
+logger = logging.getLogger(__name__)
+
+
+class AppAsyncKafkaConsumer(AsyncKafkaConsumer):
+    """
+    Async consumer sharing the application's pooled clients for the whole process lifetime:
+    `redis_connection`, `async_es` and the database `engine`. Callbacks use them directly,
+    database work goes through `async_session()` and the CRUD `db_session` argument since
+    there is no request scoped session in a worker.
+    """
+
+    async def on_startup(self):
+        assert await async_es.ping(), 'ES server has problem, please check the ES server :('
+        assert await redis_connection.ping(), 'Redis server has problem, please check the redis server :('
+        logger.info("Worker's ready to consume messages!")
+
+    async def on_shutdown(self):
+        await async_es.close()
+        logger.info('Closed elasticsearch client successfully!')
+        await redis_connection.close()
+        logger.info('Closed redis client successfully!')
+        await engine.dispose()
+        logger.info('Closed database engine successfully!')
@@ -0,0 +1,129 @@
+"""
+Produce the outbox events to Kafka once the transactions which wrote them have committed.
+
+    python -m app.generics.workers.outbox_relay
+"""
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from confluent_kafka.serialization import StringSerializer
+from sqlalchemy import delete, update
+from sqlmodel import select
+
+from ..pkg.kafka import AsyncKafkaProducer
+from ..database import async_session, engine
+from ..models import OutboxEvent
+from ..outbox import OUTBOX_ID_HEADER
+from ..settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Polls `outbox_events` for unpublished events, in id order, through the partial index
+    on `published_at IS NULL`. A batch is locked with `FOR UPDATE SKIP LOCKED` so that
+    several relays can run side by side without producing the same events twice, produced
+    concurrently and marked as published in one statement. Delivery is at least once: a
+    relay dying between the produce and the commit makes the next one produce the batch
+    again, consumers dedupe on the message key.
+    """
+
+    def __init__(self, producer: AsyncKafkaProducer, batch_size: int, poll_interval: float, retention: int):
+        self.producer = producer
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = timedelta(seconds=retention)
+        self.published = 0
+        self.lag = 0.0
+        self._last_cleanup = 0.0
+
+    async def relay_batch(self) -> int:
+        async with async_session() as db_session:
+            response = await db_session.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = response.scalars().all()
+            if not events:
+                return 0
+            deliveries = [
+                await self.producer.enqueue(
+                    event.topic, key=event.key, value=event.payload, headers={OUTBOX_ID_HEADER: str(event.id)}
+                )
+                for event in events
+            ]
+            await asyncio.gather(*deliveries)
+            now = datetime.now(timezone.utc)
+            await db_session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([event.id for event in events]))
+                .values(published_at=now)
+            )
+            await db_session.commit()
+        self.published += len(events)
+        self.lag = (now - events[0].created_at).total_seconds()
+        return len(events)
+
+    async def cleanup(self):
+        if time.monotonic() - self._last_cleanup < self.retention.total_seconds() / 24:
+            return
+        self._last_cleanup = time.monotonic()
+        async with async_session() as db_session:
+            response = await db_session.execute(
+                delete(OutboxEvent)
+                .where(OutboxEvent.published_at < datetime.now(timezone.utc) - self.retention)
+            )
+            await db_session.commit()
+        logger.info('Deleted published outbox events', extra={'deleted': response.rowcount})
+
+    async def run(self):
+        logger.info("Worker's ready to relay outbox events!")
+        while True:
+            try:
+                relayed = await self.relay_batch()
+                await self.cleanup()
+            except Exception:
+                logger.exception('Can not relay outbox events')
+                relayed = 0
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    @property
+    def stats(self) -> dict:
+        return {'published': self.published, 'lag': self.lag}
+
+
+async def main():
+    producer = AsyncKafkaProducer(
+        {
+            'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+            'key.serializer': StringSerializer('utf_8'),
+            'enable.idempotence': True,
+        },
+        codec='json',
+    )
+    relay = OutboxRelay(
+        producer,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL,
+        retention=settings.OUTBOX_RETENTION,
+    )
+    try:
+        await relay.run()
+    finally:
+        producer.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,26 @@
+"""
+Produce the dead letters of a consumer back to their original topic.
+
+    python -m app.generics.workers.replay_dead_letters path.to.Consumer \
+        --partition 0 --start-offset 120 --end-offset 180
+"""
+import argparse
+
+from ..utils.module_loading import import_string
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay dead letters of a consumer to their original topic.')
+    parser.add_argument('consumer', help='Dotted path of the `KafkaBaseConsumer` subclass.')
+    parser.add_argument('--partition', type=int, required=True)
+    parser.add_argument('--start-offset', type=int, required=True)
+    parser.add_argument('--end-offset', type=int, required=True)
+    parser.add_argument('--topic', default=None, help='Dead letter topic, `<first topic>.dlq` by default.')
+    args = parser.parse_args()
+
+    consumer = import_string(args.consumer)()
+    consumer.replay_dead_letters(args.partition, args.start_offset, args.end_offset, topic=args.topic)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+from enum import StrEnum
+
+
+class IGeocodingProviderEnum(StrEnum):
+    elastic = 'elastic'
+    nominatim = 'nominatim'
@@ -0,0 +1,15 @@
+from fastapi import status
+
+from ..generics.exceptions import APIException
+
+
+class AddressNotFoundException(APIException):
+    status = status.HTTP_404_NOT_FOUND
+    message = 'Address can not be geocoded.'
+    error_code = 40404
+
+
+class GeocodingUnavailableException(APIException):
+    status = status.HTTP_503_SERVICE_UNAVAILABLE
+    message = 'Geocoding providers are not available.'
+    error_code = 50302
@@ -0,0 +1,165 @@
+import abc
+import time
+import asyncio
+import logging
+
+import aiohttp
+from elasticsearch import AsyncElasticsearch
+
+from ..generics import async_es, settings
+from .enums import IGeocodingProviderEnum
+from .schemas import Location
+
+
+logger = logging.getLogger(__name__)
+
+
+class IGeocodingProvider(abc.ABC):
+    name: IGeocodingProviderEnum
+
+    @abc.abstractmethod
+    async def geocode(self, address: str) -> Location | None:
+        raise NotImplementedError(
+            "The function have to implement in the concrete class"
+        )
+
+    @abc.abstractmethod
+    async def reverse(self, lat: float, lon: float) -> Location | None:
+        raise NotImplementedError(
+            "The function have to implement in the concrete class"
+        )
+
+    async def geocode_many(self, addresses: list[str]) -> list[Location | None]:
+        return list(await asyncio.gather(*(self.geocode(address) for address in addresses)))
+
+    async def close(self):
+        pass
+
+
+class ElasticGeocodingProvider(IGeocodingProvider):
+    """
+    Local address index, documents are `{"address": <text>, "location": <geo_point>}`.
+    """
+    name = IGeocodingProviderEnum.elastic
+
+    def __init__(self, client: AsyncElasticsearch, index: str, min_score: float, reverse_distance: str):
+        self.client = client
+        self.index = index
+        self.min_score = min_score
+        self.reverse_distance = reverse_distance
+
+    def _search_body(self, address: str) -> dict:
+        return {
+            'size': 1,
+            'min_score': self.min_score,
+            '_source': ['address', 'location'],
+            'query': {'match': {'address': {'query': address, 'operator': 'and', 'fuzziness': 'AUTO'}}},
+        }
+
+    def _to_location(self, hits: list[dict]) -> Location | None:
+        if not hits:
+            return None
+        source = hits[0]['_source']
+        location = source['location']
+        if isinstance(location, str):
+            lat, lon = map(float, location.split(','))
+        elif isinstance(location, list):
+            lon, lat = location
+        else:
+            lat, lon = location['lat'], location['lon']
+        return Location(address=source['address'], lat=lat, lon=lon, provider=self.name)
+
+    async def geocode(self, address: str) -> Location | None:
+        response = await self.client.search(index=self.index, body=self._search_body(address))
+        return self._to_location(response['hits']['hits'])
+
+    async def geocode_many(self, addresses: list[str]) -> list[Location | None]:
+        searches = []
+        for address in addresses:
+            searches.append({'index': self.index})
+            searches.append(self._search_body(address))
+        response = await self.client.msearch(searches=searches)
+        results = []
+        for address, item in zip(addresses, response['responses']):
+            if 'error' in item:
+                logger.error('Geocoding search failed', extra={'address': address, 'error': item['error']})
+                raise RuntimeError(f"Geocoding search failed: {item['error']}")
+            results.append(self._to_location(item['hits']['hits']))
+        return results
+
+    async def reverse(self, lat: float, lon: float) -> Location | None:
+        response = await self.client.search(index=self.index, body={
+            'size': 1,
+            '_source': ['address', 'location'],
+            'query': {
+                'geo_distance': {'distance': self.reverse_distance, 'location': {'lat': lat, 'lon': lon}}
+            },
+            'sort': [{'_geo_distance': {'location': {'lat': lat, 'lon': lon}, 'order': 'asc', 'unit': 'm'}}],
+        })
+        return self._to_location(response['hits']['hits'])
+
+
+class NominatimGeocodingProvider(IGeocodingProvider):
+    """
+    Nominatim API, requests are spaced by `min_interval` seconds to follow its usage policy
+    (1 request per second for the public instance).
+    """
+    name = IGeocodingProviderEnum.nominatim
+
+    def __init__(self, url: str, user_agent: str, min_interval: float):
+        self.url = url.rstrip('/')
+        self.user_agent = user_agent
+        self.min_interval = min_interval
+        self._session: aiohttp.ClientSession | None = None
+        self._lock = asyncio.Lock()
+        self._last_request = 0.0
+
+    async def _get(self, path: str, params: dict):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers={'User-Agent': self.user_agent}, timeout=aiohttp.ClientTimeout(total=10)
+            )
+        async with self._lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request = time.monotonic()
+        async with self._session.get(f'{self.url}{path}', params={**params, 'format': 'jsonv2'}) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    def _to_location(self, place: dict) -> Location:
+        return Location(
+            address=place['display_name'], lat=float(place['lat']), lon=float(place['lon']), provider=self.name
+        )
+
+    async def geocode(self, address: str) -> Location | None:
+        places = await self._get('/search', {'q': address, 'limit': 1})
+        return self._to_location(places[0]) if places else None
+
+    async def reverse(self, lat: float, lon: float) -> Location | None:
+        place = await self._get('/reverse', {'lat': lat, 'lon': lon})
+        if not place or 'error' in place:
+            return None
+        return self._to_location(place)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+def get_provider(name: str) -> IGeocodingProvider:
+    if name == IGeocodingProviderEnum.elastic:
+        return ElasticGeocodingProvider(
+            async_es,
+            index=settings.GEOCODING_INDEX,
+            min_score=settings.GEOCODING_MIN_SCORE,
+            reverse_distance=settings.GEOCODING_REVERSE_DISTANCE,
+        )
+    if name == IGeocodingProviderEnum.nominatim:
+        return NominatimGeocodingProvider(
+            settings.NOMINATIM_URL,
+            user_agent=settings.NOMINATIM_USER_AGENT,
+            min_interval=settings.NOMINATIM_MIN_INTERVAL,
+        )
+    raise ValueError(f'Unknown geocoding provider `{name}`')
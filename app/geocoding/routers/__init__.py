@@ -0,0 +1,6 @@
+from fastapi import APIRouter
+
+from .v1 import geocoding_router_v1
+
+geocoding_router = APIRouter(prefix='/api', tags=['GEOCODING'])
+geocoding_router.include_router(geocoding_router_v1, prefix='/v1')
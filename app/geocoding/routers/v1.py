@@ -0,0 +1,40 @@
+from fastapi import APIRouter, status, Query
+
+from ..schemas import Location, GeocodeBatchRequest, GeocodeBatchRead
+from ..service import geocoding_service
+from ..exceptions import AddressNotFoundException
+
+geocoding_router_v1 = APIRouter(prefix='/geocoding')
+
+
+@geocoding_router_v1.get(
+    '/search',
+    status_code=status.HTTP_200_OK,
+    response_model=Location
+)
+async def geocode(address: str = Query(min_length=1, max_length=512)):
+    location = await geocoding_service.geocode(address)
+    if location is None:
+        raise AddressNotFoundException()
+    return location
+
+
+@geocoding_router_v1.get(
+    '/reverse',
+    status_code=status.HTTP_200_OK,
+    response_model=Location
+)
+async def reverse_geocode(lat: float = Query(ge=-90, le=90), lon: float = Query(ge=-180, le=180)):
+    location = await geocoding_service.reverse(lat, lon)
+    if location is None:
+        raise AddressNotFoundException(message='No address near this location.')
+    return location
+
+
+@geocoding_router_v1.post(
+    '/batch',
+    status_code=status.HTTP_200_OK,
+    response_model=GeocodeBatchRead
+)
+async def geocode_batch(batch: GeocodeBatchRequest):
+    return GeocodeBatchRead(results=await geocoding_service.geocode_many(batch.addresses))
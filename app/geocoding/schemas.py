@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+
+from ..generics import settings
+from .enums import IGeocodingProviderEnum
+
+
+class Location(BaseModel):
+    address: str
+    lat: float
+    lon: float
+    provider: IGeocodingProviderEnum
+
+
+class GeocodeBatchRequest(BaseModel):
+    addresses: list[str] = Field(min_length=1, max_length=settings.GEOCODING_BATCH_MAX_SIZE)
+
+
+class GeocodeBatchRead(BaseModel):
+    # In the order of the addresses, `None` for the ones which couldn't be geocoded.
+    results: list[Location | None]
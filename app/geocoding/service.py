@@ -0,0 +1,224 @@
+import re
+import asyncio
+import logging
+import unicodedata
+from typing import Awaitable, Callable
+
+from ..generics import settings
+from ..generics.utils.cache import LRUTTLCache
+from .exceptions import GeocodingUnavailableException
+from .providers import IGeocodingProvider, get_provider
+from .schemas import Location
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+_SPACES = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def normalize_address(address: str) -> str:
+    """
+    Lower case, NFKC, punctuation dropped and spaces collapsed, so that spellings of the same
+    address share a cache entry. Accents are kept, they are significant in Vietnamese.
+    """
+    address = unicodedata.normalize('NFKC', address).lower()
+    address = _PUNCTUATION.sub(' ', address)
+    return _SPACES.sub(' ', address).strip()
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit, even = 0, 0, True
+    while len(chars) < precision:
+        value, interval = (lon, lon_range) if even else (lat, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        if value >= middle:
+            bits = bits << 1 | 1
+            interval[0] = middle
+        else:
+            bits = bits << 1
+            interval[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits, bit = 0, 0
+    return ''.join(chars)
+
+
+class GeocodingService:
+    """
+    Geocoding through the local `primary` provider (the elasticsearch address index), then
+    the third party `fallback` when the primary has no result or fails.
+
+    Results, including misses, are kept in a bounded per-process cache keyed by the
+    normalized address, or by the geohash cell of `geohash_precision` for reverse lookups
+    (precision 7 is a cell of about 150m). Concurrent lookups of the same key share one
+    call to the providers.
+    """
+
+    def __init__(
+        self,
+        primary: IGeocodingProvider,
+        fallback: IGeocodingProvider | None,
+        cache_size: int,
+        cache_ttl: float,
+        geohash_precision: int,
+        batch_max_fallbacks: int,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        self.cache = LRUTTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.geohash_precision = geohash_precision
+        self.batch_max_fallbacks = batch_max_fallbacks
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+        self.fallbacks = 0
+
+    async def _cached(self, key: str, lookup: Callable[[], Awaitable[Location | None]]) -> Location | None:
+        location = self.cache.get(key, _MISSING)
+        if location is not _MISSING:
+            return location
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(lookup())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: str, call: Callable[[IGeocodingProvider], Awaitable[Location | None]]):
+        location = None
+        failed = False
+        try:
+            location = await call(self.primary)
+        except Exception:
+            failed = True
+            logger.exception('Primary geocoding provider failed', extra={'key': key})
+        if location is None and self.fallback is not None:
+            self.fallbacks += 1
+            try:
+                location = await call(self.fallback)
+                failed = False
+            except Exception:
+                # Even after a miss of the primary, the address may be known to the fallback.
+                failed = True
+                logger.exception('Fallback geocoding provider failed', extra={'key': key})
+        if failed:
+            # Failures are not cached, the next lookup tries again.
+            raise GeocodingUnavailableException()
+        self.cache.set(key, location)
+        return location
+
+    async def geocode(self, address: str) -> Location | None:
+        key = f'address:{normalize_address(address)}'
+        return await self._cached(key, lambda: self._lookup(key, lambda provider: provider.geocode(address)))
+
+    async def reverse(self, lat: float, lon: float) -> Location | None:
+        key = f'cell:{geohash(lat, lon, self.geohash_precision)}'
+        return await self._cached(key, lambda: self._lookup(key, lambda provider: provider.reverse(lat, lon)))
+
+    async def geocode_many(self, addresses: list[str]) -> list[Location | None]:
+        """
+        One `msearch` to the primary for the addresses which are neither cached nor being
+        looked up, the first `batch_max_fallbacks` misses of the primary go to `geocode` of the
+        fallback. The other misses are returned unresolved and are not cached, neither are the
+        addresses which are unresolved because a provider failed.
+        """
+        keys = [f'address:{normalize_address(address)}' for address in addresses]
+        results: dict[str, Location | None] = {}
+        waiting: dict[str, asyncio.Future] = {}
+        missing: dict[str, str] = {}
+        for key, address in zip(keys, addresses):
+            if key in results or key in waiting or key in missing:
+                continue
+            location = self.cache.get(key, _MISSING)
+            if location is not _MISSING:
+                results[key] = location
+            elif key in self._inflight:
+                self.coalesced += 1
+                waiting[key] = self._inflight[key]
+            else:
+                missing[key] = address
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            for key, future in futures.items():
+                self._inflight[key] = future
+            try:
+                primary_failed = False
+                try:
+                    located = await self.primary.geocode_many(list(missing.values()))
+                except Exception:
+                    logger.exception('Primary geocoding provider failed', extra={'addresses': len(missing)})
+                    primary_failed = True
+                    located = [None] * len(missing)
+                fallbacks = self.batch_max_fallbacks
+                for key, location in zip(missing, located):
+                    if location is None:
+                        if fallbacks > 0:
+                            fallbacks -= 1
+                            location = await self.geocode_fallback(key, missing[key], cache=not primary_failed)
+                    else:
+                        self.cache.set(key, location)
+                    results[key] = location
+                    futures[key].set_result(location)
+            except BaseException as exc:
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(exc)
+                        # Retrieved by the callers of `geocode`, if any.
+                        future.exception()
+                raise
+            finally:
+                for key in futures:
+                    self._inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        return [results[key] for key in keys]
+
+    async def geocode_fallback(self, key: str, address: str, cache: bool = True) -> Location | None:
+        """
+        A miss is cached only when `cache`, i.e. the primary did answer, or the fallback did.
+        """
+        location = None
+        if self.fallback is not None:
+            self.fallbacks += 1
+            try:
+                location = await self.fallback.geocode(address)
+            except Exception:
+                logger.exception('Fallback geocoding provider failed', extra={'key': key})
+                return None
+            cache = True
+        if cache:
+            self.cache.set(key, location)
+        return location
+
+    async def close(self):
+        await self.primary.close()
+        if self.fallback is not None:
+            await self.fallback.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'cache': self.cache.stats, 'inflight': len(self._inflight),
+            'coalesced': self.coalesced, 'fallbacks': self.fallbacks,
+        }
+
+
+geocoding_service = GeocodingService(
+    get_provider(settings.GEOCODING_ENGINE),
+    get_provider(settings.GEOCODING_THIRD_PARTY) if settings.GEOCODING_THIRD_PARTY else None,
+    cache_size=settings.GEOCODING_CACHE_SIZE,
+    cache_ttl=settings.GEOCODING_CACHE_TTL,
+    geohash_precision=settings.GEOCODING_GEOHASH_PRECISION,
+    batch_max_fallbacks=settings.GEOCODING_BATCH_MAX_FALLBACKS,
+)
@@ -0,0 +1,6 @@
+from fastapi import APIRouter
+
+from .stats import stats_router
+
+internal_router = APIRouter(prefix='/internal', tags=['INTERNAL'])
+internal_router.include_router(stats_router)
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, status, Depends
+
+from ...auth import dependences
+from ...auth.cache import principal_cache
+from ...generics import engine
+from ...generics.ratelimit import rate_limiter
+from ...generics.utils.security import password_executor
+from ...generics.utils.alert_notification import alert_dispatcher
+from ...users.enums import IRoleEnum
+from ...bookings.crud import show_crud
+from ...bookings.holds import seat_hold_engine
+from ...bookings.waitlist import waitlist_notifier
+from ...bookings.workers.hold_sweeper import get_sweeper_stats
+from ...catalog.autocomplete import movie_autocomplete
+from ...geocoding.service import geocoding_service
+
+
+stats_router = APIRouter(
+    dependencies=[Depends(dependences.require_permission([IRoleEnum.SUPER_ADMIN]))]
+)
+
+
+@stats_router.get('/cache/principals', status_code=status.HTTP_200_OK)
+async def get_principal_cache_stats():
+    return principal_cache.stats
+
+
+@stats_router.get('/cache/shows', status_code=status.HTTP_200_OK)
+async def get_show_cache_stats():
+    return show_crud.cache.stats
+
+
+@stats_router.get('/pool', status_code=status.HTTP_200_OK)
+async def get_pool_stats():
+    return engine.pool.stats()
+
+
+@stats_router.get('/password-hasher', status_code=status.HTTP_200_OK)
+async def get_password_hasher_stats():
+    return password_executor.stats
+
+
+@stats_router.get('/alerts', status_code=status.HTTP_200_OK)
+async def get_alert_stats():
+    return alert_dispatcher.stats
+
+
+@stats_router.get('/rate-limiter', status_code=status.HTTP_200_OK)
+async def get_rate_limiter_stats():
+    return rate_limiter.stats
+
+
+@stats_router.get('/seat-holds', status_code=status.HTTP_200_OK)
+async def get_seat_hold_stats():
+    return seat_hold_engine.stats
+
+
+@stats_router.get('/waitlist', status_code=status.HTTP_200_OK)
+async def get_waitlist_stats():
+    return waitlist_notifier.stats
+
+
+@stats_router.get('/hold-sweeper', status_code=status.HTTP_200_OK)
+async def get_hold_sweeper_stats():
+    return await get_sweeper_stats()
+
+
+@stats_router.get('/geocoding', status_code=status.HTTP_200_OK)
+async def get_geocoding_stats():
+    return geocoding_service.stats
+
+
+@stats_router.get('/autocomplete', status_code=status.HTTP_200_OK)
+async def get_autocomplete_stats():
+    return movie_autocomplete.stats
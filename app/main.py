@@ -1,27 +1,30 @@
 import logging
-import math
 from contextlib import asynccontextmanager
-import jwt
 
-from fastapi import FastAPI, Request, status, Response, HTTPException
+from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi_pagination import add_pagination
 from fastapi_pagination.utils import disable_installed_extensions_check
 from fastapi_async_sqlalchemy import SQLAlchemyMiddleware, db
-from fastapi_limiter import FastAPILimiter
 from sqladmin import Admin
-import redis.asyncio as redis
 
 
-from .generics.middlewares.logging_middlewares import LoggingMiddleware
+from .generics.middlewares.logging_middlewares import LoggingMiddleware, captured_body
+from .generics.middlewares.authentication_middlewares import AuthenticationMiddleware
 from .generics.exceptions import APIException
 from .generics import redis_connection, async_es, settings, engine
-from .generics.utils.alert_notification import send_discord_message
-
-from .generics.utils.security import decode_token
+from .generics.utils.alert_notification import alert_dispatcher
+from .generics.ratelimit import rate_limiter
+from .generics.utils.security import password_executor
 from .users.routers import user_router
 from .auth.routers import auth_router
 from .geocoding.routers import geocoding_router
+from .geocoding.service import geocoding_service
+from .internal.routers import internal_router
+from .bookings.routers import booking_router
+from .catalog.routers import catalog_router
+from .catalog.autocomplete import movie_autocomplete
+from .bookings.waitlist import waitlist_notifier
 
 from .users.admin import UserAdmin, RoleAdmin, APIKeyAdmin
 
@@ -37,68 +40,30 @@ if settings.NEW_RELIC_MONITOR_MODE:
     newrelic.agent.initialize('newrelic.ini')
 
 
-async def user_id_identifier(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if auth_header is not None:
-        header_parts = auth_header.split()
-        if len(header_parts) == 2 and header_parts[0].lower() == "bearer":
-            token = header_parts[1]
-            try:
-                payload = decode_token(token)
-            except jwt.ExpiredSignatureError:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Your token has expired. Please log in again.",
-                )
-            except jwt.DecodeError:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Error when decoding the token. Please check your request.",
-                )
-            except jwt.MissingRequiredClaimError:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="There is no required field in your token. Please contact the administrator.",
-                )
-            return payload['sub']
-
-
-async def rate_limit_http_callback(request: Request, response: Response, pexpire: int):
-    """
-    default callback when too many requests
-    :param request:
-    :param pexpire: The remaining milliseconds
-    :param response:
-    :return:
-    """
-    username = request.state.user['username'] if hasattr(request.state, 'user') else ''
-    error_message = f"""
-    **Environment:** {settings.ENVIRONMENT}\n**Path:** {str(request.url.path)}\n**Username:** {str(username)}\n
-    """
-    send_discord_message(settings.DISCORD_WEBHOOK, error_message, 'Rate Limiter')
-    expire = math.ceil(pexpire / 1000)
-    raise HTTPException(
-        status.HTTP_429_TOO_MANY_REQUESTS, "Too Many Requests", headers={"Retry-After": str(expire)}
-    )
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await FastAPILimiter.init(
-        redis.from_url(f'redis://:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}'), 
-        identifier=user_id_identifier,
-        http_callback=rate_limit_http_callback
-    )
     assert await async_es.ping(), 'ES server has problem, please check the ES server :('
     assert await redis_connection.ping(), 'Redis server has problem, please check the redis server :('
+    await alert_dispatcher.start()
+    await waitlist_notifier.start()
+    await rate_limiter.start()
+    await movie_autocomplete.start()
     logger.info("Webserver's ready to listen incomming requests!")
     yield
-    await FastAPILimiter.close()
+    await movie_autocomplete.stop()
+    await rate_limiter.stop()
+    await geocoding_service.close()
+    await alert_dispatcher.stop()
+    await waitlist_notifier.stop()
+    logger.info('Flushed pending alerts successfully!')
     await async_es.close()
     logger.info('Closed elasticsearch client successfully!')
     await redis_connection.close()
     logger.info('Closed redis client successfully!')
+    await engine.dispose()
+    logger.info('Closed database engine successfully!')
+    password_executor.shutdown()
 
 app = FastAPI(
     title="TicketMaster Backend",
@@ -114,16 +79,11 @@ disable_installed_extensions_check()
 
 app.add_middleware(
     SQLAlchemyMiddleware,
-    db_url=str(settings.DATABASE_URI),
-    engine_args={
-        "echo": False,
-        "pool_pre_ping": True,
-        "pool_size": settings.CONN_POOL_SIZE,
-        "max_overflow": 64,
-    },
+    custom_engine=engine,
     commit_on_exit=True
 )
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(AuthenticationMiddleware)
 
 if settings.ENVIRONMENT == 'local':
     from fastapi.middleware.cors import CORSMiddleware
@@ -147,11 +107,8 @@ async def http_exception_handler(request: Request, exc: APIException):
 @app.exception_handler(Exception)
 async def http_exception_handler(request: Request, exc: Exception):
     request_id = request.state.request_id
-    body = {}
-    try:
-        body = await request.json()
-    except:
-        body = {}
+    # The body stream has already been consumed, reuse what LoggingMiddleware captured.
+    body = captured_body(request.scope.setdefault('state', {}))
     username = request.state.user['username'] if hasattr(request.state, 'user') else ''
     logger.exception(
         'Unexpected Exception Occurs',
@@ -167,9 +124,10 @@ async def http_exception_handler(request: Request, exc: Exception):
     if settings.ENABLE_ALERT_NOTIFICATION:
         error_message = f"""
         **Environment:** {settings.ENVIRONMENT}\n**Request ID:** {str(request_id)}\n**Path:** {str(request.url.path)}\n**Body:** {str(body)}\n**User ID:** {str(username)}
-        ```\{str(exc)[1700]}\n```
+        ```\{str(exc)[:1700]}\n```
         """
-        send_discord_message(settings.DISCORD_WEBHOOK, error_message, 'Interceptor')
+        # Coalesce the same failure across requests, each one has its own request id.
+        alert_dispatcher.notify(error_message, 'Interceptor', key=(str(request.url.path), repr(exc)[:200]))
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
         content={"message": 'A server error occurred.', 'trace_id': request_id}
@@ -178,6 +136,9 @@ async def http_exception_handler(request: Request, exc: Exception):
 app.include_router(user_router)
 app.include_router(auth_router)
 app.include_router(geocoding_router)
+app.include_router(booking_router)
+app.include_router(catalog_router)
+app.include_router(internal_router)
 
 admin = Admin(app, engine)
 admin.add_view(UserAdmin)
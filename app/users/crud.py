@@ -1,3 +1,4 @@
+from typing import Sequence
 from pydantic import EmailStr
 
 from fastapi import HTTPException
@@ -6,18 +7,22 @@ from sqlalchemy import exc
 from sqlmodel import select
 
 from ..generics.crud import CRUDBase
+from ..generics.enums import CRUDAction
 from ..generics.utils import security
+from ..auth.cache import principal_cache
 from .models import User, Role
 from .schemas import UserCreate, UserUpdate, RoleCreate, RoleUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    cursor_order_keys = ('id', 'username')
+
     async def create(
         self, *, obj_in: UserCreate, db_session: AsyncSession | None = None
     ) -> User:
         db_session = db_session or super().get_db().session
         db_obj = User.model_validate(obj_in)
-        db_obj.hashed_password = security.get_password_hash(obj_in.password)
+        db_obj.hashed_password = await security.get_password_hash_async(obj_in.password)
         try:          
             db_session.add(db_obj)
             await db_session.commit()
@@ -25,7 +30,13 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             await db_session.rollback()
             raise HTTPException(status_code=409, detail="Resource already exists")
         await db_session.refresh(db_obj)
+        await self.after_write(action=CRUDAction.CREATE, obj=db_obj)
         return db_obj
+
+    async def after_write_many(self, *, action: CRUDAction, objs: Sequence[User]) -> None:
+        await super().after_write_many(action=action, objs=objs)
+        if action in (CRUDAction.UPDATE, CRUDAction.REMOVE):
+            await principal_cache.invalidate_many([obj.id for obj in objs])
     
     async def get_by_email(
         self, *, email: str, db_session: AsyncSession | None = None
@@ -38,7 +49,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.get_by_email(email=email)
         if not user:
             return None
-        if not security.verify_password(password, user.hashed_password):
+        if not await security.verify_password_async(password, user.hashed_password):
             return None
         return user
 
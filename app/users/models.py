@@ -28,6 +28,8 @@ class BaseUser(SQLModel):
 
 class User(BaseUUIDPrimaryModel, BaseUser, table=True):
     __tablename__ = 'users'
+    # Keyset pagination ordered by username (`CRUDUser.cursor_order_keys`).
+    __table_args__ = (sa.Index('ix_users_username_id', 'username', 'id'),)
 
     hashed_password: str | None = Field(default=None, nullable=False)
     role: Optional["Role"] = Relationship(  # noqa: F821
@@ -54,7 +56,7 @@ class APIkey(SQLModel, table=True):
         primary_key=True,
         index=True
     )
-    key: str = Field(nullable=False)
+    key: str = Field(nullable=False, index=True)
     user_id: uuid.UUID = Field(foreign_key='users.id')
     user: User = Relationship(sa_relationship_kwargs={"lazy": "selectin"})
     is_disabled: bool = Field(default=False)
@@ -6,6 +6,7 @@ from ..schemas import UserCreate, UserRead, RoleCreate, RoleRead
 from ..crud import user_crud, role_crud
 from ..enums import IRoleEnum
 from ...auth import dependences
+from ...generics.enums import ICountStrategyEnum
 
 user_router_v1 = APIRouter(prefix='/users')
 role_router_v1 = APIRouter(prefix='/roles')
@@ -26,7 +27,7 @@ async def create_user(new_user: UserCreate):
     response_model=Page.with_custom_options(size=Query(20, ge=1, le=500))[UserRead]
 )
 async def list_users(params: Params = Depends()):
-    return await user_crud.get_multi_paginated(params=params)
+    return await user_crud.get_multi_paginated(params=params, count_strategy=ICountStrategyEnum.cached)
 
 
 @user_router_v1.get(
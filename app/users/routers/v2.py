@@ -0,0 +1,30 @@
+from fastapi import APIRouter, status, Depends, Query
+
+from ..schemas import UserRead
+from ..crud import user_crud
+from ..enums import IRoleEnum
+from ...auth import dependences
+from ...generics.enums import IOrderEnum, ICountStrategyEnum
+from ...generics.pagination import CursorParams, CursorPage
+
+user_router_v2 = APIRouter(prefix='/users')
+
+
+@user_router_v2.get(
+    '',
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(dependences.require_permission([IRoleEnum.ADMIN, IRoleEnum.SUPER_ADMIN]))],
+    response_model=CursorPage[UserRead]
+)
+async def list_users(
+    params: CursorParams = Depends(),
+    order_by: str | None = Query(None, description='`id` (default) or `username`'),
+    order: IOrderEnum = IOrderEnum.ascendent,
+    include_total: bool = False,
+):
+    return await user_crud.get_multi_cursor(
+        params=params,
+        order_by=order_by,
+        order=order,
+        count_strategy=ICountStrategyEnum.estimated if include_total else None,
+    )
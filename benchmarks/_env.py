@@ -0,0 +1,17 @@
+import os
+
+
+def setup_env():
+    """
+    Fill the settings which don't have default values so `app.generics` can be imported
+    without a `.env` file.
+    """
+    defaults = {
+        'DB_HOST': 'localhost', 'DB_PORT': '5432', 'DB_USER': 'bench', 'DB_PASSWORD': 'bench',
+        'DB_PASSWORD_PLAIN': 'bench', 'DB_NAME': 'bench', 'ENVIRONMENT': 'bench', 'LOGGING_LEVEL': 'INFO',
+        'ES_HOST': 'localhost', 'ES_PORT': '9200', 'ES_USERNAME': 'bench', 'ES_PASSWORD': 'bench',
+        'ENABLE_ALERT_NOTIFICATION': 'false', 'DISCORD_WEBHOOK': 'http://localhost',
+        'ACCESS_TOKEN_EXPIRE_MINUTES': '30', 'REFRESH_TOKEN_EXPIRE_MINUTES': '600', 'ENCRYPT_KEY': 'bench',
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
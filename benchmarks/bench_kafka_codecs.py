@@ -0,0 +1,72 @@
+"""
+Messages/sec of decoding and validating a message value: stdlib `json` then
+`model_validate` (the former path), `model_validate_json` straight from the bytes, and
+msgpack through `CodecValueDeserializer` and the callback's validators.
+
+    python -m benchmarks.bench_kafka_codecs [num_messages]
+"""
+import sys
+import json
+import time
+import uuid
+from datetime import datetime
+
+from ._env import setup_env
+
+setup_env()
+
+from pydantic import BaseModel  # noqa: E402
+
+from app.generics.pkg.codecs import CodecValueDeserializer, CodecValueSerializer, ModelValidators  # noqa: E402
+
+
+class Seat(BaseModel):
+    row: str
+    number: int
+
+
+class Message(BaseModel):
+    id: uuid.UUID
+    show_id: int
+    status: str
+    seats: list[Seat]
+    created_at: datetime
+
+
+VALUE = {
+    'id': str(uuid.uuid4()), 'show_id': 1, 'status': 'RESERVED',
+    'seats': [{'row': 'A', 'number': number} for number in range(10)],
+    'created_at': datetime.now().isoformat(),
+}
+
+
+class Context:
+    topic = 'bench'
+    headers = None
+
+
+def bench(name: str, data: bytes, decode, num_messages: int):
+    started = time.perf_counter()
+    for _ in range(num_messages):
+        decode(data)
+    elapsed = time.perf_counter() - started
+    print(f'{name:>28}: {num_messages / elapsed:10.0f} msg/s')
+
+
+if __name__ == '__main__':
+    num_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    validators = ModelValidators.of(Message)
+    json_data = json.dumps(VALUE).encode('utf-8')
+    msgpack_data = CodecValueSerializer('msgpack')(VALUE, None)
+    json_deserializer = CodecValueDeserializer()
+    msgpack_deserializer = CodecValueDeserializer(default='msgpack')
+
+    def codec_decode(deserializer):
+        def decode(data):
+            value = deserializer(data, Context)
+            return value.codec.validate(validators, value)
+        return decode
+
+    bench('json + model_validate', json_data, lambda data: Message.model_validate(json.loads(data)), num_messages)
+    bench('json model_validate_json', json_data, codec_decode(json_deserializer), num_messages)
+    bench('msgpack + model_validate', msgpack_data, codec_decode(msgpack_deserializer), num_messages)
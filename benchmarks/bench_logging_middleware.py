@@ -0,0 +1,105 @@
+"""
+Requests/sec of an echo route wrapped by the previous `BaseHTTPMiddleware` based
+LoggingMiddleware versus the pure ASGI one.
+
+    python -m benchmarks.bench_logging_middleware [num_requests]
+"""
+import sys
+import json
+import time
+import asyncio
+import logging
+
+from ._env import setup_env
+
+setup_env()
+
+from fastapi import FastAPI, Request  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.generics.middlewares.logging_middlewares import LoggingMiddleware  # noqa: E402
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """The implementation replaced in [user-002], without the token decoding."""
+
+    async def set_body(self, request: Request):
+        receive_ = await request._receive()
+        async def receive():
+            return receive_
+        request._receive = receive
+
+    async def dispatch(self, request, call_next):
+        await self.set_body(request)
+        request.state.request_id = request.headers.get("x-request-id")
+        try:
+            body = await request.json()
+        except Exception:
+            body = {}
+        logging.getLogger(__name__).info(
+            "Incomming request",
+            extra={
+                "request_id": request.state.request_id,
+                "method": str(request.method).upper(),
+                "path": str(request.url.path),
+                "params": str(request.query_params),
+                'body': body,
+                "user_id": None
+            },
+        )
+        return await call_next(request)
+
+
+def build_app(middleware):
+    app = FastAPI()
+
+    @app.post('/echo')
+    async def echo(payload: dict):
+        return payload
+
+    app.add_middleware(middleware)
+    return app
+
+
+BODY = json.dumps({'show_seats': list(range(50)), 'note': 'x' * 512}).encode()
+SCOPE = {
+    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+    'scheme': 'http', 'path': '/echo', 'raw_path': b'/echo', 'query_string': b'page=1',
+    'root_path': '', 'client': ('127.0.0.1', 1234), 'server': ('127.0.0.1', 8000),
+    'headers': [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(BODY)).encode()),
+        (b'x-request-id', b'bench'),
+    ],
+}
+
+
+def make_receive():
+    """The body once, then a disconnect like a server does, instead of the body forever."""
+    messages = iter([{'type': 'http.request', 'body': BODY, 'more_body': False}])
+
+    async def receive():
+        return next(messages, {'type': 'http.disconnect'})
+    return receive
+
+
+async def run(app, num_requests: int) -> float:
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(num_requests):
+        await app(dict(SCOPE), make_receive(), send)
+    return num_requests / (time.perf_counter() - started)
+
+
+async def main(num_requests: int):
+    logging.basicConfig(level=logging.CRITICAL)
+    for name, middleware in (('BaseHTTPMiddleware', LegacyLoggingMiddleware), ('pure ASGI', LoggingMiddleware)):
+        app = build_app(middleware)
+        await run(app, 200)
+        print(f'{name:>20}: {await run(app, num_requests):10.0f} req/s')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,81 @@
+"""
+Contention on one show: thousands of buyers trying to hold a few adjacent seats of a
+500 seat hall at the same time through `SeatHoldEngine`. Needs the redis of the settings
+(`REDIS_HOST`/`REDIS_PORT`/...), the keys of the benchmark show are deleted at the end.
+
+    python -m benchmarks.bench_seat_holds [num_holders] [concurrency]
+"""
+import sys
+import time
+import random
+import asyncio
+
+from ._env import setup_env
+
+setup_env()
+
+import redis.asyncio as redis  # noqa: E402
+
+from app.generics import settings  # noqa: E402
+from app.bookings.holds import SeatHoldEngine, SEAT_KEY_PREFIX  # noqa: E402
+from app.bookings.seat_map import SeatMap  # noqa: E402
+from app.bookings.exceptions import SeatUnavailableException  # noqa: E402
+
+
+TOTAL_SEATS = 500
+
+
+async def holder(engine: SeatHoldEngine, show_id: int, latencies: list[float]) -> list[int] | None:
+    size = random.randint(1, 4)
+    first = random.randrange(TOTAL_SEATS - size)
+    started = time.perf_counter()
+    try:
+        hold = await engine.hold(show_id, list(range(first, first + size)), 'bench')
+        return hold.seat_numbers
+    except SeatUnavailableException:
+        return None
+    finally:
+        latencies.append(time.perf_counter() - started)
+
+
+async def main(num_holders: int, concurrency: int):
+    pool = redis.BlockingConnectionPool(
+        host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD, max_connections=concurrency, decode_responses=True,
+    )
+    connection = redis.Redis(connection_pool=pool)
+    seat_map = SeatMap(connection)
+    engine = SeatHoldEngine(connection, seat_map, ttl=300, grace=60, max_extensions=1)
+    show_id = random.randrange(10 ** 9, 2 * 10 ** 9)
+    # The benchmark show doesn't exist in Postgres, its seat map is created empty.
+    await connection.set(seat_map.size_key(show_id), TOTAL_SEATS)
+    latencies = []
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[holder(engine, show_id, latencies) for _ in range(num_holders)])
+    elapsed = time.perf_counter() - started
+
+    held_seats = [seat for seats in results if seats for seat in seats]
+    seat_keys = [key async for key in connection.scan_iter(f'{SEAT_KEY_PREFIX}{show_id}:*', count=1000)]
+    latencies.sort()
+    print(f'{"holders":>16}: {num_holders}')
+    print(f'{"holds/s":>16}: {num_holders / elapsed:10.0f}')
+    print(f'{"succeeded":>16}: {engine.held}, conflicts: {engine.conflicts}')
+    print(f'{"p50 latency":>16}: {latencies[len(latencies) // 2] * 1000:10.2f} ms')
+    print(f'{"p99 latency":>16}: {latencies[int(len(latencies) * 0.99)] * 1000:10.2f} ms')
+    states = await seat_map.get_states(show_id)
+    consistent = len(held_seats) == len(set(held_seats)) == len(seat_keys) == states.count(1)
+    print(f'{"consistent":>16}: {consistent}')
+
+    hold_ids = set(await connection.mget(seat_keys)) if seat_keys else set()
+    for hold_id in hold_ids:
+        await engine.release(hold_id, 'bench')
+    await connection.delete(seat_map.key(show_id), seat_map.size_key(show_id))
+    await connection.close()
+    await pool.disconnect()
+
+
+if __name__ == '__main__':
+    num_holders = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(num_holders, concurrency))
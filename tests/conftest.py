@@ -0,0 +1,39 @@
+import pytest
+import fakeredis
+
+from benchmarks._env import setup_env
+
+setup_env()
+
+import app.main  # noqa: E402,F401  Every model is mapped before the tests build statements.
+from app.bookings.holds import SeatHoldEngine  # noqa: E402
+from app.bookings.seat_map import SeatMap, SEAT_MAP_SIZE_KEY_PREFIX  # noqa: E402
+from app.bookings.waitlist import Waitlist  # noqa: E402
+
+
+SHOW_ID = 1
+TOTAL_SEATS = 10
+
+
+@pytest.fixture
+async def redis():
+    connection = fakeredis.FakeAsyncRedis(decode_responses=True)
+    # The seat map of the show is loaded, the engine never goes to Postgres for it.
+    await connection.set(f'{SEAT_MAP_SIZE_KEY_PREFIX}{SHOW_ID}', TOTAL_SEATS)
+    yield connection
+    await connection.aclose()
+
+
+@pytest.fixture
+def seat_map(redis):
+    return SeatMap(redis)
+
+
+@pytest.fixture
+def engine(redis, seat_map):
+    return SeatHoldEngine(redis, seat_map, ttl=60, grace=30, max_extensions=1)
+
+
+@pytest.fixture
+def waitlist(redis):
+    return Waitlist(redis, entry_ttl=60)
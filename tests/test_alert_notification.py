@@ -0,0 +1,63 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from app.generics.utils.alert_notification import AlertDispatcher
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+
+    async def text(self):
+        return ''
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeSession:
+    """Answers the posts with `outcomes` in order, an exception is raised."""
+
+    def __init__(self, outcomes: list):
+        self.outcomes = outcomes
+
+    def post(self, url, json):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def make_dispatcher(outcomes: list, alerts: int) -> AlertDispatcher:
+    dispatcher = AlertDispatcher('http://discord', window=60, max_pending=100)
+    dispatcher._session = FakeSession(outcomes)
+    for number in range(alerts):
+        dispatcher.notify(f'alert {number}', 'Interceptor')
+    return dispatcher
+
+
+async def test_timed_out_alert_does_not_lose_the_rest_of_the_batch():
+    dispatcher = make_dispatcher([204, asyncio.TimeoutError(), aiohttp.ClientError(), 204], alerts=4)
+
+    await dispatcher.flush()
+    assert dispatcher.stats == {'pending': 0, 'sent': 2, 'failed': 2, 'dropped': 0}
+
+
+async def test_rate_limited_flush_drops_the_rest_of_the_batch():
+    dispatcher = make_dispatcher([204, 429], alerts=4)
+
+    await dispatcher.flush()
+    assert (dispatcher.sent, dispatcher.failed, dispatcher.dropped) == (1, 1, 2)
+
+
+async def test_cancelled_flush_counts_the_alerts_not_sent():
+    dispatcher = make_dispatcher([204, asyncio.CancelledError()], alerts=3)
+
+    with pytest.raises(asyncio.CancelledError):
+        await dispatcher.flush()
+    assert (dispatcher.sent, dispatcher.dropped) == (1, 2)
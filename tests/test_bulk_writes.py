@@ -0,0 +1,112 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import exc
+from sqlalchemy.dialects import postgresql
+
+from app.bookings.models import ShowSeat
+from app.generics.crud import CRUDBase
+from app.generics.exceptions import InvalidRequestException
+from app.users.models import Role, BaseRole
+
+
+class FakeSession:
+    """Compiles the statements of the bulk writes, no row comes back from the database."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return []
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+class ConflictingSession(FakeSession):
+    rolled_back = False
+
+    async def execute(self, statement, params=None):
+        raise exc.IntegrityError(str(statement), params, Exception('duplicate key value'))
+
+
+def set_clause(statement: str) -> str:
+    return statement.split(' DO UPDATE SET ')[1].split(' RETURNING ')[0]
+
+
+async def test_upsert_updates_only_the_supplied_columns():
+    db_session = FakeSession()
+    await CRUDBase(Role).upsert_many(objs_in=[{'id': 1, 'name': 'admin'}], conflict_columns=['id'], db_session=db_session)
+
+    statement, = db_session.statements
+    assert set_clause(statement) == 'name = excluded.name, updated_at = now()'
+    assert 'desc' not in statement.split(' ON CONFLICT ')[0]
+
+
+async def test_upsert_of_schemas_ignores_their_defaults():
+    db_session = FakeSession()
+    await CRUDBase(Role).upsert_many(
+        objs_in=[BaseRole(name='admin'), BaseRole(name='user', desc='Customers')],
+        conflict_columns=['name'], db_session=db_session,
+    )
+
+    assert set_clause(db_session.statements[0]) == '"desc" = excluded."desc", updated_at = now()'
+
+
+async def test_upsert_with_update_columns():
+    db_session = FakeSession()
+    await CRUDBase(ShowSeat).upsert_many(
+        objs_in=[{'show_id': 1, 'seat_number': 0, 'price': 10, 'status': 'RESERVED'}],
+        conflict_columns=['show_id', 'seat_number'], update_columns=['price'], db_session=db_session,
+    )
+
+    statement, = db_session.statements
+    assert 'ON CONFLICT (show_id, seat_number)' in statement
+    assert set_clause(statement) == 'price = excluded.price, updated_at = now()'
+
+
+def test_rows_keep_defaults_and_leave_generated_columns_to_the_database():
+    rows = CRUDBase(ShowSeat)._to_rows([{'show_id': 1, 'seat_number': 0, 'price': 10}])
+
+    assert set(rows[0]) == {'show_id', 'seat_number', 'price', 'status'}
+
+
+async def test_create_many_skips_conflicts_on_the_unique_key_of_the_rows():
+    crud = CRUDBase(ShowSeat)
+    rows = crud._to_rows([{'show_id': 1, 'seat_number': seat, 'price': 10} for seat in range(2)])
+    assert crud._match_columns(rows, None) == ['show_id', 'seat_number']
+
+    db_session = FakeSession()
+    result = await crud.create_many(
+        objs_in=[{'show_id': 1, 'seat_number': seat, 'price': 10} for seat in range(2)], db_session=db_session
+    )
+    assert 'ON CONFLICT DO NOTHING' in db_session.statements[0]
+    assert result.conflicts == [0, 1]
+
+
+async def test_create_many_without_a_unique_key_does_not_expect_conflicts():
+    db_session = FakeSession()
+    await CRUDBase(Role).create_many(objs_in=[{'name': 'admin'}], db_session=db_session)
+
+    assert 'ON CONFLICT' not in db_session.statements[0]
+
+
+async def test_update_many_requires_the_id_of_every_row():
+    with pytest.raises(InvalidRequestException):
+        await CRUDBase(Role).update_many(objs_new=[{'id': 1, 'name': 'admin'}, {'name': 'user'}], db_session=FakeSession())
+
+
+@pytest.mark.parametrize('write', [
+    lambda crud, db_session: crud.update_many(objs_new=[{'id': 1, 'name': 'admin'}], db_session=db_session),
+    lambda crud, db_session: crud.upsert_many(objs_in=[{'id': 1, 'name': 'admin'}], conflict_columns=['id'], db_session=db_session),
+])
+async def test_bulk_write_breaking_a_constraint_is_a_conflict(write):
+    db_session = ConflictingSession()
+    with pytest.raises(HTTPException) as error:
+        await write(CRUDBase(Role), db_session)
+
+    assert error.value.status_code == 409
+    assert db_session.rolled_back
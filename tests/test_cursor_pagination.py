@@ -0,0 +1,68 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.generics.enums import IOrderEnum
+from app.generics.exceptions import InvalidRequestException
+from app.generics.pagination import CursorParams, decode_cursor, encode_cursor
+from app.users.crud import user_crud
+from app.users.models import User
+
+
+class FakeSession:
+    """Compiles the page query and returns `rows` as its result."""
+
+    def __init__(self, rows: list | None = None):
+        self.rows = rows or []
+        self.statements: list[str] = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}
+        )))
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: self.rows))
+
+
+def test_cursor_round_trip_keeps_the_types_of_the_columns():
+    columns = User.__table__.columns
+    user_id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(['alice', user_id]), [columns['username'], columns['id']]) == ('alice', user_id)
+
+
+def test_invalid_cursor_is_a_bad_request():
+    with pytest.raises(InvalidRequestException):
+        decode_cursor(encode_cursor(['alice']), [User.__table__.columns['username'], User.__table__.columns['id']])
+
+
+async def test_users_can_not_be_ordered_by_a_nullable_column():
+    with pytest.raises(InvalidRequestException):
+        await user_crud.get_multi_cursor(params=CursorParams(size=2), order_by='email', db_session=FakeSession())
+
+
+async def test_page_after_the_cursor_is_a_range_of_the_order_key_and_id():
+    user_id = uuid.uuid4()
+    db_session = FakeSession()
+    cursor = encode_cursor(['alice', user_id])
+
+    await user_crud.get_multi_cursor(
+        params=CursorParams(cursor=cursor, size=2), order_by='username', order=IOrderEnum.descendent,
+        db_session=db_session,
+    )
+
+    statement, = db_session.statements
+    assert f"(users.username, users.id) < ('alice', '{user_id}')" in statement
+    assert ' '.join(statement.split()).endswith('ORDER BY users.username DESC, users.id DESC LIMIT 3')
+
+
+async def test_next_cursor_is_the_last_row_of_a_full_page():
+    users = [SimpleNamespace(id=uuid.uuid4(), username=name) for name in ('alice', 'bob', 'carol')]
+
+    page = await user_crud.get_multi_cursor(
+        params=CursorParams(size=2), order_by='username', db_session=FakeSession(users)
+    )
+
+    assert page.items == users[:2]
+    assert page.next_cursor == encode_cursor(['bob', users[1].id])
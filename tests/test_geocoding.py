@@ -0,0 +1,63 @@
+import pytest
+
+from app.geocoding.enums import IGeocodingProviderEnum
+from app.geocoding.exceptions import GeocodingUnavailableException
+from app.geocoding.schemas import Location
+from app.geocoding.service import GeocodingService
+
+
+class FakeProvider:
+    def __init__(self, location: Location | None = None, fail: bool = False):
+        self.location = location
+        self.fail = fail
+        self.calls = 0
+
+    async def geocode(self, address):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('Provider is down')
+        return self.location
+
+    async def geocode_many(self, addresses):
+        return [await self.geocode(address) for address in addresses]
+
+
+def make_service(primary, fallback, batch_max_fallbacks: int = 5) -> GeocodingService:
+    return GeocodingService(
+        primary, fallback, cache_size=100, cache_ttl=60, geohash_precision=7,
+        batch_max_fallbacks=batch_max_fallbacks,
+    )
+
+
+async def test_miss_is_not_cached_when_the_fallback_failed():
+    fallback = FakeProvider(fail=True)
+    service = make_service(FakeProvider(), fallback)
+
+    with pytest.raises(GeocodingUnavailableException):
+        await service.geocode('1 Le Loi')
+    fallback.fail = False
+    assert await service.geocode('1 Le Loi') is None
+    assert fallback.calls == 2
+    # A miss of both providers is cached.
+    assert await service.geocode('1 Le Loi') is None
+    assert fallback.calls == 2
+
+
+async def test_batch_misses_of_a_failed_primary_are_not_cached():
+    primary = FakeProvider(fail=True)
+    service = make_service(primary, None)
+
+    assert await service.geocode_many(['1 Le Loi', '2 Le Loi']) == [None, None]
+    primary.fail = False
+    primary.location = Location(lat=10.77, lon=106.7, address='1 Le Loi', provider=IGeocodingProviderEnum.elastic)
+    assert await service.geocode_many(['1 Le Loi']) == [primary.location]
+
+
+async def test_batch_sends_a_bounded_number_of_misses_to_the_fallback():
+    fallback = FakeProvider()
+    service = make_service(FakeProvider(), fallback, batch_max_fallbacks=2)
+
+    assert await service.geocode_many([f'{number} Le Loi' for number in range(5)]) == [None] * 5
+    assert fallback.calls == 2
+    await service.geocode_many([f'{number} Le Loi' for number in range(5)])
+    assert fallback.calls == 4
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.bookings.exceptions import SeatUnavailableException, HoldNotFoundException
+from app.bookings.holds import HOLD_KEY_PREFIX
+from app.bookings.seat_map import SEAT_AVAILABLE, SEAT_HELD, SEAT_SOLD
+from app.generics.exceptions import InvalidRequestException
+
+from .conftest import SHOW_ID
+
+
+async def test_hold_takes_all_seats_or_none(engine, seat_map):
+    hold = await engine.hold(SHOW_ID, [3, 1, 2], 'alice')
+    assert hold.seat_numbers == [1, 2, 3]
+    with pytest.raises(SeatUnavailableException):
+        await engine.hold(SHOW_ID, [3, 4], 'bob')
+
+    states = await seat_map.get_states(SHOW_ID)
+    assert states[1:5] == [SEAT_HELD, SEAT_HELD, SEAT_HELD, SEAT_AVAILABLE]
+    assert engine.stats['conflicts'] == 1
+
+
+async def test_hold_rejects_seats_outside_the_show(engine):
+    with pytest.raises(InvalidRequestException):
+        await engine.hold(SHOW_ID, [10], 'alice')
+
+
+async def test_release_frees_the_seats_of_the_owner_only(engine, seat_map):
+    hold = await engine.hold(SHOW_ID, [1, 2], 'alice')
+    with pytest.raises(HoldNotFoundException):
+        await engine.release(hold.hold_id, 'bob')
+
+    released = await engine.release(hold.hold_id, 'alice')
+    assert released.seat_numbers == [1, 2]
+    assert (await seat_map.get_states(SHOW_ID))[1:3] == [SEAT_AVAILABLE, SEAT_AVAILABLE]
+    assert await engine.get(hold.hold_id) is None
+    await engine.hold(SHOW_ID, [1, 2], 'bob')
+
+
+async def test_confirm_sells_the_seats_and_is_idempotent(engine, seat_map):
+    hold = await engine.hold(SHOW_ID, [5, 6], 'alice')
+
+    confirmation = await engine.confirm(hold.hold_id)
+    assert confirmation.confirmed
+    assert confirmation.hold.seat_numbers == [5, 6]
+    assert (await engine.confirm(hold.hold_id)).confirmed
+    assert (await seat_map.get_states(SHOW_ID))[5:7] == [SEAT_SOLD, SEAT_SOLD]
+    with pytest.raises(SeatUnavailableException):
+        await engine.hold(SHOW_ID, [6], 'bob')
+    # A confirmed hold can't be released anymore.
+    with pytest.raises(HoldNotFoundException):
+        await engine.release(hold.hold_id, 'alice')
+
+
+async def test_confirm_of_an_unknown_hold(engine):
+    assert await engine.confirm('unknown') is None
+
+
+async def test_confirm_after_the_seats_were_taken_by_another_hold(engine, redis):
+    engine.ttl_ms = 50
+    hold = await engine.hold(SHOW_ID, [1, 2], 'alice')
+    await asyncio.sleep(0.1)
+    await engine.hold(SHOW_ID, [2], 'bob')
+
+    confirmation = await engine.confirm(hold.hold_id)
+    assert not confirmation.confirmed
+    assert await redis.exists(f'{HOLD_KEY_PREFIX}{hold.hold_id}')
+
+
+async def test_sweep_releases_the_due_holds(engine, seat_map):
+    engine.ttl_ms = 50
+    due = await engine.hold(SHOW_ID, [1], 'alice')
+    engine.ttl_ms = 60000
+    await engine.hold(SHOW_ID, [2], 'bob')
+    await asyncio.sleep(0.1)
+
+    result = await engine.sweep(batch_size=10)
+    assert result.due == 1
+    assert [hold.hold_id for hold in result.released] == [due.hold_id]
+    assert result.lag >= 0
+    assert (await seat_map.get_states(SHOW_ID))[1:3] == [SEAT_AVAILABLE, SEAT_HELD]
+    assert (await engine.sweep(batch_size=10)).released == []
+
+
+async def test_expire_skips_a_hold_whose_timer_is_running(engine):
+    hold = await engine.hold(SHOW_ID, [1], 'alice')
+    assert await engine.expire(hold.hold_id) is None
+    assert await engine.get(hold.hold_id) is not None
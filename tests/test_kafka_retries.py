@@ -0,0 +1,209 @@
+import time
+import uuid
+
+import pytest
+from confluent_kafka import KafkaError, KafkaException, Producer, TopicPartition
+from pydantic import BaseModel
+
+from app.generics.pkg.kafka import (
+    FAILURE_HEADERS, HEADER_ERROR, HEADER_NOT_BEFORE, HEADER_ORIGINAL_OFFSET, HEADER_ORIGINAL_TOPIC,
+    HEADER_REPLAYED_FROM, HEADER_RETRY_COUNT, HandlingMessageBaseCallback, KafkaBaseConsumer, KafkaBatchConsumer,
+    get_headers
+)
+
+
+class Order(BaseModel):
+    order_id: int
+
+
+class FailingCallback(HandlingMessageBaseCallback):
+    message_model = Order
+
+    def handle_message(self):
+        raise RuntimeError('Can not handle the order')
+
+
+@pytest.fixture(scope='module')
+def kafka():
+    """librdkafka's in-process mock cluster, alive as long as this producer."""
+    producer = Producer({'bootstrap.servers': '', 'test.mock.num.brokers': 1})
+    brokers = producer.list_topics(timeout=10).brokers.values()
+    yield producer, ','.join(f'{broker.host}:{broker.port}' for broker in brokers)
+    producer.flush(10)
+
+
+def make_consumer(servers: str, base: type = KafkaBaseConsumer, **attributes) -> KafkaBaseConsumer:
+    topic = f'orders-{uuid.uuid4().hex[:8]}'
+    consumer_class = type('OrderConsumer', (base,), {
+        'callback': FailingCallback,
+        'topics': [topic],
+        'consumer_config': {
+            'bootstrap.servers': servers, 'group.id': topic, 'auto.offset.reset': 'earliest',
+        },
+        'producer_config': {'bootstrap.servers': servers},
+        **attributes,
+    })
+    return consumer_class()
+
+
+def assign(consumer: KafkaBaseConsumer, topic: str):
+    partitions = consumer.consumer.list_topics(topic, timeout=10).topics[topic].partitions
+    consumer.consumer.assign([TopicPartition(topic, partition, 0) for partition in partitions])
+
+
+def next_message(consumer, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        message = consumer.poll(0.5)
+        if message is not None and not message.error():
+            return message
+    return None
+
+
+def poll(consumer: KafkaBaseConsumer, topic: str):
+    """The first message of `topic`, keyless messages may be in any partition."""
+    assign(consumer, topic)
+    message = next_message(consumer.consumer)
+    assert message is not None, f'No message in {topic}'
+    return message
+
+
+def poll_all(consumer: KafkaBaseConsumer, topic: str, timeout: float = 3) -> list:
+    assign(consumer, topic)
+    messages = []
+    while (message := next_message(consumer.consumer, timeout)) is not None:
+        messages.append(message)
+    return messages
+
+
+def test_keyless_message_keeps_no_key_on_retry(kafka):
+    producer, servers = kafka
+    consumer = make_consumer(servers, retry_delays=[60])
+    topic = consumer.topics[0]
+    producer.produce(topic, value=b'{"order_id": 1}')
+    producer.flush(10)
+
+    consumer.process_message(poll(consumer, topic))
+
+    retried = poll(consumer, consumer.retry_topic(topic, 1))
+    assert retried.key() is None
+    assert retried.value() == b'{"order_id": 1}'
+    assert get_headers(retried)[HEADER_RETRY_COUNT] == '1'
+    consumer.consumer.close()
+
+
+def produce(producer, topic: str, headers: dict | None = None):
+    producer.produce(topic, key=str(uuid.uuid4()), value=b'{"order_id": 1}', headers=headers)
+    producer.flush(10)
+
+
+def test_failed_message_goes_through_the_retry_topics_to_the_dead_letter_topic(kafka):
+    producer, servers = kafka
+    consumer = make_consumer(servers, retry_delays=[60])
+    topic = consumer.topics[0]
+    produce(producer, topic, headers={'x-outbox-id': '42'})
+
+    message = poll(consumer, topic)
+    consumer.process_message(message)
+    retried = poll(consumer, consumer.retry_topic(topic, 1))
+    headers = get_headers(retried)
+    assert headers[HEADER_ORIGINAL_TOPIC] == topic
+    assert headers[HEADER_ORIGINAL_OFFSET] == str(message.offset())
+    assert headers['x-outbox-id'] == '42'
+    assert 'Can not handle the order' in headers[HEADER_ERROR]
+    assert 50 < consumer.retry_delay(retried) <= 60
+
+    consumer.process_message(retried)
+    dead = poll(consumer, consumer.dead_letter_topic(topic))
+    headers = get_headers(dead)
+    assert dead.key() == message.key()
+    assert (headers[HEADER_RETRY_COUNT], headers[HEADER_ORIGINAL_TOPIC]) == ('2', topic)
+    assert HEADER_NOT_BEFORE not in headers
+    assert consumer.retry_delay(dead) == 0
+    consumer.consumer.close()
+
+
+def test_dead_letter_without_retries(kafka):
+    producer, servers = kafka
+    consumer = make_consumer(servers, dead_letter=True)
+    topic = consumer.topics[0]
+    produce(producer, topic)
+    assert consumer.subscribed_topics() == [topic]
+
+    consumer.process_message(poll(consumer, topic))
+    assert get_headers(poll(consumer, consumer.dead_letter_topic(topic)))[HEADER_RETRY_COUNT] == '1'
+    consumer.consumer.close()
+
+
+def test_replayed_dead_letter_starts_over_on_its_original_topic(kafka):
+    producer, servers = kafka
+    consumer = make_consumer(servers, dead_letter=True)
+    topic = consumer.topics[0]
+    produce(producer, topic, headers={'x-outbox-id': '42'})
+    consumer.process_message(poll(consumer, topic))
+    dead = poll(consumer, consumer.dead_letter_topic(topic))
+
+    consumer.replay_message(dead)
+    replayed = [message for message in poll_all(consumer, topic) if message.offset() > 0][0]
+    headers = get_headers(replayed)
+    assert replayed.key() == dead.key()
+    assert headers['x-outbox-id'] == '42'
+    assert headers[HEADER_REPLAYED_FROM] == f'{dead.topic()}:{dead.partition()}:{dead.offset()}'
+    assert not FAILURE_HEADERS & set(headers)
+    consumer.consumer.close()
+
+
+def test_failed_message_is_consumed_again_when_its_retry_is_not_delivered(kafka, monkeypatch):
+    producer, servers = kafka
+    consumer = make_consumer(servers, retry_delays=[60])
+    topic = consumer.topics[0]
+    produce(producer, topic)
+    message = poll(consumer, topic)
+
+    def deliver(*args, **kwargs):
+        raise KafkaException(KafkaError(KafkaError._MSG_TIMED_OUT))
+    monkeypatch.setattr(consumer.retry_producer, 'deliver', deliver)
+    consumer.process_message(message)
+
+    again = next_message(consumer.consumer)
+    assert (again.topic(), again.partition(), again.offset()) == (topic, message.partition(), message.offset())
+    committed, = consumer.consumer.committed([TopicPartition(topic, message.partition())], timeout=10)
+    assert committed.offset < 0
+    consumer.consumer.close()
+
+
+def test_message_which_can_not_be_deserialized_goes_straight_to_the_dead_letter_topic(kafka):
+    producer, servers = kafka
+    consumer = make_consumer(servers, KafkaBatchConsumer, retry_delays=[60], num_workers=1)
+    topic = consumer.topics[0]
+    producer.produce(topic, key=b'not-a-uuid', value=b'{"order_id": 1}')
+    producer.flush(10)
+    message = poll(consumer, topic)
+
+    consumer.handle(message)
+
+    dead = poll(consumer, consumer.dead_letter_topic(topic))
+    assert (dead.key(), dead.value()) == (b'not-a-uuid', b'{"order_id": 1}')
+    assert get_headers(dead)[HEADER_ORIGINAL_TOPIC] == topic
+    assert consumer._processed[(topic, message.partition())] == message.offset()
+    consumer.consumer.close()
+
+
+def test_message_which_can_not_be_deserialized_nor_sent_is_consumed_again(kafka, monkeypatch):
+    producer, servers = kafka
+    consumer = make_consumer(servers, KafkaBatchConsumer, dead_letter=True, num_workers=1)
+    topic = consumer.topics[0]
+    producer.produce(topic, key=b'not-a-uuid', value=b'{"order_id": 1}')
+    producer.flush(10)
+    message = poll(consumer, topic)
+
+    def deliver(*args, **kwargs):
+        raise KafkaException(KafkaError(KafkaError._MSG_TIMED_OUT))
+    monkeypatch.setattr(consumer.retry_producer, 'deliver', deliver)
+    consumer.handle(message)
+
+    assert (topic, message.partition()) not in consumer._processed
+    consumer.apply_rewinds()
+    again = next_message(consumer.consumer)
+    assert (again.topic(), again.partition(), again.offset()) == (topic, message.partition(), message.offset())
+    consumer.consumer.close()
@@ -0,0 +1,43 @@
+import logging
+
+from app.generics.middlewares.logging_middlewares import LoggingMiddleware, captured_body
+
+
+BODY = b'{"show_seats": [1, 2]}'
+
+
+def make_scope(body: bytes) -> dict:
+    return {
+        'type': 'http', 'method': 'POST', 'path': '/bookings', 'query_string': b'',
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    }
+
+
+async def call(scope: dict, body: bytes, **options):
+    async def app(scope, receive, send):
+        await receive()
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await LoggingMiddleware(app, sample_rate=1, **options)(scope, receive, send)
+
+
+async def test_request_body_is_logged_as_it_was_received(caplog):
+    scope = make_scope(BODY)
+    with caplog.at_level(logging.INFO, logger='app.generics.middlewares.logging_middlewares'):
+        await call(scope, BODY)
+
+    record, = caplog.records
+    assert record.body == BODY.decode()
+    assert captured_body(scope['state']) == BODY.decode()
+
+
+async def test_body_larger_than_the_limit_is_not_captured():
+    scope = make_scope(BODY)
+    await call(scope, BODY, max_body_size=8)
+
+    assert captured_body(scope['state']) == ''
@@ -0,0 +1,150 @@
+import uuid
+
+import pytest
+from sqlalchemy.sql import Insert, Update
+
+from app.bookings import payments
+from app.bookings.exceptions import InvalidPaymentSignatureException
+from app.bookings.momo import NOTIFICATION_SIGNED_FIELDS, sign
+from app.bookings.payments import handle_payment_notification, BOOKING_NOTIFICATION_TOPIC
+from app.bookings.schemas import PaymentNotification
+from app.bookings.seat_map import SEAT_SOLD
+from app.generics import settings
+
+from .conftest import SHOW_ID
+
+
+SEAT_PRICE = 50000
+
+
+class FakeSession:
+    """
+    Just enough of `AsyncSession` for `handle_payment_notification`, with the unique keys
+    of `payments.transaction_id` and `bookings.id`.
+    """
+
+    def __init__(self):
+        self.transactions: dict[str, int] = {}
+        self.bookings: set = set()
+        self.outbox: list[dict] = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def scalar(self, statement):
+        if isinstance(statement, Insert):
+            values = statement.compile().params
+            if statement.table.name == 'payments':
+                if values['transaction_id'] in self.transactions:
+                    return None
+                self.transactions[values['transaction_id']] = len(self.transactions) + 1
+                return self.transactions[values['transaction_id']]
+            if statement.table.name == 'bookings':
+                if values['id'] in self.bookings:
+                    return None
+                self.bookings.add(values['id'])
+                return values['id']
+        # The price of the hold.
+        return SEAT_PRICE * len(statement.compile().params['seat_number_1'])
+
+    async def execute(self, statement, params=None):
+        if isinstance(statement, Insert) and statement.table.name == 'outbox_events':
+            self.outbox.extend(params)
+
+        class Result:
+            rowcount = len(params) if params else 0
+        if isinstance(statement, Update) and statement.table.name == 'show_seats':
+            Result.rowcount = len(statement.compile().params['seat_number_1'])
+        return Result()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture(autouse=True)
+def momo(monkeypatch, engine):
+    monkeypatch.setattr(settings, 'MOMO_ACCESS_KEY', 'access')
+    monkeypatch.setattr(settings, 'MOMO_SECRET_KEY', 'secret')
+    monkeypatch.setattr(payments, 'seat_hold_engine', engine)
+
+
+def notification(order_id: str, amount: int, result_code: int = 0, trans_id: int = 1001) -> PaymentNotification:
+    fields = {
+        'partnerCode': 'MOMO', 'orderId': order_id, 'requestId': order_id, 'amount': amount,
+        'orderInfo': 'tickets', 'orderType': 'momo_wallet', 'transId': trans_id, 'resultCode': result_code,
+        'message': 'Successful.', 'payType': 'qr', 'responseTime': 1700000000000, 'extraData': '',
+    }
+    params = {field: fields[field] for field in NOTIFICATION_SIGNED_FIELDS}
+    params['accessKey'] = 'access'
+    return PaymentNotification(**fields, signature=sign(params, 'secret'))
+
+
+async def paid_hold(engine):
+    hold = await engine.hold(SHOW_ID, [1, 2], str(uuid.uuid4()))
+    return hold, notification(hold.hold_id, 2 * SEAT_PRICE)
+
+
+async def test_retried_notification_is_handled_once(engine, seat_map):
+    hold, paid = await paid_hold(engine)
+    db_session = FakeSession()
+
+    assert await handle_payment_notification(paid, db_session)
+    assert (await seat_map.get_states(SHOW_ID))[1:3] == [SEAT_SOLD, SEAT_SOLD]
+    assert db_session.bookings == {uuid.UUID(hold.hold_id)}
+    assert [event['topic'] for event in db_session.outbox][0] == BOOKING_NOTIFICATION_TOPIC
+    assert db_session.commits == 1
+    events = len(db_session.outbox)
+
+    assert not await handle_payment_notification(paid, db_session)
+    assert db_session.rollbacks == 1
+    assert db_session.commits == 1
+    assert len(db_session.outbox) == events
+
+
+async def test_notification_of_another_transaction_of_a_paid_hold_is_refunded(engine):
+    _, paid = await paid_hold(engine)
+    db_session = FakeSession()
+    await handle_payment_notification(paid, db_session)
+
+    again = notification(paid.orderId, paid.amount, trans_id=1002)
+    assert await handle_payment_notification(again, db_session)
+    assert db_session.outbox[-1]['topic'] == payments.REFUND_TOPIC
+    assert db_session.outbox[-1]['payload']['transaction_id'] == '1002'
+
+
+async def test_failed_payment_leaves_the_hold(engine):
+    hold, _ = await paid_hold(engine)
+    db_session = FakeSession()
+
+    assert await handle_payment_notification(notification(hold.hold_id, 2 * SEAT_PRICE, result_code=1006), db_session)
+    assert await engine.get(hold.hold_id) is not None
+    assert not db_session.bookings and not db_session.outbox
+
+
+async def test_notification_with_an_invalid_signature_is_rejected(engine):
+    _, paid = await paid_hold(engine)
+    db_session = FakeSession()
+
+    with pytest.raises(InvalidPaymentSignatureException):
+        await handle_payment_notification(paid.model_copy(update={'amount': 1}), db_session)
+    assert not db_session.transactions
+
+
+async def test_notification_whose_amount_is_not_the_price_is_refunded(engine):
+    hold, _ = await paid_hold(engine)
+    db_session = FakeSession()
+    underpaid = notification(hold.hold_id, SEAT_PRICE)
+
+    assert await handle_payment_notification(underpaid, db_session)
+    assert list(db_session.transactions) == ['1001']
+    assert db_session.commits == 1
+    refund, = db_session.outbox
+    assert refund['topic'] == payments.REFUND_TOPIC
+    assert (refund['payload']['transaction_id'], refund['payload']['amount']) == ('1001', SEAT_PRICE)
+    assert not db_session.bookings
+    assert await engine.get(hold.hold_id) is not None
+    # The retry of the gateway is acknowledged without a second refund.
+    assert not await handle_payment_notification(underpaid, db_session)
+    assert len(db_session.outbox) == 1
@@ -0,0 +1,33 @@
+import uuid
+
+from redis import exceptions as redis_errors
+
+from app.auth import cache
+from app.auth.cache import PrincipalCache
+
+
+class UnavailableRedis:
+    async def get(self, key):
+        raise redis_errors.ConnectionError()
+
+    async def set(self, key, value, ex=None):
+        raise redis_errors.ConnectionError()
+
+    async def delete(self, *keys):
+        raise redis_errors.ConnectionError()
+
+
+async def test_invalidation_survives_an_unavailable_redis(monkeypatch):
+    monkeypatch.setattr(cache, 'redis_connection', UnavailableRedis())
+    principals = PrincipalCache(maxsize=10, local_ttl=60, ttl=600)
+    user_id = uuid.uuid4()
+    loaded = []
+
+    async def loader(user_id):
+        loaded.append(user_id)
+        return {'id': user_id, 'username': f'user{len(loaded)}'}
+
+    assert (await principals.get(user_id, loader))['username'] == 'user1'
+    await principals.invalidate(user_id)
+    # Dropped locally, the next read goes to the loader.
+    assert (await principals.get(user_id, loader))['username'] == 'user2'
@@ -0,0 +1,102 @@
+import asyncio
+
+from redis import exceptions as redis_errors
+
+from app.generics.ratelimit import HybridRateLimiter
+
+
+KEY = 'ratelimit:test'
+
+
+def make_limiter(redis, error_margin: float = 0.5, lease_ttl: float = 60) -> HybridRateLimiter:
+    return HybridRateLimiter(redis, error_margin=error_margin, lease_ttl=lease_ttl, max_leases=100)
+
+
+async def test_tokens_are_spent_from_the_lease(redis):
+    limiter = make_limiter(redis, error_margin=0.05)
+
+    assert [await limiter.hit(KEY, 100, 60) for _ in range(5)] == [0] * 5
+    assert (limiter.redis_calls, limiter.local_hits) == (1, 5)
+    await limiter.hit(KEY, 100, 60)
+    assert limiter.redis_calls == 2
+
+
+async def test_workers_together_never_admit_more_than_the_limit(redis):
+    workers = [make_limiter(redis), make_limiter(redis)]
+
+    admitted = 0
+    for _ in range(10):
+        for worker in workers:
+            if await worker.hit(KEY, 10, 60) == 0:
+                admitted += 1
+    assert admitted == 10
+    retry_after = await workers[0].hit(KEY, 10, 60)
+    assert 0 < retry_after <= 6000
+    assert workers[0].limited == 6
+
+
+async def test_concurrent_hits_share_one_call_to_redis(redis):
+    limiter = make_limiter(redis)
+
+    assert await asyncio.gather(*(limiter.hit(KEY, 10, 60) for _ in range(3))) == [0, 0, 0]
+    assert limiter.redis_calls == 1
+
+
+async def test_unused_tokens_of_expired_leases_are_given_back(redis):
+    worker = make_limiter(redis, lease_ttl=0.05)
+    other = make_limiter(redis)
+    await worker.hit(KEY, 10, 60)
+    await asyncio.sleep(0.1)
+
+    await worker.return_expired()
+    assert worker.returned == 4
+    assert not worker.leases
+    admitted = [await other.hit(KEY, 10, 60) for _ in range(10)]
+    assert admitted.count(0) == 9
+
+
+async def test_expired_lease_is_given_back_with_the_next_one(redis):
+    limiter = make_limiter(redis, lease_ttl=0.05)
+    await limiter.hit(KEY, 10, 60)
+    await asyncio.sleep(0.1)
+
+    await limiter.hit(KEY, 10, 60)
+    assert limiter.redis_calls == 2
+    assert limiter.leases[KEY].tokens == 4
+    # 1 + 1 spent, 4 leased: the other 4 are left to the other workers.
+    other = make_limiter(redis)
+    assert [await other.hit(KEY, 10, 60) for _ in range(5)].count(0) == 4
+
+
+class UnavailableRedis:
+    def register_script(self, script):
+        async def call(args):
+            raise redis_errors.ConnectionError('Connection refused')
+        return call
+
+
+async def test_falls_back_to_the_share_of_the_worker_when_redis_is_unavailable():
+    limiter = HybridRateLimiter(UnavailableRedis(), error_margin=0.5, lease_ttl=60, max_leases=100, workers=2)
+
+    results = [await limiter.hit(KEY, 10, 60) for _ in range(6)]
+    assert results[:5] == [0] * 5
+    assert 0 < results[5] <= 12000
+    assert limiter.stats['degraded']
+    assert limiter.fallbacks == 4
+
+
+async def test_local_leases_are_not_given_back_to_redis(redis):
+    limiter = make_limiter(redis, lease_ttl=0.05)
+    script = limiter._gcra
+
+    async def unavailable(args):
+        raise redis_errors.TimeoutError()
+    limiter._gcra = unavailable
+    await limiter.hit(KEY, 10, 60)
+    limiter._gcra = script
+    await asyncio.sleep(0.1)
+
+    await limiter.return_expired()
+    assert limiter.returned == 0
+    await limiter.hit(KEY, 10, 60)
+    assert not limiter.stats['degraded']
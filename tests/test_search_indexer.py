@@ -0,0 +1,133 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import pytest
+
+from app.catalog.workers import search_indexer
+from app.catalog.workers.search_indexer import BulkIndexer, SearchChangeCallback
+from app.generics.outbox import OUTBOX_ID_HEADER
+
+
+@dataclass
+class Document:
+    id: int
+
+
+class FakeIndex:
+    name = 'fake'
+
+    def __init__(self, existing: set[int]):
+        self.existing = existing
+        self.deleted: list[int] = []
+
+    async def build_documents(self, ids, db_session):
+        return [Document(id) for id in ids if id in self.existing]
+
+    def document_id(self, document) -> int:
+        return document.id
+
+    def action(self, document, version: int) -> dict:
+        return {'_id': document.id, 'version': version}
+
+    async def delete_missing(self, ids) -> int:
+        self.deleted.extend(ids)
+        return len(ids)
+
+
+@pytest.fixture
+def bulk(monkeypatch):
+    """Records the actions sent to elasticsearch, answers with the errors of `bulk.errors`."""
+    calls = []
+
+    async def async_bulk(client, actions, **kwargs):
+        calls.append(list(actions))
+        return len(actions) - len(async_bulk.errors), async_bulk.errors
+    async_bulk.calls = calls
+    async_bulk.errors = []
+
+    @asynccontextmanager
+    async def async_session():
+        yield None
+
+    monkeypatch.setattr(search_indexer, 'async_bulk', async_bulk)
+    monkeypatch.setattr(search_indexer, 'async_session', async_session)
+    return async_bulk
+
+
+async def test_concurrent_changes_are_indexed_together_with_their_latest_version(bulk):
+    indexer = BulkIndexer(FakeIndex({1, 2}), batch_size=100, flush_interval=0.01)
+
+    await asyncio.gather(indexer.submit([1], 7), indexer.submit([1, 2], 5), indexer.submit([2], 9))
+
+    assert bulk.calls == [[{'_id': 1, 'version': 7}, {'_id': 2, 'version': 9}]]
+    assert indexer.indexed == 2
+
+
+async def test_full_batch_is_indexed_without_waiting(bulk):
+    indexer = BulkIndexer(FakeIndex({1, 2}), batch_size=2, flush_interval=60)
+
+    await asyncio.wait_for(asyncio.gather(indexer.submit([1], 1), indexer.submit([2], 1)), timeout=1)
+    assert len(bulk.calls) == 1
+
+
+async def test_version_conflicts_are_ignored(bulk):
+    indexer = BulkIndexer(FakeIndex({1, 2}), batch_size=100, flush_interval=0.01)
+    bulk.errors = [{'index': {'_id': 1, 'status': 409}}]
+
+    await indexer.submit([1, 2], 3)
+    assert indexer.conflicts == 1
+
+
+async def test_failed_batch_fails_all_its_messages(bulk):
+    indexer = BulkIndexer(FakeIndex({1, 2}), batch_size=100, flush_interval=0.01)
+    bulk.errors = [{'index': {'_id': 1, 'status': 429}}]
+
+    results = await asyncio.gather(indexer.submit([1], 3), indexer.submit([2], 4), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_rows_which_are_gone_are_deleted(bulk):
+    index = FakeIndex({1})
+    indexer = BulkIndexer(index, batch_size=100, flush_interval=0.01)
+
+    await indexer.submit([1, 2], 3)
+    assert index.deleted == [2]
+    assert indexer.deleted == 1
+
+
+class FakeMessage:
+    def __init__(self, headers: list):
+        self._headers = headers
+
+    def value(self):
+        return {'table': 'cities', 'action': 'UPDATE', 'id': '1'}
+
+    def key(self):
+        return '1'
+
+    def topic(self):
+        return 'cdc.cities'
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return 0
+
+    def headers(self):
+        return self._headers
+
+
+async def test_change_event_without_outbox_id_fails(monkeypatch):
+    async def affected_shows(self, event):
+        return []
+    monkeypatch.setattr(SearchChangeCallback, 'affected_shows', affected_shows)
+
+    callback = SearchChangeCallback(FakeMessage([]))
+    await callback.execute()
+    assert OUTBOX_ID_HEADER in callback.error
+
+    callback = SearchChangeCallback(FakeMessage([(OUTBOX_ID_HEADER, b'12')]))
+    await callback.execute()
+    assert (callback.version, callback.error) == (12, None)
@@ -0,0 +1,54 @@
+import pytest
+
+from app.bookings.exceptions import WaitlistEntryNotFoundException
+from app.bookings.seat_map import SEAT_HELD
+from app.bookings.waitlist import WAITING, GRANTED
+
+from .conftest import SHOW_ID
+
+
+async def test_released_seats_are_granted_to_the_head_of_the_waitlist(engine, waitlist, seat_map):
+    hold = await engine.hold(SHOW_ID, [1, 2, 3], 'alice')
+    first = await waitlist.join(SHOW_ID, 2, 'bob')
+    second = await waitlist.join(SHOW_ID, 1, 'carol')
+    assert (first.position, second.position) == (0, 1)
+
+    await engine.release(hold.hold_id, 'alice')
+
+    entry = await waitlist.get(first.entry_id)
+    assert entry.status == GRANTED
+    assert entry.hold_id == first.entry_id
+    assert entry.seat_numbers == [1, 2]
+    granted = await engine.get(first.entry_id)
+    assert (granted.user_id, granted.seat_numbers) == ('bob', [1, 2])
+    entry = await waitlist.get(second.entry_id)
+    assert (entry.status, entry.seat_numbers) == (GRANTED, [3])
+    assert (await seat_map.get_states(SHOW_ID))[1:4] == [SEAT_HELD] * 3
+    assert engine.stats['granted'] == 2
+
+
+async def test_head_which_does_not_fit_is_not_overtaken(engine, waitlist):
+    hold = await engine.hold(SHOW_ID, [1, 2], 'alice')
+    head = await waitlist.join(SHOW_ID, 3, 'bob')
+    behind = await waitlist.join(SHOW_ID, 1, 'carol')
+
+    await engine.release(hold.hold_id, 'alice')
+
+    assert (await waitlist.get(head.entry_id)).status == WAITING
+    entry = await waitlist.get(behind.entry_id)
+    assert (entry.status, entry.position) == (WAITING, 1)
+    await engine.hold(SHOW_ID, [1, 2], 'dave')
+
+
+async def test_cancel(engine, waitlist):
+    entry = await waitlist.join(SHOW_ID, 1, 'bob')
+    with pytest.raises(WaitlistEntryNotFoundException):
+        await waitlist.cancel(entry.entry_id, 'carol')
+    assert await waitlist.cancel(entry.entry_id, 'bob')
+    assert await waitlist.get(entry.entry_id) is None
+
+    hold = await engine.hold(SHOW_ID, [1], 'alice')
+    granted = await waitlist.join(SHOW_ID, 1, 'bob')
+    await engine.release(hold.hold_id, 'alice')
+    # Granted entries have a hold to release instead.
+    assert not await waitlist.cancel(granted.entry_id, 'bob')